@@ -0,0 +1,163 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import transaction
+
+from .models import ActivityEntry, Project, ProjectMembership, Task
+
+
+TRACKED_FIELDS = {
+    Task: ['title', 'description', 'due_date', 'priority', 'status', 'project', 'owner', 'assigned_to'],
+    Project: ['title', 'description', 'owner'],
+    ProjectMembership: ['project', 'user', 'role'],
+}
+
+MODEL_NAMES = {Task: 'task', Project: 'project', ProjectMembership: 'membership'}
+
+# Fields whose values are user ids, shown as usernames in the history.
+USER_FIELDS = {'owner', 'assigned_to', 'user'}
+
+_current_log = ContextVar('core_activity_log', default=None)
+_paused = ContextVar('core_activity_paused', default=False)
+
+
+class ActivityLog:
+    """The entries of one request, collected as their transactions commit and written together."""
+
+    def __init__(self, request=None):
+        self.request = request
+        self.entries = []
+
+    @property
+    def actor_id(self):
+        user = getattr(self.request, 'user', None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+    def flush(self):
+        entries, self.entries = self.entries, []
+        if entries:
+            ActivityEntry.objects.bulk_create(entries)
+
+
+@contextmanager
+def activity_log(request=None):
+    """Buffer the activity recorded inside the block and write it with one INSERT when the block ends."""
+    log = ActivityLog(request)
+    token = _current_log.set(log)
+    try:
+        yield log
+    finally:
+        _current_log.reset(token)
+        log.flush()
+
+
+@contextmanager
+def activity_paused():
+    """Record nothing inside the block, for rows whose history is removed along with them."""
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+
+def tracked_state(instance):
+    """The tracked fields that were loaded, by field name; deferred fields are left out rather than fetched."""
+    return {
+        name: instance.__dict__[attname]
+        for name, attname in _attnames(type(instance))
+        if attname in instance.__dict__
+    }
+
+
+def _attnames(model):
+    return [(name, model._meta.get_field(name).attname) for name in TRACKED_FIELDS[model]]
+
+
+def _project_id(instance):
+    return instance.pk if isinstance(instance, Project) else instance.project_id
+
+
+def _committed(entries):
+    log = _current_log.get()
+    if log is None:
+        ActivityEntry.objects.bulk_create(entries)
+    else:
+        log.entries.extend(entries)
+
+
+def record(instance, action, changes):
+    """
+    Log a change to ``instance`` once the transaction it was made in commits.
+
+    Inside a request the entry joins the request's ActivityLog; a change made outside one (a
+    management command, the shell) is written on its own.
+    """
+    record_all([(instance, action, changes)])
+
+
+def record_all(changes):
+    """Log several ``(instance, action, changes)`` at once, as for rows changed by one QuerySet.update()."""
+    if _paused.get():
+        return
+    log = _current_log.get()
+    entries = [
+        ActivityEntry(
+            model=MODEL_NAMES[type(instance)],
+            object_id=instance.pk,
+            project_id=_project_id(instance),
+            actor_id=log.actor_id if log is not None else None,
+            action=action,
+            changes=instance_changes,
+        )
+        for instance, action, instance_changes in changes
+    ]
+    if entries:
+        transaction.on_commit(partial(_committed, entries))
+
+
+def record_saved(instance, created):
+    old = getattr(instance, '_activity_state', None) or {}
+    new = tracked_state(instance)
+    instance._activity_state = new
+    if created:
+        changes = {name: [None, value] for name, value in new.items() if value not in (None, '')}
+    else:
+        changes = {name: [old[name], value] for name, value in new.items() if name in old and old[name] != value}
+        if not changes:
+            return
+    record(instance, 'created' if created else 'updated', changes)
+
+
+def record_deleted(instance):
+    old = tracked_state(instance)
+    record(instance, 'deleted', {name: [value, None] for name, value in old.items() if value not in (None, '')})
+
+
+class ActivityMiddleware:
+    """Writes the activity a request recorded with a single INSERT once the response is ready."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with activity_log(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        log = ActivityLog(request)
+        token = _current_log.set(log)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_log.reset(token)
+            await sync_to_async(log.flush)()
@@ -0,0 +1,185 @@
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import DateField, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import ChatArchiveSegment, ProjectChatMessage
+
+
+# A segment holds a month of messages as compressed JSON, oldest first:
+# [[id, user_id, username, message, created_at], ...]
+
+
+def pack(entries):
+    return zlib.compress(json.dumps(entries, separators=(',', ':')).encode())
+
+
+def unpack(data):
+    # BinaryField values come back as memoryview on some backends.
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+def _key(entry):
+    return datetime.fromisoformat(entry[4]), entry[0]
+
+
+def _month_start(month):
+    return timezone.make_aware(datetime.combine(month, time()))
+
+
+def _next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def archive_cutoff(now=None):
+    """The start of the month CHAT_ARCHIVE_AGE ago; only whole months before it are archived."""
+    oldest = timezone.localtime((now or timezone.now()) - timedelta(seconds=settings.CHAT_ARCHIVE_AGE))
+    return _month_start(oldest.date().replace(day=1))
+
+
+def archive_month(project_id, month, batch_size):
+    """
+    Move a project's messages of ``month`` into its archive segment, in one transaction.
+
+    Messages that reach the month later (imported with their original dates) are merged into the
+    existing segment by the next run.
+    """
+    start, end = _month_start(month), _month_start(_next_month(month))
+    with transaction.atomic():
+        rows = list(
+            ProjectChatMessage.objects
+            .filter(project_id=project_id, created_at__gte=start, created_at__lt=end)
+            .order_by('created_at', 'pk')
+            .values_list('id', 'user_id', 'user__username', 'message', 'created_at')
+        )
+        if not rows:
+            return 0
+
+        segment = ChatArchiveSegment.objects.select_for_update().filter(project_id=project_id, month=month).first()
+        if segment is None:
+            segment = ChatArchiveSegment(project_id=project_id, month=month)
+            entries = []
+        else:
+            entries = unpack(segment.data)
+        entries += [
+            [pk, user_id, username, message, created_at.isoformat()]
+            for pk, user_id, username, message, created_at in rows
+        ]
+        entries.sort(key=_key)
+
+        ids = [entry[0] for entry in entries]
+        segment.data = pack(entries)
+        segment.message_count = len(entries)
+        segment.first_message_id, segment.last_message_id = min(ids), max(ids)
+        segment.first_created_at, segment.last_created_at = _key(entries[0])[0], _key(entries[-1])[0]
+        segment.save()
+
+        archived_ids = [row[0] for row in rows]
+        for i in range(0, len(archived_ids), batch_size):
+            ProjectChatMessage.objects.filter(pk__in=archived_ids[i:i + batch_size]).delete()
+    return len(rows)
+
+
+def archive_chat_messages(batch_size, now=None):
+    """Archive every whole month of chat older than CHAT_ARCHIVE_AGE; returns the number of messages moved."""
+    months = (
+        ProjectChatMessage.objects
+        .filter(created_at__lt=archive_cutoff(now), project__is_deleting=False)
+        .annotate(month=TruncMonth('created_at', output_field=DateField()))
+        .values_list('project_id', 'month')
+        .distinct()
+        .order_by('project_id', 'month')
+    )
+    return sum(archive_month(project_id, month, batch_size) for project_id, month in list(months))
+
+
+def iter_archived_entries(project):
+    """Every archived message of ``project`` as a segment entry, month by month, oldest first."""
+    segments = ChatArchiveSegment.objects.filter(project=project).order_by('month').values_list('pk', flat=True)
+    for pk in list(segments):
+        data = ChatArchiveSegment.objects.filter(pk=pk).values_list('data', flat=True).first()
+        if data is not None:
+            yield from unpack(data)
+
+
+def find_archived(project, message_id):
+    """The ``(created_at, pk)`` of an archived message, or None."""
+    segments = (
+        ChatArchiveSegment.objects
+        .filter(project=project, first_message_id__lte=message_id, last_message_id__gte=message_id)
+        .order_by('-month')
+        .values_list('data', flat=True)
+    )
+    for data in segments:
+        for entry in unpack(data):
+            if entry[0] == message_id:
+                return _key(entry)
+    return None
+
+
+def archived_messages(project, before, limit):
+    """
+    Up to ``limit`` archived messages of ``project`` older than ``before``, a ``(created_at, pk)`` pair
+    (None for the newest), newest first, as unsaved ProjectChatMessage instances.
+
+    Segments are read newest month first and only until the page is full.
+    """
+    segments = ChatArchiveSegment.objects.filter(project=project).order_by('-month')
+    if before is not None:
+        segments = segments.filter(first_created_at__lte=before[0])
+
+    entries = []
+    for pk in list(segments.values_list('pk', flat=True)):
+        data = ChatArchiveSegment.objects.filter(pk=pk).values_list('data', flat=True).first()
+        if data is None:
+            continue
+        older = [entry for entry in unpack(data) if before is None or _key(entry) < before]
+        entries += reversed(older)
+        if len(entries) >= limit:
+            break
+    entries = entries[:limit]
+
+    users = User.objects.in_bulk({entry[1] for entry in entries})
+    return [
+        ProjectChatMessage(
+            pk=pk, project=project, message=message, created_at=datetime.fromisoformat(created_at),
+            # A user deleted since keeps the name they had when the month was archived.
+            user=users.get(user_id) or User(pk=user_id, username=username),
+        )
+        for pk, user_id, username, message, created_at in entries
+    ]
+
+
+def complete_page(project, messages, page, before_id, limit):
+    """
+    Fill a page of chat history up to ``limit`` messages with archived ones.
+
+    ``page`` holds the live messages of ``messages`` older than ``before_id`` (None for the newest),
+    newest first, and is called for once it has come back short.
+    """
+    if not ChatArchiveSegment.objects.filter(project=project).exists():
+        return page
+
+    before = None
+    if before_id is not None:
+        live = ProjectChatMessage.objects.filter(pk=before_id, project=project)
+        before = live.values_list('created_at', 'pk').first()
+        if before is None:
+            before = find_archived(project, before_id)
+            if before is None:
+                return page
+            # The cursor itself is archived, which the live query could not look up; repeat it with its date.
+            created_at, pk = before
+            page = list(
+                messages.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+                .order_by('-created_at', '-pk')[:limit]
+            )
+
+    archived = archived_messages(project, before, limit)
+    return sorted(page + archived, key=lambda message: (message.created_at, message.pk), reverse=True)[:limit]
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .db_router import primary_reads
+
+
+USER_KEY = 'core:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(USER_KEY.format(user_id=user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose per-request user lookup is served from the cache.
+
+    The cached copy is dropped whenever the user is saved, so a new password (and with it the session
+    auth hash) or a deactivation takes effect on the next request.
+    """
+
+    def get_user(self, user_id):
+        key = USER_KEY.format(user_id=user_id)
+        user = cache.get(key)
+        if user is None:
+            # From the primary, so a changed password or deactivation is never cached back stale.
+            with primary_reads():
+                user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
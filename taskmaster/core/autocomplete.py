@@ -0,0 +1,65 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
+
+from .models import ProjectInvitation, ProjectMembership
+from .utils import get_project_versions
+
+
+# Username prefixes are matched through the case-insensitive indexes of migration 0016.
+
+AUTOCOMPLETE_KEY = 'core:user-autocomplete:{project_id}:{digest}'
+
+
+def _candidates(project, prefix, limit):
+    users = (
+        User.objects
+        .filter(is_active=True)
+        .exclude(pk=project.owner_id)
+        .exclude(Exists(ProjectMembership.objects.filter(project=project, user=OuterRef('pk'))))
+        .exclude(Exists(
+            ProjectInvitation.objects.filter(project=project, invited_user=OuterRef('pk'), is_accepted=False)
+        ))
+    )
+    if connection.vendor == 'postgresql':
+        # trigram_similar is registered by django.contrib.postgres, which settings_production installs.
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        # Prefix matches first, then names that merely look alike (typos, missing characters).
+        users = (
+            users.filter(Q(username__istartswith=prefix) | Q(username__trigram_similar=prefix))
+            .annotate(
+                is_prefix=Case(
+                    When(username__istartswith=prefix, then=Value(1)), default=Value(0), output_field=IntegerField(),
+                ),
+                similarity=TrigramSimilarity('username', prefix),
+            )
+            .order_by('-is_prefix', '-similarity', 'username')
+        )
+    else:
+        users = users.filter(username__istartswith=prefix).order_by('username')
+    return [{'id': user_id, 'username': username} for user_id, username in users.values_list('id', 'username')[:limit]]
+
+
+def suggest_users(project, prefix, limit):
+    """
+    Users that could be invited to ``project`` whose username starts with (or resembles) ``prefix``.
+
+    Results are cached under the project's version, which memberships and invitations bump, so hot
+    prefixes are served from the cache until someone joins or is invited.
+    """
+    prefix = prefix.strip()
+    if len(prefix) < settings.USER_AUTOCOMPLETE_MIN_LENGTH:
+        return []
+    version = get_project_versions([project.pk])[project.pk]
+    digest = hashlib.md5(repr((version, prefix.lower(), limit)).encode()).hexdigest()
+    key = AUTOCOMPLETE_KEY.format(project_id=project.pk, digest=digest)
+    results = cache.get(key)
+    if results is None:
+        results = _candidates(project, prefix, limit)
+        cache.set(key, results, settings.USER_AUTOCOMPLETE_CACHE_TIMEOUT)
+    return results
@@ -0,0 +1,107 @@
+import math
+import time
+
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import urls as core_urls
+from core.models import Project, ProjectChatMessage, ProjectMembership, Task
+from core.performance import iter_url_patterns
+
+
+# Views that change state on GET, never finish (streams and long polls) or need a one-off token.
+SKIPPED_VIEWS = {
+    'logout',
+    'accept_invitation',
+    'reject_invitation',
+    'delete_task_notification',
+    'project-chat-events',
+    'project-chat-messages',
+    'password_reset_confirm',
+    'task-bulk',
+}
+
+
+def _sample_objects(user):
+    project_ids = Project.objects.filter(Q(owner=user) | Q(members=user)).values_list('id', flat=True)
+    project = Project.objects.filter(owner=user).first() or Project.objects.filter(id__in=project_ids).first()
+    if project is None:
+        return None
+    return {
+        'project': project,
+        'task': Task.objects.filter(project=project).first(),
+        'membership': ProjectMembership.objects.filter(project=project).first(),
+        'message': ProjectChatMessage.objects.filter(project=project).first(),
+    }
+
+
+def _kwargs_for(name, pattern, samples):
+    kwargs = {}
+    for key in pattern.pattern.regex.groupindex:
+        if key == 'format':
+            return None
+        if key == 'pk':
+            if name.startswith(('task', 'api-task')):
+                sample = samples['task']
+            elif name.startswith('api-membership'):
+                sample = samples['membership']
+            elif name.startswith('api-chat-message'):
+                sample = samples['message']
+            else:
+                sample = samples['project']
+        elif key == 'project_id':
+            sample = samples['project']
+        elif key == 'user_id':
+            sample = samples['membership'] and samples['membership'].user
+        else:
+            return None
+        if sample is None:
+            return None
+        kwargs[key] = sample.pk
+    return kwargs
+
+
+def collect_view_urls(user):
+    """Every GET-safe named URL of core/urls.py, with kwargs taken from the user's own data."""
+    samples = _sample_objects(user)
+    if samples is None:
+        raise ValueError(f"{user.username} has no projects to benchmark against.")
+
+    urls = []
+    seen = set()
+    for pattern in iter_url_patterns(core_urls.urlpatterns):
+        name = pattern.name
+        if name in SKIPPED_VIEWS or name in seen:
+            continue
+        kwargs = _kwargs_for(name, pattern, samples)
+        if kwargs is None:
+            continue
+        seen.add(name)
+        urls.append((name, reverse(name, kwargs=kwargs)))
+    return urls
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def measure(client, url, iterations):
+    timings, query_counts, status_code = [], [], None
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(context.captured_queries))
+        status_code = response.status_code
+    return {
+        'status': status_code,
+        'p50': percentile(timings, 0.5),
+        'p95': percentile(timings, 0.95),
+        'queries': max(query_counts),
+        # Once the session, the user and the fragments are cached.
+        'warm_queries': min(query_counts),
+    }
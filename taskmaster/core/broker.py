@@ -0,0 +1,141 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, maxsize):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Subscribers re-read the database after every wake-up, so a dropped payload is never a lost message.
+            pass
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            pass
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class BaseBroker:
+    """Publish/subscribe channel between the code that saves chat messages and the clients waiting for them."""
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+
+class InMemoryBroker(BaseBroker):
+    """Delivers to subscribers of the current process; an idle subscriber costs one asyncio queue."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    @contextmanager
+    def subscribe(self, channel):
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscriptions[channel].discard(subscription)
+                if not self._subscriptions[channel]:
+                    del self._subscriptions[channel]
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscriptions.get(channel, ()))
+
+
+class RedisBroker(InMemoryBroker):
+    """
+    Carries messages between worker processes over Redis pub/sub, then fans them out in-process.
+
+    Each process holds one listening connection, opened by its first subscriber, on the single
+    CHAT_BROKER_CHANNEL; publish() goes through Redis even for subscribers of the same process, so
+    every process wakes up the same way. Messages published while the listener reconnects are
+    missed, which only delays their subscribers to the next keepalive or poll timeout.
+    """
+
+    reconnect_delay = 1
+
+    def __init__(self, queue_size=100):
+        import redis
+
+        super().__init__(queue_size)
+        self._redis = redis.Redis.from_url(settings.CHAT_BROKER_URL)
+        self._listener = None
+
+    def publish(self, channel, message):
+        self._redis.publish(settings.CHAT_BROKER_CHANNEL, json.dumps([channel, message]))
+
+    def subscribe(self, channel):
+        self._start_listener()
+        return super().subscribe(channel)
+
+    def _start_listener(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='chat-broker', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(settings.CHAT_BROKER_CHANNEL)
+                for item in pubsub.listen():
+                    channel, message = json.loads(item['data'])
+                    super().publish(channel, message)
+            except Exception:
+                logger.exception('Chat broker lost its Redis subscription; reconnecting')
+                time.sleep(self.reconnect_delay)
+            finally:
+                pubsub.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.CHAT_BROKER_BACKEND)()
+    return _broker
+
+
+def project_chat_channel(project_id):
+    return f'project-chat:{project_id}'
@@ -0,0 +1,38 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ConfirmationCode
+
+
+def delete_in_batches(queryset, batch_size):
+    """Delete matching rows a batch of primary keys at a time, each batch in its own short transaction."""
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if ids:
+                # Filtered again, so a row that stopped matching since it was selected survives.
+                _, per_model = queryset.filter(pk__in=ids).delete()
+                deleted += per_model.get(queryset.model._meta.label, 0)
+        if len(ids) < batch_size:
+            return deleted
+
+
+def purge_expired_confirmation_codes(batch_size):
+    return delete_in_batches(ConfirmationCode.objects.filter(expiration_time__lt=int(time.time())), batch_size)
+
+
+def purge_inactive_users(batch_size):
+    """Accounts that were registered but never confirmed, once INACTIVE_ACCOUNT_LIFETIME has passed."""
+    joined_before = timezone.now() - timedelta(seconds=settings.INACTIVE_ACCOUNT_LIFETIME)
+    stale = (
+        User.objects
+        .filter(is_active=False, last_login__isnull=True, date_joined__lt=joined_before)
+        .exclude(confirmations__expiration_time__gte=int(time.time()))
+    )
+    return delete_in_batches(stale, batch_size)
@@ -0,0 +1,15 @@
+from functools import cache
+
+from .notifications import get_unread_notification_count
+
+
+def notifications(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+
+    @cache
+    def unread_notifications():
+        return get_unread_notification_count(user.pk)
+
+    return {'unread_notifications': unread_notifications}
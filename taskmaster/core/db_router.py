@@ -0,0 +1,142 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+STICKY_COOKIE = 'primary_reads'
+STICKY_SALT = 'core.db_router'
+
+_current_routing = ContextVar('core_db_routing', default=None)
+
+
+class Routing:
+    """Where the reads of one request go: a replica, until it writes or if it has to see its user's last write."""
+
+    def __init__(self, use_primary=False):
+        self.use_primary = use_primary
+        self.wrote = False
+
+
+@contextmanager
+def replica_reads(use_primary=False):
+    """Let the reads made inside the block go to a replica; outside one, everything uses the primary."""
+    routing = Routing(use_primary)
+    token = _current_routing.set(routing)
+    try:
+        yield routing
+    finally:
+        _current_routing.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Send the reads made inside the block to the primary, for results cached past the request.
+
+    A cache entry rebuilt after its version was bumped must hold the new data; filled from a replica
+    that has not caught up yet, it would serve the old data under the new version to every user.
+    """
+    routing = _current_routing.get()
+    if routing is None or routing.use_primary:
+        yield
+        return
+    routing.use_primary = True
+    try:
+        yield
+    finally:
+        # A write inside the block keeps the rest of the request on the primary.
+        routing.use_primary = routing.wrote
+
+
+def primary_only(view):
+    """
+    Read the primary for the whole of a view that writes what it reads, even when it answers a GET.
+
+    The middleware only sends unsafe methods to the primary; a link that accepts an invitation would
+    otherwise look it up on a replica that may not have it yet, or act on a copy older than the row.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with primary_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Sends writes to the primary and, inside a request, reads to a random replica from DATABASE_REPLICAS.
+
+    Once a request writes, its remaining reads use the primary too, so it never reads back older data
+    than it has just written. Management commands and workers run outside requests and read from the
+    primary, since they act on what they read.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _current_routing.get()
+        if routing is None or routing.use_primary or not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        routing = _current_routing.get()
+        if routing is not None:
+            routing.use_primary = routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Opens replica reads for each request, and keeps a user on the primary for REPLICA_STICKY_SECONDS
+    after a request of theirs wrote, so the page a POST redirects to shows the change even while the
+    replicas lag behind.
+
+    The window travels in a signed, timestamped cookie rather than the session, which would cost a
+    write of its own.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replica_reads(self.use_primary(request)) as routing:
+            response = self.get_response(request)
+        return self.finish(response, routing)
+
+    async def __acall__(self, request):
+        with replica_reads(self.use_primary(request)) as routing:
+            response = await self.get_response(request)
+        return self.finish(response, routing)
+
+    def use_primary(self, request):
+        # A request that is going to write reads what it modifies from the primary as well.
+        if request.method not in SAFE_METHODS:
+            return True
+        return request.get_signed_cookie(
+            STICKY_COOKIE, default=None, salt=STICKY_SALT, max_age=settings.REPLICA_STICKY_SECONDS,
+        ) is not None
+
+    def finish(self, response, routing):
+        if routing.wrote and settings.DATABASE_REPLICAS:
+            response.set_signed_cookie(
+                STICKY_COOKIE, '1', salt=STICKY_SALT, max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
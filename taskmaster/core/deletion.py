@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, When
+
+from .activity import activity_paused, record_all
+from .cleanup import delete_in_batches
+from .models import (
+    ActivityEntry, ChatArchiveSegment, Project, ProjectChatMessage, ProjectInvitation, ProjectMembership, Task,
+)
+from .stats import touch_project_stats
+from .utils import bump_project_version, invalidate_project_access
+
+
+def request_project_deletion(project):
+    """Hide the project from everyone at once; delete_pending_projects removes it and its rows later."""
+    Project.objects.filter(pk=project.pk).update(is_deleting=True)
+    user_ids = {project.owner_id, *ProjectMembership.objects.filter(project=project).values_list('user_id', flat=True)}
+    for user_id in user_ids:
+        transaction.on_commit(lambda user_id=user_id: invalidate_project_access(user_id))
+    transaction.on_commit(lambda: bump_project_version(project.pk))
+
+
+def _detach_tasks(project_id, batch_size):
+    # Tasks outlive their project as personal tasks, as Task.project's on_delete=SET_NULL has it.
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Task.objects.select_for_update().filter(project_id=project_id).values_list('pk', flat=True)[:batch_size]
+            )
+            Task.objects.filter(pk__in=ids, project_id=project_id).update(project=None)
+            record_all([(Task(pk=pk), 'updated', {'project': [project_id, None]}) for pk in ids])
+        if len(ids) < batch_size:
+            return
+
+
+def _delete_activity(project_id, batch_size):
+    # The history of the project and its memberships goes with it; that of its tasks stays with the tasks.
+    delete_in_batches(
+        ActivityEntry.objects.filter(project_id=project_id, model__in=('project', 'membership')), batch_size,
+    )
+    while True:
+        with transaction.atomic():
+            ids = list(ActivityEntry.objects.filter(project_id=project_id).values_list('pk', flat=True)[:batch_size])
+            ActivityEntry.objects.filter(pk__in=ids).update(project=None)
+        if len(ids) < batch_size:
+            return
+
+
+def delete_project(project_id, batch_size):
+    """
+    Delete a project marked for deletion, its largest children first, each batch in its own transaction.
+
+    By the time the project row itself goes, the cascade has nothing left to load, so no transaction
+    holds more than ``batch_size`` rows of a child table.
+    """
+    delete_in_batches(ProjectChatMessage.objects.filter(project_id=project_id), batch_size)
+    delete_in_batches(ChatArchiveSegment.objects.filter(project_id=project_id), batch_size)
+    delete_in_batches(ProjectInvitation.objects.filter(project_id=project_id), batch_size)
+    _detach_tasks(project_id, batch_size)
+    with activity_paused():
+        delete_in_batches(ProjectMembership.objects.filter(project_id=project_id), batch_size)
+        _delete_activity(project_id, batch_size)
+        with transaction.atomic():
+            Project.objects.filter(pk=project_id, is_deleting=True).delete()
+
+
+def delete_pending_projects(batch_size):
+    project_ids = list(Project.objects.filter(is_deleting=True).order_by('pk').values_list('pk', flat=True))
+    for project_id in project_ids:
+        delete_project(project_id, batch_size)
+    return len(project_ids)
+
+
+def remove_participants(project, user_ids):
+    """
+    Remove members from a project, handing their tasks in it over to the owner.
+
+    Ownership and assignment move in one UPDATE whatever the number of members removed.
+    """
+    user_ids = set(user_ids) - {project.owner_id}
+    with transaction.atomic():
+        tasks = Task.objects.filter(Q(owner__in=user_ids) | Q(assigned_to__in=user_ids), project=project)
+        handed_over = list(tasks.select_for_update().values_list('pk', 'owner_id', 'assigned_to_id'))
+        tasks.update(
+            owner=Case(
+                When(owner__in=user_ids, then=project.owner_id), default=F('owner'), output_field=IntegerField(),
+            ),
+            assigned_to=Case(
+                When(assigned_to__in=user_ids, then=project.owner_id), default=F('assigned_to'),
+                output_field=IntegerField(),
+            ),
+        )
+        record_all([
+            (Task(pk=pk, project_id=project.pk), 'updated', {
+                field: [user_id, project.owner_id]
+                for field, user_id in (('owner', owner_id), ('assigned_to', assigned_to_id)) if user_id in user_ids
+            })
+            for pk, owner_id, assigned_to_id in handed_over
+        ])
+        removed, _ = ProjectMembership.objects.filter(project=project, user__in=user_ids).delete()
+        touch_project_stats(project.pk)
+    return removed
@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.archive import archive_chat_messages
+
+
+class Command(BaseCommand):
+    help = "Move whole months of chat older than CHAT_ARCHIVE_AGE into compressed archive segments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.CHAT_ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=3600, help="Seconds to sleep between sweeps.")
+        parser.add_argument('--once', action='store_true', help="Sweep once and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            archived = archive_chat_messages(options['batch_size'])
+            if archived or options['once']:
+                self.stdout.write(f"Archived {archived} chat messages.")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,84 @@
+import threading
+import time
+from urllib.parse import urljoin
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import percentile
+
+
+DEFAULT_PATHS = ['/', '/projects/', '/tasks/', '/notifications/']
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the throughput of a running server over HTTP, e.g. runserver against gunicorn "
+        "with taskmaster.settings_production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL of the server.")
+        parser.add_argument('--username', help="Log in as this user before benchmarking.")
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--path', action='append', dest='paths', help="Path to request; may be repeated.")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=15, help="Seconds to run for.")
+
+    def login(self, base_url, username, password):
+        session = requests.Session()
+        login_url = urljoin(base_url, '/login/')
+        session.get(login_url).raise_for_status()
+        response = session.post(login_url, allow_redirects=False, data={
+            'username': username,
+            'password': password,
+            'csrfmiddlewaretoken': session.cookies.get('csrftoken', ''),
+        })
+        if response.status_code != 302 or 'sessionid' not in session.cookies:
+            raise CommandError(f"Could not log in as {username}.")
+        return session.cookies
+
+    def handle(self, *args, **options):
+        base_url = options['url']
+        paths = options['paths'] or DEFAULT_PATHS
+        cookies = self.login(base_url, options['username'], options['password']) if options['username'] else None
+
+        timings, errors = [], []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def worker(offset):
+            session = requests.Session()
+            if cookies is not None:
+                session.cookies.update(cookies)
+            local_timings, local_errors, i = [], 0, offset
+            while time.perf_counter() < deadline:
+                url = urljoin(base_url, paths[i % len(paths)])
+                i += 1
+                started = time.perf_counter()
+                try:
+                    response = session.get(url, allow_redirects=False)
+                    failed = response.status_code >= 500
+                except requests.RequestException:
+                    failed = True
+                local_timings.append((time.perf_counter() - started) * 1000)
+                local_errors += failed
+            with lock:
+                timings.extend(local_timings)
+                errors.append(local_errors)
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(options['concurrency'])]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if not timings:
+            raise CommandError("No requests completed.")
+        self.stdout.write(
+            f"{len(timings)} requests in {elapsed:.1f}s with {options['concurrency']} clients: "
+            f"{len(timings) / elapsed:.1f} req/s, p50 {percentile(timings, 0.5):.1f} ms, "
+            f"p95 {percentile(timings, 0.95):.1f} ms, {sum(errors)} errors"
+        )
@@ -0,0 +1,50 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from core.benchmark import collect_view_urls, measure
+
+
+class Command(BaseCommand):
+    help = "Request every view of core/urls.py through the test client and report latency and SQL query counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username to log in as. Defaults to the owner of the first project.")
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(owned_projects__isnull=False).order_by('id').first()
+        if user is None:
+            raise CommandError("No user to benchmark with; run seed_data first or pass --user.")
+
+        try:
+            urls = collect_view_urls(user)
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        client = Client()
+        client.force_login(user)
+
+        results = []
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, url in urls:
+                results.append({'view': name, 'url': url, **measure(client, url, options['iterations'])})
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"Benchmarked as {user.username}, {options['iterations']} requests per view.")
+        self.stdout.write(f"{'view':<28} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'warm':>5}")
+        for result in results:
+            self.stdout.write(
+                f"{result['view']:<28} {result['status']:>6} {result['p50']:>9.2f} {result['p95']:>9.2f} "
+                f"{result['queries']:>8} {result['warm_queries']:>5}"
+            )
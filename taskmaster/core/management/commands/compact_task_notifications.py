@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.cleanup import delete_in_batches
+from core.notifications import duplicate_task_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete duplicate task notifications, keeping the newest for each task, user and kind. "
+        "Run it before migrating a large table; the migration adding the uniqueness constraint "
+        "does the same in a single transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # Deleted through the ORM, so the post_delete signal keeps the unread counters right.
+        deleted = delete_in_batches(duplicate_task_notifications(), options['batch_size'])
+        self.stdout.write(f"Deleted {deleted} duplicate task notifications.")
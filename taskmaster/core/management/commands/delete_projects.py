@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.deletion import delete_pending_projects
+
+
+class Command(BaseCommand):
+    help = "Remove the projects their owners deleted, along with their rows, in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.PROJECT_DELETION_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=10, help="Seconds to sleep between sweeps.")
+        parser.add_argument('--once', action='store_true', help="Sweep once and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = delete_pending_projects(options['batch_size'])
+            if deleted or options['once']:
+                self.stdout.write(f"Deleted {deleted} projects.")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
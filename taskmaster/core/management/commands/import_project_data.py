@@ -0,0 +1,38 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Project
+from core.transfer import FORMATS, KINDS, import_rows, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import tasks or chat messages into a project from a CSV or NDJSON file, as written by the export view."
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int)
+        parser.add_argument('path', help="File to read, or - for standard input.")
+        parser.add_argument('--kind', choices=KINDS, default='tasks')
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=settings.IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        project = Project.objects.filter(pk=options['project_id'], is_deleting=False).first()
+        if project is None:
+            raise CommandError(f"Project {options['project_id']} does not exist.")
+
+        path = options['path']
+        file_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        lines = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            imported, errors = import_rows(
+                project, options['kind'], read_rows(lines, file_format), options['batch_size'],
+            )
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+
+        for line_number, row_errors in errors:
+            self.stderr.write(f"Line {line_number}: {row_errors}")
+        self.stdout.write(f"Imported {imported} {options['kind']}, skipped {len(errors)} invalid rows.")
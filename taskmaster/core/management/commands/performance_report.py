@@ -0,0 +1,32 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.performance import get_histograms
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the rolling per-view request duration histograms recorded by PerformanceMiddleware. "
+        "Needs a cache shared with the app server processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help="Print the histograms as JSON.")
+
+    def handle(self, *args, **options):
+        histograms = get_histograms()
+        if options['json']:
+            self.stdout.write(json.dumps(histograms, indent=2))
+            return
+
+        minutes = settings.PERF_HISTOGRAM_WINDOW * settings.PERF_HISTOGRAM_WINDOWS // 60
+        self.stdout.write(f"Requests over the last {minutes} minutes, by duration in ms:")
+        bounds = [str(bound) for bound in settings.PERF_HISTOGRAM_BUCKETS] + ['inf']
+        self.stdout.write(f"{'view':<28} {'count':>7} {'queries':>8} " + ' '.join(f"{'<=' + b:>7}" for b in bounds))
+        for view, histogram in sorted(histograms.items(), key=lambda item: -item[1]['count']):
+            self.stdout.write(
+                f"{view:<28} {histogram['count']:>7} {histogram['avg_queries']:>8} "
+                + ' '.join(f"{histogram['buckets'][b]:>7}" for b in bounds)
+            )
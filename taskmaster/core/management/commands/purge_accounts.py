@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.cleanup import purge_expired_confirmation_codes, purge_inactive_users
+
+
+class Command(BaseCommand):
+    help = "Delete expired confirmation codes and accounts that were never activated, in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.ACCOUNT_PURGE_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=3600, help="Seconds to sleep between sweeps.")
+        parser.add_argument('--once', action='store_true', help="Sweep once and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            codes = purge_expired_confirmation_codes(options['batch_size'])
+            users = purge_inactive_users(options['batch_size'])
+            self.stdout.write(f"Removed {codes} expired confirmation codes and {users} inactive accounts.")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
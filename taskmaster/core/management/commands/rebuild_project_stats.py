@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Project
+from core.stats import rebuild_project_stats
+
+
+class Command(BaseCommand):
+    help = "Recount the task statistics of every project from the task table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        project_ids = list(Project.objects.values_list('pk', flat=True))
+        rebuild_project_stats(project_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the stats of {len(project_ids)} projects."))
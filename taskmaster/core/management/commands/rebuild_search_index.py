@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreate the full-text search index and its triggers, then reindex every task and chat message. "
+        "migrate already repairs the SQLite triggers when a migration has remade their tables."
+    )
+
+    def handle(self, *args, **options):
+        install_search_index()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
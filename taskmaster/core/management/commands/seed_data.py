@@ -0,0 +1,135 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    Project, ProjectChatMessage, ProjectInvitation, ProjectMembership, Task, TaskAssignmentNotification,
+)
+from core.notifications import rebuild_notification_counters
+from core.stats import rebuild_project_stats
+
+
+class Command(BaseCommand):
+    help = "Seed the database with a synthetic dataset using bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--projects', type=int, default=20)
+        parser.add_argument('--members', type=int, default=5, help="Members per project besides the owner.")
+        parser.add_argument('--tasks', type=int, default=200, help="Tasks per project.")
+        parser.add_argument('--personal-tasks', type=int, default=10, help="Tasks without a project per user.")
+        parser.add_argument('--messages', type=int, default=500, help="Chat messages per project.")
+        parser.add_argument('--invitations', type=int, default=50, help="Pending invitations in total.")
+        parser.add_argument('--prefix', default='seed', help="Prefix for generated usernames.")
+        parser.add_argument('--password', default='password', help="Password of every generated user.")
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['random_seed'])
+        batch_size = options['batch_size']
+        prefix = options['prefix']
+        now = timezone.now()
+
+        with transaction.atomic():
+            password = make_password(options['password'])
+            users = User.objects.bulk_create([
+                User(
+                    username=f'{prefix}_user_{i}',
+                    email=f'{prefix}_user_{i}@example.com',
+                    first_name='Seed',
+                    last_name=f'User {i}',
+                    password=password,
+                )
+                for i in range(options['users'])
+            ], batch_size=batch_size)
+
+            projects = Project.objects.bulk_create([
+                Project(title=f'{prefix} project {i}', description=f'Synthetic project {i}', owner=rng.choice(users))
+                for i in range(options['projects'])
+            ], batch_size=batch_size)
+
+            memberships = []
+            participants = {}
+            for project in projects:
+                candidates = [user for user in users if user.pk != project.owner_id]
+                members = rng.sample(candidates, min(options['members'], len(candidates)))
+                participants[project.pk] = [project.owner] + members
+                memberships += [
+                    ProjectMembership(project=project, user=user, role=rng.choice(['viewer', 'editor']))
+                    for user in members
+                ]
+            ProjectMembership.objects.bulk_create(memberships, batch_size=batch_size)
+
+            statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+            priorities = [choice for choice, _ in Task.PRIORITY_CHOICES]
+
+            def due_date():
+                return now + timedelta(minutes=rng.randint(-30 * 24 * 60, 60 * 24 * 60))
+
+            tasks = []
+            for project in projects:
+                for i in range(options['tasks']):
+                    tasks.append(Task(
+                        title=f'Task {i} of {project.title}',
+                        description=f'Synthetic task {i}',
+                        due_date=due_date(),
+                        priority=rng.choice(priorities),
+                        status=rng.choice(statuses),
+                        project=project,
+                        assigned_to=rng.choice(participants[project.pk] + [None]),
+                        owner=project.owner,
+                    ))
+            for user in users:
+                for i in range(options['personal_tasks']):
+                    tasks.append(Task(
+                        title=f'Personal task {i} of {user.username}',
+                        due_date=due_date(),
+                        priority=rng.choice(priorities),
+                        status=rng.choice(statuses),
+                        assigned_to=user,
+                        owner=user,
+                    ))
+            tasks = Task.objects.bulk_create(tasks, batch_size=batch_size)
+
+            notifications = TaskAssignmentNotification.objects.bulk_create([
+                TaskAssignmentNotification(task=task, user_id=task.assigned_to_id)
+                for task in tasks
+                if task.project_id and task.assigned_to_id
+            ], batch_size=batch_size)
+
+            messages = ProjectChatMessage.objects.bulk_create([
+                ProjectChatMessage(project=project, user=rng.choice(participants[project.pk]), message=f'Message {i}')
+                for project in projects
+                for i in range(options['messages'])
+            ], batch_size=batch_size)
+
+            invitations = []
+            invited = set()
+            for _ in range(options['invitations']):
+                if not projects:
+                    break
+                project = rng.choice(projects)
+                user = rng.choice(users)
+                if user in participants[project.pk] or (project.pk, user.pk) in invited:
+                    continue
+                invited.add((project.pk, user.pk))
+                invitations.append(ProjectInvitation(
+                    project=project, invited_user=user, inviter=project.owner, role=rng.choice(['viewer', 'editor'])
+                ))
+            ProjectInvitation.objects.bulk_create(invitations, batch_size=batch_size)
+
+            # bulk_create skips the signals that maintain the counters and project stats.
+            rebuild_notification_counters([user.pk for user in users], batch_size=batch_size)
+            rebuild_project_stats([project.pk for project in projects], batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(users)} users, {len(projects)} projects, {len(memberships)} memberships, "
+            f"{len(tasks)} tasks, {len(notifications)} task notifications, {len(messages)} chat messages "
+            f"and {len(invitations)} invitations."
+        ))
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = "Notify assignees of tasks that are due within TASK_REMINDER_LEAD_TIME."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.TASK_REMINDER_BATCH_SIZE)
+        parser.add_argument(
+            '--window', type=int, default=settings.TASK_REMINDER_WINDOW,
+            help="Seconds of upcoming reminders to load at a time.",
+        )
+        parser.add_argument('--once', action='store_true', help="Send the reminders that are due and exit.")
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler(window=options['window'], batch_size=options['batch_size'])
+        while True:
+            emitted, wait = scheduler.step()
+            if emitted or options['once']:
+                self.stdout.write(f"Sent {emitted} task reminders.")
+            if options['once']:
+                break
+            time.sleep(wait)
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-18 02:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_task_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectchatmessage',
+            index=models.Index(fields=['project', 'created_at'], name='core_chat_proj_created_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.7 on 2026-10-18 02:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counters(apps, schema_editor):
+    NotificationCounter = apps.get_model('core', 'NotificationCounter')
+    ProjectInvitation = apps.get_model('core', 'ProjectInvitation')
+    TaskAssignmentNotification = apps.get_model('core', 'TaskAssignmentNotification')
+
+    counters = {}
+    pending = ProjectInvitation.objects.filter(is_accepted=False).values('invited_user').annotate(count=Count('id'))
+    for row in pending:
+        counters.setdefault(row['invited_user'], NotificationCounter(user_id=row['invited_user'])).pending_invitations = row['count']
+    for row in TaskAssignmentNotification.objects.values('user').annotate(count=Count('id')):
+        counters.setdefault(row['user'], NotificationCounter(user_id=row['user'])).task_notifications = row['count']
+    NotificationCounter.objects.bulk_create(counters.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0010_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('pending_invitations', models.PositiveIntegerField(default=0)),
+                ('task_notifications', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
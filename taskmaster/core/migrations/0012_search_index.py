@@ -0,0 +1,101 @@
+from django.db import migrations
+
+
+# The search index as this migration creates it; core.search holds the live copy used by
+# rebuild_search_index and the post_migrate repair.
+
+SQLITE_INSTALL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS core_task_fts USING fts5(
+        title, description, content='core_task', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS core_task_fts_insert AFTER INSERT ON core_task BEGIN
+        INSERT INTO core_task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_task_fts_delete AFTER DELETE ON core_task BEGIN
+        INSERT INTO core_task_fts(core_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_task_fts_update AFTER UPDATE OF title, description ON core_task BEGIN
+        INSERT INTO core_task_fts(core_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO core_task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    "INSERT INTO core_task_fts(core_task_fts) VALUES ('rebuild')",
+
+    """CREATE VIRTUAL TABLE IF NOT EXISTS core_chat_fts USING fts5(
+        message, content='core_projectchatmessage', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS core_chat_fts_insert AFTER INSERT ON core_projectchatmessage BEGIN
+        INSERT INTO core_chat_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_chat_fts_delete AFTER DELETE ON core_projectchatmessage BEGIN
+        INSERT INTO core_chat_fts(core_chat_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_chat_fts_update AFTER UPDATE OF message ON core_projectchatmessage BEGIN
+        INSERT INTO core_chat_fts(core_chat_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO core_chat_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+    "INSERT INTO core_chat_fts(core_chat_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS core_task_fts_insert",
+    "DROP TRIGGER IF EXISTS core_task_fts_delete",
+    "DROP TRIGGER IF EXISTS core_task_fts_update",
+    "DROP TABLE IF EXISTS core_task_fts",
+    "DROP TRIGGER IF EXISTS core_chat_fts_insert",
+    "DROP TRIGGER IF EXISTS core_chat_fts_delete",
+    "DROP TRIGGER IF EXISTS core_chat_fts_update",
+    "DROP TABLE IF EXISTS core_chat_fts",
+]
+
+POSTGRESQL_INSTALL = [
+    """ALTER TABLE core_task ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS core_task_search_idx ON core_task USING GIN (search_vector)",
+    """ALTER TABLE core_projectchatmessage ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(message, ''))
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS core_chat_search_idx ON core_projectchatmessage USING GIN (search_vector)",
+]
+
+POSTGRESQL_UNINSTALL = [
+    "DROP INDEX IF EXISTS core_task_search_idx",
+    "ALTER TABLE core_task DROP COLUMN IF EXISTS search_vector",
+    "DROP INDEX IF EXISTS core_chat_search_idx",
+    "ALTER TABLE core_projectchatmessage DROP COLUMN IF EXISTS search_vector",
+]
+
+
+STATEMENTS = {
+    'sqlite': (SQLITE_INSTALL, SQLITE_UNINSTALL),
+    'postgresql': (POSTGRESQL_INSTALL, POSTGRESQL_UNINSTALL),
+}
+
+
+def _run(schema_editor, install):
+    install_statements, uninstall_statements = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in install_statements if install else uninstall_statements:
+        schema_editor.execute(statement, params=None)
+
+
+def install(apps, schema_editor):
+    _run(schema_editor, install=True)
+
+
+def uninstall(apps, schema_editor):
+    _run(schema_editor, install=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_notificationcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='confirmationcode',
+            index=models.Index(fields=['expiration_time'], name='core_confirm_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_stats(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    ProjectStats = apps.get_model('core', 'ProjectStats')
+    Task = apps.get_model('core', 'Task')
+
+    stats = {project_id: ProjectStats(project_id=project_id) for project_id in Project.objects.values_list('id', flat=True)}
+    counts = Task.objects.filter(project__isnull=False).values_list('project_id', 'status', 'priority').annotate(count=Count('id'))
+    for project_id, status, priority, count in counts:
+        setattr(stats[project_id], f'{status}_{priority}', count)
+    ProjectStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_confirmation_code_expiry_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStats',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.project')),
+                ('todo_low', models.PositiveIntegerField(default=0)),
+                ('todo_medium', models.PositiveIntegerField(default=0)),
+                ('todo_high', models.PositiveIntegerField(default=0)),
+                ('in_progress_low', models.PositiveIntegerField(default=0)),
+                ('in_progress_medium', models.PositiveIntegerField(default=0)),
+                ('in_progress_high', models.PositiveIntegerField(default=0)),
+                ('done_low', models.PositiveIntegerField(default=0)),
+                ('done_medium', models.PositiveIntegerField(default=0)),
+                ('done_high', models.PositiveIntegerField(default=0)),
+                ('overdue', models.PositiveIntegerField(default=0)),
+                ('overdue_valid_until', models.DateTimeField(blank=True, null=True)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_projectstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('position', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='taskassignmentnotification',
+            name='kind',
+            field=models.CharField(choices=[('assigned', 'Assigned'), ('due_soon', 'Due soon')], default='assigned', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['due_date'], name='core_task_due_idx'),
+        ),
+    ]
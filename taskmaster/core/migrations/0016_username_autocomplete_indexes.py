@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import migrations
+
+
+# Indexes for case-insensitive username prefixes, matching what Django emits for __istartswith.
+# SQLite: LIKE is case-insensitive, so it can only use an index built with NOCASE.
+# PostgreSQL: UPPER(...) LIKE 'P%' uses a text_pattern_ops index; pg_trgm adds fuzzy matching.
+
+SQLITE_INSTALL = [
+    "CREATE INDEX IF NOT EXISTS core_user_username_nocase_idx ON auth_user (username COLLATE NOCASE)",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP INDEX IF EXISTS core_user_username_nocase_idx",
+]
+
+POSTGRESQL_INSTALL = [
+    "CREATE INDEX IF NOT EXISTS core_user_username_upper_idx ON auth_user (UPPER(username::text) text_pattern_ops)",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS core_user_username_trgm_idx ON auth_user USING GIN (username gin_trgm_ops)",
+]
+
+POSTGRESQL_UNINSTALL = [
+    "DROP INDEX IF EXISTS core_user_username_trgm_idx",
+    "DROP INDEX IF EXISTS core_user_username_upper_idx",
+]
+
+STATEMENTS = {
+    'sqlite': (SQLITE_INSTALL, SQLITE_UNINSTALL),
+    'postgresql': (POSTGRESQL_INSTALL, POSTGRESQL_UNINSTALL),
+}
+
+
+def _run(schema_editor, install):
+    install_statements, uninstall_statements = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in install_statements if install else uninstall_statements:
+        schema_editor.execute(statement, params=None)
+
+
+def install(apps, schema_editor):
+    _run(schema_editor, install=True)
+
+
+def uninstall(apps, schema_editor):
+    _run(schema_editor, install=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_task_reminders'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_username_autocomplete_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='is_deleting',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_deleting', True)), fields=['id'], name='core_project_deleting_idx'),
+        ),
+    ]
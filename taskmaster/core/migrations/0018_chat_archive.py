@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_project_deletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('message_count', models.PositiveIntegerField()),
+                ('first_message_id', models.BigIntegerField()),
+                ('last_message_id', models.BigIntegerField()),
+                ('first_created_at', models.DateTimeField()),
+                ('last_created_at', models.DateTimeField()),
+                ('data', models.BinaryField()),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_archive_segments', to='core.project')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='chatarchivesegment',
+            constraint=models.UniqueConstraint(fields=('project', 'month'), name='core_chat_archive_month_uniq'),
+        ),
+    ]
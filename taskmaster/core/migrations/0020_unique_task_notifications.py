@@ -0,0 +1,43 @@
+# Generated by Django 5.0.7 on 2026-10-18 03:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Subquery
+
+
+def compact_notifications(apps, schema_editor):
+    # The same as the compact_task_notifications command, which large tables should run beforehand.
+    TaskAssignmentNotification = apps.get_model('core', 'TaskAssignmentNotification')
+    NotificationCounter = apps.get_model('core', 'NotificationCounter')
+
+    newer = TaskAssignmentNotification.objects.filter(
+        task=OuterRef('task'), user=OuterRef('user'), kind=OuterRef('kind'), pk__gt=OuterRef('pk'),
+    )
+    duplicates = TaskAssignmentNotification.objects.filter(Exists(newer))
+    user_ids = set(duplicates.values_list('user_id', flat=True))
+    if not user_ids:
+        return
+    TaskAssignmentNotification.objects.filter(pk__in=list(duplicates.values_list('pk', flat=True))).delete()
+
+    # Historical models send no signals, so the counters of the users concerned are recounted.
+    remaining = (
+        TaskAssignmentNotification.objects.filter(user=OuterRef('user'))
+        .order_by().values('user').annotate(count=Count('pk')).values('count')
+    )
+    NotificationCounter.objects.filter(user_id__in=user_ids).update(task_notifications=Subquery(remaining))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_activity_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(compact_notifications, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='taskassignmentnotification',
+            constraint=models.UniqueConstraint(fields=('task', 'user', 'kind'), name='core_task_notification_uniq'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-18 04:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_unique_task_notifications'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='taskassignmentnotification',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='core_task_notification_recent'),
+        ),
+    ]
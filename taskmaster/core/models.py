@@ -1,5 +1,7 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 import uuid
 import time
@@ -18,6 +20,13 @@ class Project(models.Model):
     description = models.TextField()
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='owned_projects')
     members = models.ManyToManyField(User, through='ProjectMembership', related_name='projects')
+    # Set when the owner deletes the project; it is hidden at once and removed by the delete_projects worker.
+    is_deleting = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(is_deleting=True), name='core_project_deleting_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -70,15 +79,78 @@ class Task(models.Model):
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="tasks")
     owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'due_date'], name='core_task_proj_due_idx'),
+            models.Index(fields=['project', 'status', 'priority', 'due_date'], name='core_task_proj_stat_prio_idx'),
+            models.Index(fields=['project', 'priority', 'due_date'], name='core_task_proj_prio_due_idx'),
+            models.Index(
+                fields=['assigned_to', 'due_date'],
+                condition=models.Q(project__isnull=True),
+                name='core_task_personal_due_idx',
+            ),
+            models.Index(fields=['due_date'], name='core_task_due_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.get_priority_display()} - {self.get_status_display()}"
 
 
+class ProjectStats(models.Model):
+    """Task counts of a project by status and priority, kept up to date by core.stats."""
+
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    todo_low = models.PositiveIntegerField(default=0)
+    todo_medium = models.PositiveIntegerField(default=0)
+    todo_high = models.PositiveIntegerField(default=0)
+    in_progress_low = models.PositiveIntegerField(default=0)
+    in_progress_medium = models.PositiveIntegerField(default=0)
+    in_progress_high = models.PositiveIntegerField(default=0)
+    done_low = models.PositiveIntegerField(default=0)
+    done_medium = models.PositiveIntegerField(default=0)
+    done_high = models.PositiveIntegerField(default=0)
+    # Overdue depends on the clock, so it is recounted once overdue_valid_until passes or a write clears it.
+    overdue = models.PositiveIntegerField(default=0)
+    overdue_valid_until = models.DateTimeField(null=True, blank=True)
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    @staticmethod
+    def field_name(status, priority):
+        return f'{status}_{priority}'
+
+    def count(self, status=None, priority=None):
+        return sum(
+            getattr(self, self.field_name(task_status, task_priority))
+            for task_status, _ in Task.STATUS_CHOICES if status in (None, task_status)
+            for task_priority, _ in Task.PRIORITY_CHOICES if priority in (None, task_priority)
+        )
+
+    @property
+    def total(self):
+        return self.count()
+
+    @property
+    def by_status(self):
+        return [(label, self.count(status=status)) for status, label in Task.STATUS_CHOICES]
+
+    @property
+    def by_priority(self):
+        return [(label, self.count(priority=priority)) for priority, label in Task.PRIORITY_CHOICES]
+
+    def __str__(self):
+        return f"Stats of project {self.project_id}: {self.total} tasks, {self.overdue} overdue"
+
+
 class ConfirmationCode(BaseModel):
     code = models.UUIDField(default=uuid.uuid4, unique=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="confirmations")
     expiration_time = models.IntegerField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['expiration_time'], name='core_confirm_expires_idx'),
+        ]
+
     def is_expired(self):
         return time.time() > self.expiration_time
 
@@ -89,15 +161,151 @@ class ProjectChatMessage(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'created_at'], name='core_chat_proj_created_idx'),
+        ]
+
     def __str__(self):
         return f"Message by {self.user.username} on {self.created_at}"
 
 
+class ChatArchiveSegment(models.Model):
+    """A month of a project's chat, moved out of ProjectChatMessage as zlib-compressed JSON."""
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="chat_archive_segments")
+    month = models.DateField()
+    message_count = models.PositiveIntegerField()
+    first_message_id = models.BigIntegerField()
+    last_message_id = models.BigIntegerField()
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'month'], name='core_chat_archive_month_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id}: {self.month:%Y-%m} ({self.message_count} messages)"
+
+
 class TaskAssignmentNotification(models.Model):
+    KIND_CHOICES = [
+        ('assigned', 'Assigned'),
+        ('due_soon', 'Due soon'),
+    ]
+
     task = models.ForeignKey(Task, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_notifications')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='assigned')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'user', 'kind'], name='core_task_notification_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='core_task_notification_recent'),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user.username} about task {self.task.title}"
-    
\ No newline at end of file
+    
+
+class NotificationCounter(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    pending_invitations = models.PositiveIntegerField(default=0)
+    task_notifications = models.PositiveIntegerField(default=0)
+
+    @property
+    def total(self):
+        return self.pending_invitations + self.task_notifications
+
+    def __str__(self):
+        return f"{self.user_id}: {self.pending_invitations} invitations, {self.task_notifications} task notifications"
+
+
+class SchedulerWatermark(models.Model):
+    """How far a periodic job has got; everything up to ``position`` has been handled."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
+
+
+class ActivityEntry(models.Model):
+    """
+    An append-only record of a change to a task, project or membership.
+
+    ``changes`` maps each field that changed to ``[old, new]``. The foreign keys carry no database
+    constraint, so an entry flushed after its project or actor was deleted in the same request still
+    goes in.
+    """
+
+    MODEL_CHOICES = [
+        ('task', 'Task'),
+        ('project', 'Project'),
+        ('membership', 'Membership'),
+    ]
+
+    ACTION_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('deleted', 'Deleted'),
+    ]
+
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    project = models.ForeignKey(
+        Project, null=True, blank=True, on_delete=models.CASCADE, db_constraint=False, related_name='+',
+    )
+    actor = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.SET_NULL, db_constraint=False, related_name='+',
+    )
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'object_id', 'id'], name='core_activity_object_idx'),
+            models.Index(fields=['project', 'id'], name='core_activity_project_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} {self.action} by {self.actor_id}"
+
+
+class OutgoingEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='core_outbox_due_idx'),
+        ]
+
+    def recipients(self):
+        return self.to.split(',')
+
+    def __str__(self):
+        return f"Email to {self.to}: {self.subject}"
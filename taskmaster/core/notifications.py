@@ -0,0 +1,124 @@
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef
+
+from .models import NotificationCounter, ProjectInvitation, TaskAssignmentNotification
+
+
+NOTIFICATION_COUNT_KEY = 'core:notification-count:{user_id}'
+
+
+def _invalidate_cached_count(user_id):
+    transaction.on_commit(lambda: cache.delete(NOTIFICATION_COUNT_KEY.format(user_id=user_id)))
+
+
+def rebuild_notification_counter(user_id):
+    counter, _ = NotificationCounter.objects.update_or_create(user_id=user_id, defaults={
+        'pending_invitations': ProjectInvitation.objects.filter(invited_user_id=user_id, is_accepted=False).count(),
+        'task_notifications': TaskAssignmentNotification.objects.filter(user_id=user_id).count(),
+    })
+    _invalidate_cached_count(user_id)
+    return counter
+
+
+def rebuild_notification_counters(user_ids, batch_size=1000):
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        counters = {user_id: NotificationCounter(user_id=user_id) for user_id in batch}
+        pending = (
+            ProjectInvitation.objects.filter(invited_user_id__in=batch, is_accepted=False)
+            .values_list('invited_user_id').annotate(count=Count('id'))
+        )
+        for user_id, count in pending:
+            counters[user_id].pending_invitations = count
+        notifications = (
+            TaskAssignmentNotification.objects.filter(user_id__in=batch)
+            .values_list('user_id').annotate(count=Count('id'))
+        )
+        for user_id, count in notifications:
+            counters[user_id].task_notifications = count
+        NotificationCounter.objects.bulk_create(
+            counters.values(),
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['pending_invitations', 'task_notifications'],
+        )
+        transaction.on_commit(lambda batch=batch: cache.delete_many(
+            [NOTIFICATION_COUNT_KEY.format(user_id=user_id) for user_id in batch]
+        ))
+
+
+def adjust_notification_counter(user_id, pending_invitations=0, task_notifications=0):
+    updated = NotificationCounter.objects.filter(user_id=user_id).update(
+        pending_invitations=F('pending_invitations') + pending_invitations,
+        task_notifications=F('task_notifications') + task_notifications,
+    )
+    if updated:
+        _invalidate_cached_count(user_id)
+    else:
+        # The source rows already include this change, so counting them gives the new value.
+        rebuild_notification_counter(user_id)
+
+
+def notify_task_users(pairs, kind='assigned'):
+    """
+    Notify each ``(task_id, user_id)`` pair of an event of ``kind``; returns the number of new notifications.
+
+    Repeated events coalesce: a pair that still has a notification of that kind gets its created_at
+    refreshed by the same upsert instead of a second row, and only new rows count towards the counters.
+
+    Calls for the same users queue up on their counter rows before telling new rows from existing
+    ones, so a row two concurrent calls both insert is counted once.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    task_ids = {task_id for task_id, _ in pairs}
+    user_ids = {user_id for _, user_id in pairs}
+    with transaction.atomic():
+        # A user without a counter row yet gets one rebuilt from the source rows, which needs no lock.
+        list(
+            NotificationCounter.objects.select_for_update()
+            .filter(user_id__in=user_ids).order_by('user_id').values_list('user_id', flat=True)
+        )
+        existing = set(
+            TaskAssignmentNotification.objects
+            .filter(kind=kind, task_id__in=task_ids, user_id__in=user_ids)
+            .values_list('task_id', 'user_id')
+        ) & pairs
+        # Sorted, so concurrent upserts take their row locks in the same order.
+        TaskAssignmentNotification.objects.bulk_create(
+            [
+                TaskAssignmentNotification(task_id=task_id, user_id=user_id, kind=kind)
+                for task_id, user_id in sorted(pairs)
+            ],
+            update_conflicts=True,
+            unique_fields=['task', 'user', 'kind'],
+            update_fields=['created_at'],
+        )
+        new = pairs - existing
+        # bulk_create skips the post_save signal, so the counters are adjusted here.
+        for user_id, count in Counter(user_id for _, user_id in new).items():
+            adjust_notification_counter(user_id, task_notifications=count)
+    return len(new)
+
+
+def duplicate_task_notifications():
+    """Task notifications with a newer one for the same task, user and kind."""
+    newer = TaskAssignmentNotification.objects.filter(
+        task=OuterRef('task'), user=OuterRef('user'), kind=OuterRef('kind'), pk__gt=OuterRef('pk'),
+    )
+    return TaskAssignmentNotification.objects.filter(Exists(newer))
+
+
+def get_unread_notification_count(user_id):
+    key = NOTIFICATION_COUNT_KEY.format(user_id=user_id)
+    count = cache.get(key)
+    if count is None:
+        counter = NotificationCounter.objects.filter(user_id=user_id).first()
+        count = counter.total if counter else 0
+        cache.set(key, count)
+    return count
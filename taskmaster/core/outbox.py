@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def enqueue_email(idempotency_key, subject, body, recipients, from_email=None):
+    email, _ = OutgoingEmail.objects.get_or_create(
+        idempotency_key=idempotency_key,
+        defaults={
+            'subject': subject,
+            'body': body,
+            'from_email': from_email or settings.EMAIL_FROM,
+            'to': ','.join(recipients),
+        },
+    )
+    return email
+
+
+def _describe(error):
+    return f'{type(error).__name__}: {error}'
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(
+        settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.EMAIL_OUTBOX_MAX_RETRY_DELAY,
+    ))
+
+
+def claim_batch(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutgoingEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        # Push claimed rows out of the due window so a second worker skips them while we are sending.
+        OutgoingEmail.objects.filter(id__in=ids).update(
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT),
+        )
+    return list(OutgoingEmail.objects.filter(id__in=ids).order_by('next_attempt_at', 'id'))
+
+
+def deliver_pending(batch_size=None):
+    batch = claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+
+    sent, failed = [], []
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in batch:
+            email.last_error = _describe(error)
+        failed = batch
+    else:
+        try:
+            for email in batch:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email, email.recipients(), connection=connection
+                )
+                try:
+                    message.send()
+                except Exception as error:
+                    email.last_error = _describe(error)
+                    failed.append(email)
+                else:
+                    sent.append(email)
+        finally:
+            connection.close()
+
+    now = timezone.now()
+    for email in sent:
+        email.status = 'sent'
+        email.sent_at = now
+        email.last_error = ''
+    for email in failed:
+        if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            email.status = 'failed'
+        else:
+            email.next_attempt_at = now + retry_delay(email.attempts)
+    OutgoingEmail.objects.bulk_update(sent + failed, ['status', 'sent_at', 'last_error', 'next_attempt_at'])
+
+    return len(sent), len(failed)
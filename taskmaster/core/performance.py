@@ -0,0 +1,193 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import URLPattern, URLResolver
+
+
+logger = logging.getLogger('core.performance')
+
+HISTOGRAM_KEY = 'core:perf:{view}:{window}:{bucket}'
+UNRESOLVED_VIEW = 'unresolved'
+
+_current_stats = ContextVar('core_request_stats', default=None)
+
+
+def iter_url_patterns(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_url_patterns(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self._template_depth = 0
+
+
+def timed_execute(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every database connection as it is opened.
+
+    The stats live in a context variable, which sync_to_async carries into its worker threads, so
+    queries made on behalf of async views are counted too.
+    """
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_time += time.perf_counter() - started
+        stats.queries += 1
+
+
+def install_execute_wrapper(connection):
+    if timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timed_execute)
+
+
+def timed_template_render(render):
+    """Adds the time spent in ``render`` to the current request; nested renders are counted once."""
+    stats = _current_stats.get()
+    if stats is None:
+        return render()
+    stats._template_depth += 1
+    started = time.perf_counter()
+    try:
+        return render()
+    finally:
+        stats._template_depth -= 1
+        if not stats._template_depth:
+            stats.template_time += time.perf_counter() - started
+
+
+def _bucket(duration_ms):
+    for bound in settings.PERF_HISTOGRAM_BUCKETS:
+        if duration_ms <= bound:
+            return str(bound)
+    return 'inf'
+
+
+def _incr(key, delta):
+    timeout = settings.PERF_HISTOGRAM_WINDOW * settings.PERF_HISTOGRAM_WINDOWS
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, timeout):
+            cache.incr(key, delta)
+
+
+def record_request(view, duration_ms, queries):
+    window = int(time.time()) // settings.PERF_HISTOGRAM_WINDOW
+    _incr(HISTOGRAM_KEY.format(view=view, window=window, bucket=_bucket(duration_ms)), 1)
+    _incr(HISTOGRAM_KEY.format(view=view, window=window, bucket='queries'), queries)
+
+
+def get_histograms():
+    """Request duration histograms per view over the last PERF_HISTOGRAM_WINDOWS windows, merged."""
+    from core import urls as core_urls
+
+    views = sorted({pattern.name for pattern in iter_url_patterns(core_urls.urlpatterns)} | {UNRESOLVED_VIEW})
+    buckets = [str(bound) for bound in settings.PERF_HISTOGRAM_BUCKETS] + ['inf']
+    current = int(time.time()) // settings.PERF_HISTOGRAM_WINDOW
+    windows = range(current - settings.PERF_HISTOGRAM_WINDOWS + 1, current + 1)
+
+    keys = [
+        (view, bucket, HISTOGRAM_KEY.format(view=view, window=window, bucket=bucket))
+        for view in views for window in windows for bucket in buckets + ['queries']
+    ]
+    values = cache.get_many([key for _, _, key in keys])
+
+    histograms = {}
+    for view, bucket, key in keys:
+        if key not in values:
+            continue
+        histogram = histograms.setdefault(view, {'count': 0, 'queries': 0, 'buckets': dict.fromkeys(buckets, 0)})
+        if bucket == 'queries':
+            histogram['queries'] += values[key]
+        else:
+            histogram['buckets'][bucket] += values[key]
+            histogram['count'] += values[key]
+    for histogram in histograms.values():
+        histogram['avg_queries'] = round(histogram.pop('queries') / histogram['count'], 1) if histogram['count'] else 0
+    return histograms
+
+
+class PerformanceMiddleware:
+    """
+    Measures every request: wall time, SQL query count and time, and template render time.
+
+    The numbers go out as a Server-Timing header, into rolling per-view histograms in the cache, and
+    into the ``core.performance`` log when the request took longer than PERF_SLOW_REQUEST_MS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        view, total_ms = self.report(request, response, stats)
+        record_request(view, total_ms, stats.queries)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        view, total_ms = self.report(request, response, stats)
+        await sync_to_async(record_request, thread_sensitive=False)(view, total_ms, stats.queries)
+        return response
+
+    def report(self, request, response, stats):
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        sql_ms = stats.sql_time * 1000
+        template_ms = stats.template_time * 1000
+
+        match = request.resolver_match
+        view = match.view_name if match and match.url_name else UNRESOLVED_VIEW
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={total_ms:.1f}',
+            f'db;dur={sql_ms:.1f};desc="{stats.queries} queries"',
+            f'tpl;dur={template_ms:.1f}',
+        ])
+
+        if total_ms >= settings.PERF_SLOW_REQUEST_MS:
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'view': view,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 1),
+                'sql_ms': round(sql_ms, 1),
+                'queries': stats.queries,
+                'template_ms': round(template_ms, 1),
+            }))
+        return view, total_ms
@@ -0,0 +1,109 @@
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import SchedulerWatermark, Task
+from .notifications import notify_task_users
+
+
+WATERMARK = 'task_reminders'
+
+
+def _lead_time():
+    return timedelta(seconds=settings.TASK_REMINDER_LEAD_TIME)
+
+
+def get_watermark(now=None):
+    # A first run starts from now; reminders whose time had already passed are not sent.
+    watermark, _ = SchedulerWatermark.objects.get_or_create(
+        name=WATERMARK, defaults={'position': now or timezone.now()}
+    )
+    return watermark.position
+
+
+def _due_tasks(after, until):
+    """Open tasks whose reminder time falls in (after, until], found through the due_date index."""
+    lead = _lead_time()
+    return (
+        Task.objects
+        .filter(due_date__gt=after + lead, due_date__lte=until + lead)
+        .exclude(status='done')
+        .annotate(recipient=Coalesce('assigned_to', 'owner'))
+        .filter(recipient__isnull=False)
+    )
+
+
+def load_window(after, until):
+    """A heap of ``(remind_at, task_id)`` for the reminders due in (after, until]."""
+    lead = _lead_time()
+    heap = [(due_date - lead, task_id) for task_id, due_date in _due_tasks(after, until).values_list('id', 'due_date')]
+    heapq.heapify(heap)
+    return heap
+
+
+def emit_reminders(until, batch_size):
+    """
+    Notify the assignee, or the owner of an unassigned task, of every reminder due since the watermark.
+
+    Each batch is committed together with the watermark it reaches, so a restarted scheduler carries on
+    after the last committed batch. Batches are only cut between two distinct due dates.
+    """
+    lead = _lead_time()
+    emitted = 0
+    while True:
+        with transaction.atomic():
+            watermark = SchedulerWatermark.objects.select_for_update().get(name=WATERMARK)
+            if watermark.position >= until:
+                return emitted
+            due = _due_tasks(watermark.position, until).order_by('due_date', 'id')
+            rows = list(due.values_list('id', 'recipient', 'due_date')[:batch_size])
+            if len(rows) == batch_size:
+                last_due = rows[-1][2]
+                rows = [row for row in rows if row[2] < last_due]
+                rows += due.filter(due_date=last_due).values_list('id', 'recipient', 'due_date')
+                position = last_due - lead
+            else:
+                position = until
+
+            # A task reminded of before (and since rescheduled) refreshes its reminder instead of adding one.
+            notify_task_users([(task_id, recipient) for task_id, recipient, _ in rows], kind='due_soon')
+            watermark.position = position
+            watermark.save(update_fields=['position'])
+        emitted += len(rows)
+
+
+class ReminderScheduler:
+    """
+    Keeps the reminders of the next ``window`` seconds in a heap and sleeps until the earliest is due.
+
+    The window is reloaded once it has passed, so tasks created or rescheduled meanwhile are picked up.
+    The heap only decides when to wake up: emitting reads the tasks again, so a task that was completed
+    or rescheduled since the window was loaded is not reminded of by mistake.
+    """
+
+    def __init__(self, window=None, batch_size=None):
+        self.window = timedelta(seconds=window or settings.TASK_REMINDER_WINDOW)
+        self.batch_size = batch_size or settings.TASK_REMINDER_BATCH_SIZE
+        self.heap = []
+        self.loaded_until = None
+
+    def step(self):
+        """Emit what is due; returns the number of reminders sent and the seconds until the next step."""
+        now = timezone.now()
+        reload = self.loaded_until is None or now >= self.loaded_until
+        if reload:
+            self.loaded_until = now + self.window
+            self.heap = load_window(get_watermark(now), self.loaded_until)
+
+        due = False
+        while self.heap and self.heap[0][0] <= now:
+            heapq.heappop(self.heap)
+            due = True
+        emitted = emit_reminders(now, self.batch_size) if due or reload else 0
+
+        wake_at = min(self.heap[0][0], self.loaded_until) if self.heap else self.loaded_until
+        return emitted, max((wake_at - timezone.now()).total_seconds(), 0)
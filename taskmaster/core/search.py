@@ -0,0 +1,236 @@
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+
+# Inverted indexes kept in sync by the database itself, so bulk_create/bulk_update are covered too.
+# SQLite: FTS5 tables over the original rows (content=...) maintained by triggers.
+# PostgreSQL: stored generated tsvector columns with GIN indexes.
+
+SQLITE_INSTALL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS core_task_fts USING fts5(
+        title, description, content='core_task', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS core_task_fts_insert AFTER INSERT ON core_task BEGIN
+        INSERT INTO core_task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_task_fts_delete AFTER DELETE ON core_task BEGIN
+        INSERT INTO core_task_fts(core_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_task_fts_update AFTER UPDATE OF title, description ON core_task BEGIN
+        INSERT INTO core_task_fts(core_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO core_task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    "INSERT INTO core_task_fts(core_task_fts) VALUES ('rebuild')",
+
+    """CREATE VIRTUAL TABLE IF NOT EXISTS core_chat_fts USING fts5(
+        message, content='core_projectchatmessage', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS core_chat_fts_insert AFTER INSERT ON core_projectchatmessage BEGIN
+        INSERT INTO core_chat_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_chat_fts_delete AFTER DELETE ON core_projectchatmessage BEGIN
+        INSERT INTO core_chat_fts(core_chat_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_chat_fts_update AFTER UPDATE OF message ON core_projectchatmessage BEGIN
+        INSERT INTO core_chat_fts(core_chat_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO core_chat_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+    "INSERT INTO core_chat_fts(core_chat_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS core_task_fts_insert",
+    "DROP TRIGGER IF EXISTS core_task_fts_delete",
+    "DROP TRIGGER IF EXISTS core_task_fts_update",
+    "DROP TABLE IF EXISTS core_task_fts",
+    "DROP TRIGGER IF EXISTS core_chat_fts_insert",
+    "DROP TRIGGER IF EXISTS core_chat_fts_delete",
+    "DROP TRIGGER IF EXISTS core_chat_fts_update",
+    "DROP TABLE IF EXISTS core_chat_fts",
+]
+
+POSTGRESQL_INSTALL = [
+    """ALTER TABLE core_task ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS core_task_search_idx ON core_task USING GIN (search_vector)",
+    """ALTER TABLE core_projectchatmessage ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(message, ''))
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS core_chat_search_idx ON core_projectchatmessage USING GIN (search_vector)",
+]
+
+POSTGRESQL_UNINSTALL = [
+    "DROP INDEX IF EXISTS core_task_search_idx",
+    "ALTER TABLE core_task DROP COLUMN IF EXISTS search_vector",
+    "DROP INDEX IF EXISTS core_chat_search_idx",
+    "ALTER TABLE core_projectchatmessage DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _statements(vendor, install):
+    if vendor == 'sqlite':
+        return SQLITE_INSTALL if install else SQLITE_UNINSTALL
+    if vendor == 'postgresql':
+        return POSTGRESQL_INSTALL if install else POSTGRESQL_UNINSTALL
+    return []
+
+
+SQLITE_TRIGGERS = {
+    'core_task_fts_insert', 'core_task_fts_delete', 'core_task_fts_update',
+    'core_chat_fts_insert', 'core_chat_fts_delete', 'core_chat_fts_update',
+}
+
+
+def repair_search_index(using_connection=connection):
+    """
+    Reinstall the SQLite triggers, and reindex, if a migration that remade a table dropped them.
+
+    Does nothing before the index exists or when every trigger is in place.
+    """
+    if using_connection.vendor != 'sqlite':
+        return False
+    with using_connection.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        names = {(kind, name) for kind, name in cursor.fetchall()}
+    if ('table', 'core_task_fts') not in names or SQLITE_TRIGGERS <= {name for kind, name in names if kind == 'trigger'}:
+        return False
+    install_search_index(using_connection)
+    return True
+
+
+def install_search_index(using_connection=connection):
+    """Create the search index, or repair it; SQLite drops the triggers whenever a migration remakes a table."""
+    with using_connection.cursor() as cursor:
+        for statement in _statements(using_connection.vendor, install=True):
+            cursor.execute(statement)
+
+
+def uninstall_search_index(using_connection=connection):
+    with using_connection.cursor() as cursor:
+        for statement in _statements(using_connection.vendor, install=False):
+            cursor.execute(statement)
+
+
+HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'
+POSTGRESQL_HEADLINE_OPTIONS = f'StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_END}", MaxWords=30, MinWords=10'
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())[:10]
+
+
+def _match_expression(terms, vendor):
+    # Only word characters reach the query syntax; the last term also matches as a prefix.
+    if vendor == 'sqlite':
+        return ' '.join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+    return ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+
+
+def highlight(text):
+    return mark_safe(escape(text or '').replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
+
+def _in_clause(column, values):
+    values = sorted(values)
+    if not values:
+        return '0 = 1', []
+    return f"{column} IN ({', '.join(['%s'] * len(values))})", values
+
+
+def search_tasks(user, project_ids, query, offset, limit, include_personal=True):
+    """
+    Ranked ids and highlighted title/snippet of the tasks the user can see, best match first.
+
+    The tasks of ``project_ids`` are searched, and the user's own tasks outside any project unless
+    ``include_personal`` is false, as for a search narrowed to one project.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    vendor = connection.vendor
+    scope, scope_params = _in_clause('t.project_id', project_ids)
+    if include_personal:
+        scope = f"({scope} OR (t.project_id IS NULL AND (t.owner_id = %s OR t.assigned_to_id = %s)))"
+        scope_params = scope_params + [user.pk, user.pk]
+
+    if vendor == 'sqlite':
+        sql = f"""
+            SELECT t.id,
+                   highlight(core_task_fts, 0, char(2), char(3)),
+                   snippet(core_task_fts, 1, char(2), char(3), '…', 24)
+            FROM core_task_fts JOIN core_task t ON t.id = core_task_fts.rowid
+            WHERE core_task_fts MATCH %s AND {scope}
+            ORDER BY bm25(core_task_fts, 10.0, 1.0), t.id
+            LIMIT %s OFFSET %s
+        """
+        params = [_match_expression(terms, vendor)] + scope_params + [limit, offset]
+    elif vendor == 'postgresql':
+        # Headlines are expensive, so they are only computed for the page that is returned.
+        sql = f"""
+            SELECT page.id, ts_headline('english', page.title, page.query, %s),
+                   ts_headline('english', page.description, page.query, %s)
+            FROM (
+                SELECT t.id, t.title, t.description, q.query, ts_rank(t.search_vector, q.query) AS rank
+                FROM core_task t, to_tsquery('english', %s) AS q(query)
+                WHERE t.search_vector @@ q.query AND {scope}
+                ORDER BY rank DESC, t.id
+                LIMIT %s OFFSET %s
+            ) AS page
+            ORDER BY page.rank DESC, page.id
+        """
+        params = [POSTGRESQL_HEADLINE_OPTIONS] * 2 + [_match_expression(terms, vendor)] + scope_params + [limit, offset]
+    else:
+        raise NotImplementedError(f"Search is not supported on {vendor}.")
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            {'id': task_id, 'title': highlight(title), 'snippet': highlight(snippet)}
+            for task_id, title, snippet in cursor.fetchall()
+        ]
+
+
+def search_chat_messages(project_ids, query, offset, limit):
+    """Ranked ids and highlighted snippets of chat messages in the given projects, best match first."""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    vendor = connection.vendor
+    scope, scope_params = _in_clause('m.project_id', project_ids)
+
+    if vendor == 'sqlite':
+        sql = f"""
+            SELECT m.id, snippet(core_chat_fts, 0, char(2), char(3), '…', 24)
+            FROM core_chat_fts JOIN core_projectchatmessage m ON m.id = core_chat_fts.rowid
+            WHERE core_chat_fts MATCH %s AND {scope}
+            ORDER BY bm25(core_chat_fts), m.id DESC
+            LIMIT %s OFFSET %s
+        """
+        params = [_match_expression(terms, vendor)] + scope_params + [limit, offset]
+    elif vendor == 'postgresql':
+        sql = f"""
+            SELECT page.id, ts_headline('english', page.message, page.query, %s)
+            FROM (
+                SELECT m.id, m.message, q.query, ts_rank(m.search_vector, q.query) AS rank
+                FROM core_projectchatmessage m, to_tsquery('english', %s) AS q(query)
+                WHERE m.search_vector @@ q.query AND {scope}
+                ORDER BY rank DESC, m.id DESC
+                LIMIT %s OFFSET %s
+            ) AS page
+            ORDER BY page.rank DESC, page.id DESC
+        """
+        params = [POSTGRESQL_HEADLINE_OPTIONS, _match_expression(terms, vendor)] + scope_params + [limit, offset]
+    else:
+        raise NotImplementedError(f"Search is not supported on {vendor}.")
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [{'id': message_id, 'snippet': highlight(snippet)} for message_id, snippet in cursor.fetchall()]
@@ -0,0 +1,92 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from .models import Project, ProjectChatMessage, ProjectMembership, Task
+
+
+class BulkTaskCreateSerializer(serializers.ModelSerializer):
+    project = serializers.IntegerField(required=False, allow_null=True)
+    assigned_to = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Task
+        fields = ['title', 'description', 'due_date', 'priority', 'status', 'project', 'assigned_to']
+
+
+class BulkTaskUpdateSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Task.PRIORITY_CHOICES, required=False)
+    assigned_to = serializers.IntegerField(required=False, allow_null=True)
+    due_date = serializers.DateTimeField(required=False)
+
+
+class BulkTaskSerializer(serializers.Serializer):
+    create = BulkTaskCreateSerializer(many=True, required=False, default=list)
+    update = BulkTaskUpdateSerializer(many=True, required=False, default=list)
+
+    def validate(self, data):
+        if len(data['create']) + len(data['update']) > settings.TASK_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(f"A batch may contain at most {settings.TASK_BULK_MAX_ITEMS} items.")
+        ids = [item['id'] for item in data['update']]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Each task may be updated only once per batch.")
+        return data
+
+
+class TaskImportSerializer(serializers.ModelSerializer):
+    owner = serializers.CharField(required=False, allow_blank=True)
+    assigned_to = serializers.CharField(required=False, allow_blank=True)
+
+    class Meta:
+        model = Task
+        fields = ['title', 'description', 'due_date', 'priority', 'status', 'owner', 'assigned_to']
+
+
+class ChatMessageImportSerializer(serializers.ModelSerializer):
+    user = serializers.CharField()
+    created_at = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = ProjectChatMessage
+        fields = ['user', 'message', 'created_at']
+
+
+class SparseFieldsetSerializer(serializers.ModelSerializer):
+    """Accepts a ``fields`` argument and drops every other field from the output."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ProjectSerializer(SparseFieldsetSerializer):
+    members = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta:
+        model = Project
+        fields = ['id', 'title', 'description', 'owner', 'members']
+
+
+class TaskSerializer(SparseFieldsetSerializer):
+    class Meta:
+        model = Task
+        fields = ['id', 'title', 'description', 'due_date', 'priority', 'status', 'project', 'assigned_to', 'owner']
+
+
+class ProjectMembershipSerializer(SparseFieldsetSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = ProjectMembership
+        fields = ['id', 'project', 'user', 'username', 'role']
+
+
+class ProjectChatMessageSerializer(SparseFieldsetSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = ProjectChatMessage
+        fields = ['id', 'project', 'user', 'username', 'message', 'created_at']
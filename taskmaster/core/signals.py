@@ -0,0 +1,163 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_init, post_migrate, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .activity import record_deleted, record_saved, tracked_state
+from .auth_backends import invalidate_cached_user
+from .broker import get_broker, project_chat_channel
+from .models import (
+    Project, ProjectChatMessage, ProjectInvitation, ProjectMembership, ProjectStats, Task, TaskAssignmentNotification,
+)
+from .notifications import adjust_notification_counter, rebuild_notification_counter
+from .performance import install_execute_wrapper
+from .search import repair_search_index
+from .stats import UNKNOWN, apply_task_changes, loaded_task_state, task_state
+from .utils import bump_project_version, invalidate_project_access
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install_execute_wrapper(connection)
+
+
+@receiver(post_migrate)
+def search_index_migrated(sender, using, **kwargs):
+    # A migration that remakes core_task or core_projectchatmessage on SQLite drops the search triggers.
+    if sender.name == 'core':
+        repair_search_index(connections[using])
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Dropped at once for this process, and again on commit so a concurrent request cannot re-cache the old row.
+    invalidate_cached_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_cached_user(instance.pk))
+
+
+@receiver(user_logged_out)
+def logged_out(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_cached_user(user.pk)
+
+
+@receiver([post_save, post_delete], sender=ProjectMembership)
+def membership_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_project_access(instance.user_id))
+    transaction.on_commit(lambda: bump_project_version(instance.project_id))
+
+
+@receiver([post_save, post_delete], sender=Project)
+def project_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_project_access(instance.owner_id))
+    transaction.on_commit(lambda: bump_project_version(instance.pk))
+
+
+@receiver(post_save, sender=Project)
+def project_created(sender, instance, created, **kwargs):
+    if created:
+        ProjectStats.objects.get_or_create(project=instance)
+
+
+@receiver(post_init, sender=Task)
+def task_loaded(sender, instance, **kwargs):
+    instance._loaded_state = loaded_task_state(instance) if instance.pk is not None else None
+
+
+@receiver(pre_delete, sender=Task)
+def task_deleting(sender, instance, **kwargs):
+    # A task loaded with its state deferred is read once more while its row still exists, so its
+    # project's counts move as for any other delete instead of staying as they were.
+    if instance._loaded_state is UNKNOWN:
+        instance.refresh_from_db(fields=['project', 'status', 'priority', 'due_date'])
+        instance._loaded_state = task_state(instance)
+
+
+@receiver([post_save, post_delete], sender=Task)
+def task_changed(sender, instance, signal, **kwargs):
+    old = instance._loaded_state
+    new = task_state(instance) if signal is post_save else None
+    apply_task_changes([(old, new)])
+
+    # A task moved to another project changes the fragments of both.
+    project_ids = {instance.project_id}
+    if old is not UNKNOWN and old is not None:
+        project_ids.add(old[0])
+    for project_id in project_ids - {None}:
+        transaction.on_commit(lambda project_id=project_id: bump_project_version(project_id))
+    instance._loaded_state = new if signal is post_save else None
+
+
+@receiver(post_init, sender=Task)
+@receiver(post_init, sender=Project)
+@receiver(post_init, sender=ProjectMembership)
+def activity_loaded(sender, instance, **kwargs):
+    instance._activity_state = tracked_state(instance) if instance.pk is not None else None
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=ProjectMembership)
+def activity_saved(sender, instance, created, **kwargs):
+    record_saved(instance, created)
+
+
+# A deleted project takes its history with it, so only tasks and memberships log their deletion.
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=ProjectMembership)
+def activity_deleted(sender, instance, **kwargs):
+    record_deleted(instance)
+
+
+@receiver(post_save, sender=ProjectChatMessage)
+def chat_message_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: get_broker().publish(project_chat_channel(instance.project_id), instance.pk))
+
+
+@receiver(post_save, sender=TaskAssignmentNotification)
+def task_notification_created(sender, instance, created, **kwargs):
+    if created:
+        adjust_notification_counter(instance.user_id, task_notifications=1)
+
+
+@receiver(post_delete, sender=TaskAssignmentNotification)
+def task_notification_deleted(sender, instance, **kwargs):
+    adjust_notification_counter(instance.user_id, task_notifications=-1)
+
+
+@receiver([post_save, post_delete], sender=ProjectInvitation)
+def invitation_changed(sender, instance, **kwargs):
+    # The invite autocomplete leaves out pending invitees and is cached under the project version.
+    transaction.on_commit(lambda: bump_project_version(instance.project_id))
+
+
+@receiver(post_init, sender=ProjectInvitation)
+def invitation_loaded(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._was_pending = False
+    elif 'is_accepted' in instance.__dict__:
+        instance._was_pending = not instance.is_accepted
+    else:
+        # Loaded with is_accepted deferred; reading it here would cost a query per row.
+        instance._was_pending = None
+
+
+@receiver(post_save, sender=ProjectInvitation)
+def invitation_saved(sender, instance, **kwargs):
+    is_pending = not instance.is_accepted
+    if instance._was_pending is None:
+        rebuild_notification_counter(instance.invited_user_id)
+    elif is_pending != instance._was_pending:
+        adjust_notification_counter(instance.invited_user_id, pending_invitations=1 if is_pending else -1)
+    instance._was_pending = is_pending
+
+
+@receiver(post_delete, sender=ProjectInvitation)
+def invitation_deleted(sender, instance, **kwargs):
+    if instance._was_pending is None:
+        rebuild_notification_counter(instance.invited_user_id)
+    elif instance._was_pending:
+        adjust_notification_counter(instance.invited_user_id, pending_invitations=-1)
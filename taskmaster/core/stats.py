@@ -0,0 +1,149 @@
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Case, Count, F, Min, Q, Value, When
+from django.utils import timezone
+
+from .models import Project, ProjectStats, Task
+
+
+# A project without open tasks keeps its overdue count until a write clears it.
+NEVER = datetime(9999, 1, 1, tzinfo=dt_timezone.utc)
+
+# The state of a task loaded with some of these fields deferred; its project is recounted instead.
+UNKNOWN = object()
+
+STATE_FIELDS = {'project_id', 'status', 'priority', 'due_date'}
+COUNT_FIELDS = [
+    ProjectStats.field_name(status, priority)
+    for status, _ in Task.STATUS_CHOICES
+    for priority, _ in Task.PRIORITY_CHOICES
+]
+
+
+def task_state(task):
+    if task.project_id is None:
+        return None
+    return task.project_id, task.status, task.priority, task.due_date
+
+
+def loaded_task_state(task):
+    if not STATE_FIELDS <= task.__dict__.keys():
+        return UNKNOWN
+    return task_state(task)
+
+
+def rebuild_project_stats(project_ids, batch_size=1000):
+    project_ids = list(project_ids)
+    for start in range(0, len(project_ids), batch_size):
+        batch = Project.objects.filter(pk__in=project_ids[start:start + batch_size]).values_list('pk', flat=True)
+        stats = {project_id: ProjectStats(project_id=project_id) for project_id in batch}
+        counts = (
+            Task.objects.filter(project_id__in=stats)
+            .values_list('project_id', 'status', 'priority')
+            .annotate(count=Count('id'))
+        )
+        for project_id, status, priority, count in counts:
+            setattr(stats[project_id], ProjectStats.field_name(status, priority), count)
+        ProjectStats.objects.bulk_create(
+            stats.values(),
+            update_conflicts=True,
+            unique_fields=['project'],
+            update_fields=COUNT_FIELDS + ['overdue_valid_until'],
+        )
+
+
+def apply_task_changes(changes):
+    """
+    Update the stats for ``(old_state, new_state)`` pairs of tasks that were created, changed or deleted.
+
+    Counts move with one UPDATE per project. The overdue count is only marked for recounting, and only
+    when an open task due before the current overdue_valid_until is involved. An UNKNOWN old state
+    rebuilds the new state's project; a deleted task's old state has to be known (see the pre_delete
+    receiver in core.signals).
+    """
+    now = timezone.now()
+    deltas = defaultdict(lambda: defaultdict(int))
+    earliest_open_due = {}
+    rebuild = set()
+
+    for old, new in changes:
+        if old is UNKNOWN:
+            if new is not None:
+                rebuild.add(new[0])
+            continue
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            project_id, status, priority, due_date = state
+            deltas[project_id][ProjectStats.field_name(status, priority)] += sign
+            if status != 'done':
+                earliest_open_due[project_id] = min(due_date, earliest_open_due.get(project_id, due_date))
+
+    for project_id in deltas.keys() - rebuild:
+        update = {name: F(name) + delta for name, delta in deltas[project_id].items() if delta}
+        update['last_activity'] = now
+        if project_id in earliest_open_due:
+            update['overdue_valid_until'] = Case(
+                When(overdue_valid_until__gt=earliest_open_due[project_id], then=Value(None)),
+                default=F('overdue_valid_until'),
+            )
+        if not ProjectStats.objects.filter(project_id=project_id).update(**update):
+            rebuild.add(project_id)
+
+    if rebuild:
+        rebuild_project_stats(rebuild)
+
+
+def touch_project_stats(project_id):
+    ProjectStats.objects.filter(project_id=project_id).update(last_activity=timezone.now())
+
+
+def refresh_overdue(stats_list):
+    now = timezone.now()
+    stale = {
+        stats.project_id: stats for stats in stats_list
+        if stats.overdue_valid_until is None or stats.overdue_valid_until <= now
+    }
+    if not stale:
+        return
+
+    rows = {
+        row['project_id']: row
+        for row in Task.objects.filter(project_id__in=stale).exclude(status='done').values('project_id').annotate(
+            overdue_count=Count('id', filter=Q(due_date__lt=now)),
+            next_due=Min('due_date', filter=Q(due_date__gte=now)),
+        )
+    }
+    unchanged = Q()
+    overdue, valid_until = [], []
+    for project_id, stats in stale.items():
+        row = rows.get(project_id, {})
+        unchanged |= Q(project_id=project_id, overdue_valid_until=stats.overdue_valid_until)
+        stats.overdue = row.get('overdue_count', 0)
+        stats.overdue_valid_until = row.get('next_due') or NEVER
+        overdue.append(When(project_id=project_id, then=Value(stats.overdue)))
+        valid_until.append(When(project_id=project_id, then=Value(stats.overdue_valid_until)))
+
+    # Compare-and-set, so a row whose overdue_valid_until a write cleared meanwhile is left for the next read.
+    ProjectStats.objects.filter(unchanged).update(
+        overdue=Case(*overdue, default=F('overdue'), output_field=ProjectStats._meta.get_field('overdue')),
+        overdue_valid_until=Case(
+            *valid_until, default=F('overdue_valid_until'),
+            output_field=ProjectStats._meta.get_field('overdue_valid_until'),
+        ),
+    )
+
+
+def load_project_stats(projects):
+    """Attach up-to-date stats to projects fetched with ``select_related('stats')``."""
+    projects = list(projects)
+    missing = [project.pk for project in projects if not hasattr(project, 'stats')]
+    if missing:
+        rebuild_project_stats(missing)
+        created = ProjectStats.objects.in_bulk(missing)
+        for project in projects:
+            if project.pk in created:
+                project.stats = created[project.pk]
+    refresh_overdue([project.stats for project in projects if hasattr(project, 'stats')])
+    return projects
@@ -0,0 +1,24 @@
+from django.template.backends.django import DjangoTemplates
+
+from .performance import timed_template_render
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        return timed_template_render(lambda: self._template.render(context, request))
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time reported to PerformanceMiddleware."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
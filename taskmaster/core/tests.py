@@ -1,3 +1,1805 @@
-from django.test import TestCase
+import asyncio
+import json
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.core.management import call_command
+from django.db import connection, router, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.activity import activity_log
+from core.archive import archive_chat_messages, unpack
+from core.auth_backends import USER_KEY
+from core.autocomplete import suggest_users
+from core.benchmark import collect_view_urls
+from core.db_router import STICKY_COOKIE, replica_reads
+from core.broker import InMemoryBroker, get_broker, project_chat_channel
+from core.models import (
+    ActivityEntry, ChatArchiveSegment, ConfirmationCode, NotificationCounter, OutgoingEmail, Project,
+    ProjectChatMessage, ProjectInvitation, ProjectMembership, ProjectStats, SchedulerWatermark, Task,
+    TaskAssignmentNotification,
+)
+from core.notifications import get_unread_notification_count, notify_task_users
+from core.outbox import deliver_pending, enqueue_email
+from core.reminders import WATERMARK, ReminderScheduler, emit_reminders
+from core.search import search_chat_messages, search_tasks
+from core.stats import load_project_stats
+from core.transfer import STREAM_CHUNK_SIZE
+from core.utils import ACCESS_VERSION_KEY, ProjectAccess
+
+
+class TaskQueryPlanTests(TestCase):
+    """Runs EXPLAIN on every Task query issued by the filtered views and fails on full table scans."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.member = User.objects.create_user(username='member', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.owner)
+        ProjectMembership.objects.create(project=cls.project, user=cls.member, role='editor')
+
+        now = timezone.now()
+        statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+        priorities = [choice for choice, _ in Task.PRIORITY_CHOICES]
+        tasks = []
+        for i in range(60):
+            tasks.append(Task(
+                title=f'Task {i}',
+                due_date=now + timedelta(days=i),
+                status=statuses[i % len(statuses)],
+                priority=priorities[i % len(priorities)],
+                project=cls.project if i % 2 else None,
+                assigned_to=cls.member,
+                owner=cls.owner,
+            ))
+        Task.objects.bulk_create(tasks)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.member)
+        if connection.vendor == 'postgresql':
+            # Small test tables always favour a sequential scan, so only ask whether an index can serve the query.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN {sql}')
+            return [row[0] for row in cursor.fetchall()]
+
+    def is_full_scan(self, plan_line):
+        if connection.vendor == 'sqlite':
+            return re.match(r'SCAN "?core_task\b', plan_line) is not None
+        return re.search(r'Seq Scan on "?core_task\b', plan_line) is not None
+
+    def assert_no_task_full_scans(self, url):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest(f'EXPLAIN checks are not implemented for {connection.vendor}')
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        task_queries = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and '"core_task"' in query['sql']
+        ]
+        self.assertTrue(task_queries, f'{url} issued no Task queries')
+
+        for sql in task_queries:
+            plan = self.explain(sql)
+            full_scans = [line for line in plan if self.is_full_scan(line)]
+            self.assertFalse(full_scans, f'{url} scans core_task:\n{sql}\n' + '\n'.join(plan))
+
+    def test_project_detail(self):
+        url = reverse('project-detail', args=[self.project.pk])
+        self.assert_no_task_full_scans(url)
+        self.assert_no_task_full_scans(f'{url}?status=done')
+        self.assert_no_task_full_scans(f'{url}?priority=high')
+        self.assert_no_task_full_scans(f'{url}?status=todo&priority=low')
+
+    def test_task_list(self):
+        url = reverse('task-list')
+        self.assert_no_task_full_scans(url)
+        self.assert_no_task_full_scans(f'{url}?status=in_progress')
+        self.assert_no_task_full_scans(f'{url}?priority=medium')
+        self.assert_no_task_full_scans(f'{url}?status=done&priority=high')
+
+
+class ProjectAccessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.owner)
+        cls.other = Project.objects.create(title='Other', description='', owner=cls.owner)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_roles_are_loaded_once(self):
+        ProjectMembership.objects.create(project=self.project, user=self.user, role='viewer')
+        access = ProjectAccess(self.user)
+        with self.assertNumQueries(2):
+            self.assertEqual(access.role(self.project), 'viewer')
+            self.assertTrue(access.is_member(self.project.pk))
+            self.assertFalse(access.can_edit(self.project))
+            self.assertFalse(access.is_member(self.other))
+        with self.assertNumQueries(0):
+            self.assertEqual(ProjectAccess(self.user).project_ids, {self.project.pk})
+
+    def test_owner(self):
+        access = ProjectAccess(self.owner)
+        self.assertTrue(access.is_owner(self.project))
+        self.assertTrue(access.can_edit(self.other))
+        self.assertIsNone(access.role(self.project))
+
+    def test_membership_changes_invalidate_cache(self):
+        self.assertFalse(ProjectAccess(self.user).is_member(self.project))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            membership = ProjectMembership.objects.create(project=self.project, user=self.user, role='viewer')
+        self.assertEqual(ProjectAccess(self.user).role(self.project), 'viewer')
+
+        membership.role = 'editor'
+        with self.captureOnCommitCallbacks(execute=True):
+            membership.save()
+        self.assertTrue(ProjectAccess(self.user).can_edit(self.project))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            membership.delete()
+        self.assertFalse(ProjectAccess(self.user).is_member(self.project))
+
+    def test_evicted_version_does_not_revive_old_roles(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            membership = ProjectMembership.objects.create(project=self.project, user=self.user, role='viewer')
+        self.assertTrue(ProjectAccess(self.user).is_member(self.project))
+        with self.captureOnCommitCallbacks(execute=True):
+            membership.delete()
+
+        cache.delete(ACCESS_VERSION_KEY.format(user_id=self.user.pk))
+        self.assertFalse(ProjectAccess(self.user).is_member(self.project))
+
+    def test_accept_invitation_invalidates_cache(self):
+        self.assertFalse(ProjectAccess(self.user).is_member(self.project))
+        invitation = ProjectInvitation.objects.create(
+            project=self.project, invited_user=self.user, inviter=self.owner, role='editor'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            invitation.accept_invitation()
+        self.assertTrue(ProjectAccess(self.user).can_edit(self.project))
+
+    def test_new_project_invalidates_owner_cache(self):
+        self.assertEqual(ProjectAccess(self.user).project_ids, set())
+        with self.captureOnCommitCallbacks(execute=True):
+            project = Project.objects.create(title='Mine', description='', owner=self.user)
+        self.assertTrue(ProjectAccess(self.user).is_owner(project))
+
+    def test_anonymous_user(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(ProjectAccess(AnonymousUser()).is_member(self.project))
+
+
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.member = User.objects.create_user(username='member', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.owner)
+        ProjectMembership.objects.create(project=cls.project, user=cls.member, role='editor')
+        Task.objects.create(title='First', due_date=timezone.now(), project=cls.project, owner=cls.owner)
+
+    def setUp(self):
+        cache.clear()
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_repeat_views_skip_queries(self):
+        self.client.force_login(self.member)
+        for url in (
+            reverse('project-detail', args=[self.project.pk]),
+            reverse('project-participants', args=[self.project.pk]),
+            reverse('task-list'),
+            f"{reverse('task-list')}?project={self.project.pk}",
+        ):
+            with self.subTest(url=url):
+                first, cold = self.count_queries(url)
+                second, warm = self.count_queries(url)
+                self.assertLess(warm, cold)
+                self.assertEqual(first.content, second.content)
+
+    def test_task_changes_invalidate_fragments(self):
+        self.client.force_login(self.member)
+        detail_url = reverse('project-detail', args=[self.project.pk])
+        self.client.get(detail_url)
+        self.client.get(reverse('task-list'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(title='Second', due_date=timezone.now(), project=self.project, owner=self.owner)
+        self.assertContains(self.client.get(detail_url), 'Second')
+        self.assertContains(self.client.get(reverse('task-list')), 'Second')
+
+        other = Project.objects.create(title='Other', description='', owner=self.owner)
+        self.client.get(reverse('project-detail', args=[other.pk]))
+        task.project = other
+        with self.captureOnCommitCallbacks(execute=True):
+            task.save()
+        self.assertNotContains(self.client.get(detail_url), 'Second')
+
+    def test_membership_changes_invalidate_participants(self):
+        viewer = User.objects.create_user(username='viewer', password='password')
+        self.client.force_login(self.member)
+        url = reverse('project-participants', args=[self.project.pk])
+        self.assertNotContains(self.client.get(url), 'viewer -')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProjectMembership.objects.create(project=self.project, user=viewer, role='viewer')
+        self.assertContains(self.client.get(url), 'viewer -')
+
+    def test_owner_participants_are_not_shared(self):
+        url = reverse('project-participants', args=[self.project.pk])
+        self.client.force_login(self.member)
+        self.assertNotContains(self.client.get(url), 'csrfmiddlewaretoken')
+        self.client.force_login(self.owner)
+        self.assertContains(self.client.get(url), 'csrfmiddlewaretoken')
+        self.client.force_login(self.member)
+        self.assertNotContains(self.client.get(url), 'csrfmiddlewaretoken')
+
+    def test_bulk_api_invalidates_fragments(self):
+        self.client.force_login(self.member)
+        detail_url = reverse('project-detail', args=[self.project.pk])
+        self.client.get(detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('task-bulk'), {'create': [{
+                'title': 'Bulk', 'due_date': timezone.now().isoformat(), 'project': self.project.pk,
+            }]}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(self.client.get(detail_url), 'Bulk')
+
+
+@override_settings(TASK_LIST_GROUP_SIZE=3, TASK_LIST_PAGE_SIZE=4, TASK_LIST_MAX_ROWS=8)
+class TaskListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.projects = [
+            Project.objects.create(title=f'Project {i}', description='', owner=cls.user) for i in range(3)
+        ]
+        now = timezone.now()
+        Task.objects.bulk_create([
+            Task(title=f'{project.title} task {i}', due_date=now + timedelta(hours=i), project=project, owner=cls.user)
+            for project in cls.projects for i in range(7)
+        ] + [
+            Task(title=f'Personal task {i}', due_date=now, assigned_to=cls.user, owner=cls.user) for i in range(5)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_groups_are_capped_in_a_single_task_query(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('task-list'))
+        task_queries = [query for query in context.captured_queries if '"core_task"' in query['sql']]
+        self.assertEqual(len(task_queries), 2)
+
+        groups = response.context['projects_with_tasks']
+        self.assertEqual([group['project'] for group in groups], self.projects[:2])
+        self.assertTrue(all(len(group['tasks']) == 3 and group['next_query'] for group in groups))
+        self.assertEqual(len(response.context['tasks_without_project']['tasks']), 3)
+
+        response = self.client.get(f"{reverse('task-list')}?{response.context['next_page_query']}")
+        self.assertEqual([group['project'] for group in response.context['projects_with_tasks']], self.projects[2:])
+        self.assertIsNone(response.context['next_page_query'])
+        self.assertIsNone(response.context['tasks_without_project'])
+
+    @override_settings(TASK_LIST_MAX_ROWS=2)
+    def test_group_cut_by_row_cap_is_truncated_when_alone_on_the_page(self):
+        response = self.client.get(reverse('task-list'))
+        [group] = response.context['projects_with_tasks']
+        self.assertEqual(group['project'], self.projects[0])
+        self.assertEqual(len(group['tasks']), 2)
+        self.assertTrue(group['next_query'])
+
+        response = self.client.get(f"{reverse('task-list')}?{response.context['next_page_query']}")
+        self.assertEqual([group['project'] for group in response.context['projects_with_tasks']], self.projects[1:2])
+
+    def test_group_keyset_pagination(self):
+        response = self.client.get(reverse('task-list'))
+        next_query = response.context['projects_with_tasks'][0]['next_query']
+
+        seen = [task.title for task in response.context['projects_with_tasks'][0]['tasks']]
+        while next_query:
+            response = self.client.get(f"{reverse('task-list')}?{next_query}")
+            seen += [task.title for task in response.context['group']['tasks']]
+            next_query = response.context['group']['next_query']
+
+        self.assertEqual(seen, [f'Project 0 task {i}' for i in range(7)])
+
+    def test_personal_group_keyset_pagination(self):
+        response = self.client.get(f"{reverse('task-list')}?project=none")
+        group = response.context['group']
+        self.assertIsNone(group['project'])
+        self.assertEqual(len(group['tasks']), 4)
+
+        response = self.client.get(f"{reverse('task-list')}?{group['next_query']}")
+        self.assertEqual(len(response.context['group']['tasks']), 1)
+        self.assertIsNone(response.context['group']['next_query'])
+
+    def test_foreign_project_group_is_forbidden(self):
+        other = User.objects.create_user(username='other', password='password')
+        project = Project.objects.create(title='Foreign', description='', owner=other)
+        response = self.client.get(f"{reverse('task-list')}?project={project.pk}")
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(CHAT_PAGE_SIZE=3)
+class ProjectChatPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.user)
+        ProjectChatMessage.objects.bulk_create([
+            ProjectChatMessage(project=cls.project, user=cls.user, message=f'Message {i}') for i in range(7)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_history_is_paged_backwards(self):
+        url = reverse('project-chat', args=[self.project.pk])
+        pages = []
+        cursor = None
+        while True:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, {'before': cursor} if cursor else {})
+            chat_queries = [query for query in context.captured_queries if 'core_projectchatmessage' in query['sql']]
+            self.assertEqual(len(chat_queries), 1)
+            pages.append([message.message for message in response.context['messages']])
+            cursor = response.context['older_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, [
+            ['Message 4', 'Message 5', 'Message 6'],
+            ['Message 1', 'Message 2', 'Message 3'],
+            ['Message 0'],
+        ])
+
+    def test_post_redirects_back_to_latest_messages(self):
+        url = reverse('project-chat', args=[self.project.pk])
+        response = self.client.post(url, {'message': 'Hello'})
+        self.assertRedirects(response, url)
+        response = self.client.get(url)
+        self.assertEqual(response.context['messages'][-1].message, 'Hello')
+
+
+class InMemoryBrokerTests(TestCase):
+    async def test_publish_wakes_subscribers_of_the_channel_only(self):
+        broker = InMemoryBroker()
+        with broker.subscribe('a') as first, broker.subscribe('a') as second, broker.subscribe('b') as other:
+            self.assertEqual(broker.subscriber_count('a'), 2)
+            broker.publish('a', 1)
+            self.assertEqual(await first.get(timeout=1), 1)
+            self.assertEqual(await second.get(timeout=1), 1)
+            with self.assertRaises(asyncio.TimeoutError):
+                await other.get(timeout=0.01)
+        self.assertEqual(broker.subscriber_count('a'), 0)
+
+    async def test_publish_from_another_thread(self):
+        broker = InMemoryBroker()
+        with broker.subscribe('a') as subscription:
+            threading.Thread(target=broker.publish, args=('a', 'hello')).start()
+            self.assertEqual(await subscription.get(timeout=1), 'hello')
+
+    async def test_full_queue_drops_payloads(self):
+        broker = InMemoryBroker(queue_size=1)
+        with broker.subscribe('a') as subscription:
+            broker.publish('a', 1)
+            broker.publish('a', 2)
+            self.assertEqual(await subscription.get(timeout=1), 1)
+            with self.assertRaises(asyncio.TimeoutError):
+                await subscription.get(timeout=0.01)
+
+
+@override_settings(CHAT_PAGE_SIZE=3, CHAT_ARCHIVE_AGE=90 * 24 * 3600)
+class ChatArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.user)
+        now = timezone.now()
+        # Mid-month, so no message of a month falls into the next one.
+        first, second = ((now - timedelta(days=days)).replace(day=15, hour=12) for days in (200, 150))
+        dates = [first + timedelta(minutes=i) for i in range(3)]
+        dates += [second + timedelta(minutes=i) for i in range(2)]
+        dates += [now - timedelta(minutes=2 - i) for i in range(2)]
+        for i, created_at in enumerate(dates):
+            message = ProjectChatMessage.objects.create(project=cls.project, user=cls.user, message=f'Message {i}')
+            ProjectChatMessage.objects.filter(pk=message.pk).update(created_at=created_at)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def history(self):
+        url = reverse('project-chat', args=[self.project.pk])
+        messages, cursor = [], None
+        while True:
+            response = self.client.get(url, {'before': cursor} if cursor else {})
+            messages = [message.message for message in response.context['messages']] + messages
+            cursor = response.context['older_cursor']
+            if cursor is None:
+                return messages
+
+    def test_old_months_move_into_compressed_segments(self):
+        self.assertEqual(archive_chat_messages(batch_size=2), 5)
+        self.assertEqual(archive_chat_messages(batch_size=2), 0)
+
+        self.assertEqual(
+            list(ProjectChatMessage.objects.order_by('pk').values_list('message', flat=True)),
+            ['Message 5', 'Message 6'],
+        )
+        segments = ChatArchiveSegment.objects.filter(project=self.project).order_by('month')
+        self.assertEqual([segment.message_count for segment in segments], [3, 2])
+        self.assertEqual([entry[3] for entry in unpack(segments[0].data)], ['Message 0', 'Message 1', 'Message 2'])
+
+    def test_history_pages_through_the_archive(self):
+        archive_chat_messages(batch_size=100)
+        self.assertEqual(self.history(), [f'Message {i}' for i in range(7)])
+
+    def test_late_messages_are_merged_into_their_month(self):
+        archive_chat_messages(batch_size=100)
+        segment = ChatArchiveSegment.objects.filter(project=self.project).earliest('month')
+        late = ProjectChatMessage.objects.create(project=self.project, user=self.user, message='Late')
+        ProjectChatMessage.objects.filter(pk=late.pk).update(
+            created_at=segment.first_created_at + timedelta(seconds=30),
+        )
+
+        expected = ['Message 0', 'Late', 'Message 1', 'Message 2', 'Message 3', 'Message 4', 'Message 5', 'Message 6']
+        self.assertEqual(self.history(), expected)
+
+        self.assertEqual(archive_chat_messages(batch_size=100), 1)
+        segment.refresh_from_db()
+        self.assertEqual(segment.message_count, 4)
+        self.assertEqual(self.history(), expected)
+
+    def test_export_and_deletion_cover_the_archive(self):
+        archive_chat_messages(batch_size=100)
+        response = self.client.get(
+            reverse('project-export', args=[self.project.pk]), {'kind': 'messages', 'format': 'ndjson'},
+        )
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['message'] for row in rows], [f'Message {i}' for i in range(7)])
+        self.assertEqual(rows[0]['user'], 'user')
+
+        self.project.is_deleting = True
+        self.project.save()
+        call_command('delete_projects', '--once', stdout=StringIO())
+        self.assertFalse(ChatArchiveSegment.objects.exists())
+
+
+@override_settings(CHAT_POLL_TIMEOUT=5)
+class ProjectChatLongPollTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.outsider = User.objects.create_user(username='outsider', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.user)
+        cls.message = ProjectChatMessage.objects.create(project=cls.project, user=cls.user, message='First')
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_returns_newer_messages_immediately(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('project-chat-messages', args=[self.project.pk]))
+        data = response.json()
+        self.assertEqual([message['message'] for message in data['messages']], ['First'])
+        self.assertEqual(data['cursor'], self.message.pk)
+
+    async def test_waits_for_the_next_message(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('project-chat-messages', args=[self.project.pk])
+        request = asyncio.ensure_future(self.async_client.get(url, {'after': self.message.pk}))
+
+        channel = project_chat_channel(self.project.pk)
+        while not get_broker().subscriber_count(channel):
+            await asyncio.sleep(0.01)
+        message = await sync_to_async(ProjectChatMessage.objects.create)(
+            project=self.project, user=self.user, message='Second'
+        )
+        get_broker().publish(channel, message.pk)
+
+        data = (await request).json()
+        self.assertEqual([message['message'] for message in data['messages']], ['Second'])
+
+    @override_settings(CHAT_POLL_TIMEOUT=0.01)
+    async def test_times_out_with_unchanged_cursor(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('project-chat-messages', args=[self.project.pk])
+        data = (await self.async_client.get(url, {'after': self.message.pk})).json()
+        self.assertEqual(data, {'messages': [], 'cursor': self.message.pk})
+
+    async def test_outsiders_are_forbidden(self):
+        await self.async_client.aforce_login(self.outsider)
+        response = await self.async_client.get(reverse('project-chat-messages', args=[self.project.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(CHAT_STREAM_KEEPALIVE=0.01)
+    def test_event_stream_ends_after_one_wait_under_wsgi(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('project-chat-events', args=[self.project.pk]))
+        with self.assertWarnsMessage(Warning, 'must consume asynchronous iterators'):
+            body = b''.join(response).decode()
+        self.assertEqual(body, (
+            f"id: {self.message.pk}\nevent: message\ndata: "
+            f"{json.dumps({'id': self.message.pk, 'user': 'user', 'message': 'First', 'created_at': self.message.created_at.isoformat()})}"
+            "\n\n: keepalive\n\n"
+        ))
+
+
+class CountingEmailBackend(LocmemEmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingEmailBackend.opened += 1
+        return True
+
+
+class FailingEmailBackend(LocmemEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP is down')
+
+
+@override_settings(EMAIL_BACKEND='core.tests.CountingEmailBackend')
+class EmailOutboxTests(TestCase):
+    def test_registration_enqueues_instead_of_sending(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'newuser', 'first_name': 'New', 'last_name': 'User', 'email': 'new@example.com',
+            'password1': 'a-long-Passw0rd', 'password2': 'a-long-Passw0rd',
+        })
+        self.assertRedirects(response, reverse('confirm_email_sent'), fetch_redirect_response=False)
+        self.assertEqual(len(mail.outbox), 0)
+
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.recipients(), ['new@example.com'])
+        self.assertIn('/confirm-email/?code=', email.body)
+
+    def test_batch_is_sent_over_one_connection(self):
+        for i in range(5):
+            enqueue_email(f'key-{i}', 'Subject', 'Body', [f'user{i}@example.com'])
+        CountingEmailBackend.opened = 0
+
+        self.assertEqual(deliver_pending(batch_size=10), (5, 0))
+
+        self.assertEqual(CountingEmailBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutgoingEmail.objects.exclude(status='sent').exists())
+        self.assertEqual(deliver_pending(), (0, 0))
+
+    def test_idempotency_key_deduplicates(self):
+        enqueue_email('same', 'Subject', 'Body', ['a@example.com'])
+        enqueue_email('same', 'Subject', 'Body', ['a@example.com'])
+        call_command('send_outbox', '--once', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(
+        EMAIL_BACKEND='core.tests.FailingEmailBackend',
+        EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_DELAY=60,
+    )
+    def test_failures_back_off_and_give_up(self):
+        email = enqueue_email('key', 'Subject', 'Body', ['a@example.com'])
+
+        self.assertEqual(deliver_pending(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertIn('SMTP is down', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        self.assertEqual(deliver_pending(), (0, 0))
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_pending(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+
+
+class PurgeAccountsTests(TestCase):
+    def create_signup(self, username, joined_days_ago, code_expires_in):
+        user = User.objects.create_user(username=username, password='password', is_active=False)
+        User.objects.filter(pk=user.pk).update(date_joined=timezone.now() - timedelta(days=joined_days_ago))
+        ConfirmationCode.objects.create(user=user, expiration_time=int(time.time()) + code_expires_in)
+        return user
+
+    @override_settings(INACTIVE_ACCOUNT_LIFETIME=24 * 3600)
+    def test_purges_expired_codes_and_stale_accounts(self):
+        stale = self.create_signup('stale', joined_days_ago=3, code_expires_in=-3600)
+        recent = self.create_signup('recent', joined_days_ago=0, code_expires_in=-60)
+        pending = self.create_signup('pending', joined_days_ago=3, code_expires_in=3600)
+        active = User.objects.create_user(username='active', password='password')
+        User.objects.filter(pk=active.pk).update(date_joined=timezone.now() - timedelta(days=30))
+        disabled = User.objects.create_user(username='disabled', password='password', is_active=False)
+        User.objects.filter(pk=disabled.pk).update(
+            date_joined=timezone.now() - timedelta(days=30), last_login=timezone.now(),
+        )
+
+        out = StringIO()
+        call_command('purge_accounts', once=True, batch_size=1, stdout=out)
+        self.assertIn('Removed 2 expired confirmation codes and 1 inactive accounts.', out.getvalue())
+
+        self.assertFalse(User.objects.filter(pk=stale.pk).exists())
+        self.assertEqual(
+            set(User.objects.values_list('username', flat=True)), {'recent', 'pending', 'active', 'disabled'}
+        )
+        self.assertEqual(list(ConfirmationCode.objects.values_list('user', flat=True)), [pending.pk])
+        self.assertTrue(User.objects.filter(pk=recent.pk).exists())
+
+
+class ProjectStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.owner)
+        cls.other = Project.objects.create(title='Other', description='', owner=cls.owner)
+
+    def create_task(self, project, due_in=timedelta(days=1), **fields):
+        return Task.objects.create(
+            title='Task', due_date=timezone.now() + due_in, project=project, owner=self.owner, **fields
+        )
+
+    def load(self, project):
+        project = Project.objects.select_related('stats').get(pk=project.pk)
+        return load_project_stats([project])[0].stats
+
+    def test_counts_follow_task_writes(self):
+        task = self.create_task(self.project, priority='high')
+        self.create_task(self.project)
+        self.assertEqual((self.load(self.project).total, self.load(self.project).todo_high), (2, 1))
+
+        task.status = 'done'
+        task.save()
+        stats = self.load(self.project)
+        self.assertEqual((stats.todo_high, stats.done_high, stats.total), (0, 1, 2))
+        self.assertIsNotNone(stats.last_activity)
+
+        task.project = self.other
+        task.save()
+        self.assertEqual((self.load(self.project).total, self.load(self.other).done_high), (1, 1))
+
+        task.delete()
+        self.assertEqual(self.load(self.other).total, 0)
+
+    def test_deleting_a_deferred_task_updates_its_project(self):
+        task = self.create_task(self.project, priority='high')
+        self.create_task(self.project)
+        self.assertEqual(self.load(self.project).total, 2)
+
+        Task.objects.only('pk').get(pk=task.pk).delete()
+        stats = self.load(self.project)
+        self.assertEqual((stats.total, stats.todo_high), (1, 0))
+
+        Task.objects.filter(project=self.project).only('pk').delete()
+        self.assertEqual(self.load(self.project).total, 0)
+
+    def test_overdue_is_recounted_lazily(self):
+        task = self.create_task(self.project, due_in=-timedelta(hours=1))
+        self.create_task(self.project, due_in=timedelta(days=2))
+        stats = self.load(self.project)
+        self.assertEqual(stats.overdue, 1)
+        self.assertGreater(stats.overdue_valid_until, timezone.now() + timedelta(days=1))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.load(self.project).overdue, 1)
+
+        task.status = 'done'
+        task.save()
+        self.assertEqual(self.load(self.project).overdue, 0)
+
+        Task.objects.filter(project=self.project).update(due_date=timezone.now() - timedelta(days=1))
+        ProjectStats.objects.filter(project=self.project).update(overdue_valid_until=timezone.now())
+        self.assertEqual(self.load(self.project).overdue, 1)
+
+    def test_rebuild_command_recounts(self):
+        self.create_task(self.project, status='in_progress')
+        Task.objects.bulk_create([
+            Task(title='Bulk', due_date=timezone.now(), project=self.project, owner=self.owner) for _ in range(3)
+        ])
+        ProjectStats.objects.filter(project=self.other).delete()
+        self.assertEqual(self.load(self.project).total, 1)
+
+        out = StringIO()
+        call_command('rebuild_project_stats', stdout=out)
+        self.assertIn('Rebuilt the stats of 2 projects.', out.getvalue())
+        stats = self.load(self.project)
+        self.assertEqual((stats.total, stats.in_progress_medium, stats.todo_medium), (4, 1, 3))
+        self.assertEqual(self.load(self.other).total, 0)
+
+
+@override_settings(TASK_REMINDER_LEAD_TIME=3600)
+class TaskReminderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.assignee = User.objects.create_user(username='assignee', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.owner)
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        SchedulerWatermark.objects.create(name=WATERMARK, position=self.now - timedelta(hours=1))
+
+    def create_task(self, due_in, **fields):
+        fields.setdefault('assigned_to', self.assignee)
+        return Task.objects.create(
+            title='Task', due_date=self.now + due_in, project=self.project, owner=self.owner, **fields
+        )
+
+    def reminders(self):
+        return set(TaskAssignmentNotification.objects.filter(kind='due_soon').values_list('task', 'user'))
+
+    def test_reminds_tasks_entering_the_lead_time_once(self):
+        soon = self.create_task(timedelta(minutes=30))
+        unassigned = self.create_task(timedelta(minutes=10), assigned_to=None)
+        self.create_task(timedelta(minutes=20), status='done')
+        self.create_task(-timedelta(minutes=10))
+        later = self.create_task(timedelta(hours=3))
+
+        emitted, wait = ReminderScheduler(window=300).step()
+        self.assertEqual(emitted, 2)
+        self.assertLessEqual(wait, 300)
+        self.assertEqual(self.reminders(), {(soon.pk, self.assignee.pk), (unassigned.pk, self.owner.pk)})
+        self.assertEqual(get_unread_notification_count(self.assignee.pk), 1)
+        self.assertGreaterEqual(SchedulerWatermark.objects.get(name=WATERMARK).position, self.now)
+
+        # A restarted scheduler starts from the persisted watermark.
+        self.assertEqual(ReminderScheduler(window=300).step()[0], 0)
+        self.assertEqual(emit_reminders(self.now + timedelta(hours=2, minutes=30), batch_size=10), 1)
+        self.assertIn((later.pk, self.assignee.pk), self.reminders())
+        self.assertEqual(len(self.reminders()), 3)
+
+    def test_batches_keep_equal_due_dates_together(self):
+        due_in = timedelta(minutes=30)
+        tasks = [self.create_task(due_in) for _ in range(3)] + [self.create_task(timedelta(minutes=40))]
+
+        out = StringIO()
+        call_command('send_reminders', once=True, batch_size=2, stdout=out)
+        self.assertIn('Sent 4 task reminders.', out.getvalue())
+        self.assertEqual(self.reminders(), {(task.pk, self.assignee.pk) for task in tasks})
+        self.assertEqual(NotificationCounter.objects.get(user=self.assignee).task_notifications, 4)
+
+
+class InviteAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='alice', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.owner)
+        for username in ['alan', 'Albert', 'alberta', 'alex', 'alfred', 'bob']:
+            User.objects.create_user(username=username, password='password')
+        ProjectMembership.objects.create(project=cls.project, user=User.objects.get(username='alex'), role='viewer')
+        ProjectInvitation.objects.create(
+            project=cls.project, invited_user=User.objects.get(username='alfred'), inviter=cls.owner, role='viewer',
+        )
+        User.objects.filter(username='alan').update(is_active=False)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('invite-user-autocomplete', args=[self.project.pk])
+
+    def usernames(self, query, **params):
+        self.client.force_login(self.owner)
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.json()['results']]
+
+    def test_suggests_only_invitable_users_by_prefix(self):
+        self.assertEqual(self.usernames('AL'), ['Albert', 'alberta'])
+        self.assertEqual(self.usernames('alb', limit='1'), ['Albert'])
+        self.assertEqual(self.usernames('a'), [])
+
+    def test_only_the_owner_may_search(self):
+        self.client.force_login(User.objects.get(username='alex'))
+        self.assertEqual(self.client.get(self.url, {'q': 'al'}).status_code, 404)
+
+    def test_hot_prefixes_are_cached_until_the_project_changes(self):
+        self.assertEqual(len(suggest_users(self.project, 'al', 10)), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(suggest_users(self.project, 'AL', 10)), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProjectInvitation.objects.create(
+                project=self.project, invited_user=User.objects.get(username='Albert'), inviter=self.owner,
+                role='viewer',
+            )
+        alberta = User.objects.get(username='alberta')
+        self.assertEqual(suggest_users(self.project, 'al', 10), [{'id': alberta.pk, 'username': 'alberta'}])
+
+    def test_prefix_lookup_uses_an_index(self):
+        queryset = User.objects.filter(username__istartswith='al')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('core_user_username_nocase_idx', plan)
+
+
+class ProjectDeletionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.members = [User.objects.create_user(username=f'member{i}', password='password') for i in range(3)]
+        cls.invitee = User.objects.create_user(username='invitee', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.owner)
+        for member in cls.members:
+            ProjectMembership.objects.create(project=cls.project, user=member, role='editor')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_task(self, owner, assigned_to):
+        return Task.objects.create(
+            title='Task', due_date=timezone.now(), project=self.project, owner=owner, assigned_to=assigned_to,
+        )
+
+    def test_deleted_project_is_hidden_then_removed_in_batches(self):
+        task = self.create_task(self.owner, self.members[0])
+        for i in range(5):
+            ProjectChatMessage.objects.create(project=self.project, user=self.members[0], message=f'Message {i}')
+        ProjectInvitation.objects.create(
+            project=self.project, invited_user=self.invitee, inviter=self.owner, role='viewer',
+        )
+        self.assertEqual(get_unread_notification_count(self.invitee.pk), 1)
+
+        self.client.force_login(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('project-delete', args=[self.project.pk]))
+        self.assertRedirects(response, reverse('project-list'))
+        self.assertTrue(Project.objects.filter(pk=self.project.pk, is_deleting=True).exists())
+        detail_url = reverse('project-detail', args=[self.project.pk])
+        self.assertNotContains(self.client.get(reverse('project-list')), detail_url)
+        self.client.force_login(self.members[1])
+        self.assertEqual(self.client.get(detail_url).status_code, 403)
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('delete_projects', once=True, batch_size=2, stdout=out)
+        self.assertIn('Deleted 1 projects.', out.getvalue())
+        self.assertFalse(Project.objects.filter(pk=self.project.pk).exists())
+        self.assertFalse(ProjectChatMessage.objects.exists())
+        self.assertFalse(ProjectMembership.objects.exists())
+        self.assertEqual(get_unread_notification_count(self.invitee.pk), 0)
+        task.refresh_from_db()
+        self.assertIsNone(task.project_id)
+
+    def test_remove_participants_reassigns_tasks_in_one_statement(self):
+        removed, kept = self.members[:2], self.members[2]
+        tasks = [self.create_task(removed[0], removed[1]), self.create_task(kept, removed[0])]
+        untouched = self.create_task(kept, kept)
+
+        self.client.force_login(self.owner)
+        user_ids = [str(user.pk) for user in removed] + [str(self.owner.pk)]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                reverse('remove-participants', args=[self.project.pk]), {'user_ids': user_ids},
+            )
+        self.assertEqual(len([q for q in context.captured_queries if q['sql'].startswith('UPDATE "core_task"')]), 1)
+        self.assertRedirects(response, reverse('project-participants', args=[self.project.pk]))
+
+        self.assertEqual(list(ProjectMembership.objects.values_list('user', flat=True)), [kept.pk])
+        tasks[0].refresh_from_db()
+        tasks[1].refresh_from_db()
+        untouched.refresh_from_db()
+        self.assertEqual((tasks[0].owner, tasks[0].assigned_to), (self.owner, self.owner))
+        self.assertEqual((tasks[1].owner, tasks[1].assigned_to), (kept, self.owner))
+        self.assertEqual((untouched.owner, untouched.assigned_to), (kept, kept))
+
+    def test_only_the_owner_may_remove_participants(self):
+        self.client.force_login(self.members[0])
+        response = self.client.post(
+            reverse('remove-participants', args=[self.project.pk]), {'user_ids': [self.members[1].pk]},
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(ProjectMembership.objects.count(), 3)
+
+
+class CachedAuthTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', email='user@example.com', password='password')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.client.get(reverse('notifications'))
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query['sql'] for query in context.captured_queries
+            if 'django_session' in query['sql'] or 'FROM "auth_user"' in query['sql']
+        ]
+
+    def test_warm_requests_skip_session_and_user_queries(self):
+        self.assertEqual(self.auth_queries(reverse('notifications')), [])
+
+    def test_user_save_invalidates_the_cached_user(self):
+        self.assertIsNotNone(cache.get(USER_KEY.format(user_id=self.user.pk)))
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(cache.get(USER_KEY.format(user_id=self.user.pk)))
+        self.assertRedirects(
+            self.client.get(reverse('notifications')), f"{reverse('login')}?next={reverse('notifications')}",
+            fetch_redirect_response=False,
+        )
+
+    def test_password_reset_logs_out_other_sessions(self):
+        uidb64 = urlsafe_base64_encode(force_bytes(self.user.pk))
+        token = default_token_generator.make_token(self.user)
+        other = self.client_class()
+        response = other.get(reverse('password_reset_confirm', args=[uidb64, token]))
+        other.post(response.url, {'new_password1': 'a-new-Passw0rd', 'new_password2': 'a-new-Passw0rd'})
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('a-new-Passw0rd'))
+
+        response = self.client.get(reverse('notifications'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_logout_drops_the_cached_session_and_user(self):
+        session_key = self.client.session.session_key
+        self.client.get(reverse('logout'))
+        self.assertIsNone(cache.get(USER_KEY.format(user_id=self.user.pk)))
+        self.assertIsNone(cache.get(f'django.contrib.sessions.cached_db{session_key}'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.owner)
+        cls.task = Task.objects.create(
+            title='Task', due_date=timezone.make_aware(datetime(2030, 1, 1, 12)),
+            project=cls.project, owner=cls.owner,
+        )
+        # The replica starts out as a copy of the primary and, like a lagging one, is never written to again.
+        for instance in (cls.owner, cls.project, cls.task):
+            type(instance).objects.using('replica').bulk_create([instance])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.owner)
+
+    def test_reads_go_to_the_replica_until_the_request_writes(self):
+        self.assertEqual(router.db_for_read(Task), 'default')
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Task), 'replica')
+            self.assertEqual(router.db_for_write(Task), 'default')
+            self.assertEqual(router.db_for_read(Task), 'default')
+        with replica_reads(use_primary=True):
+            self.assertEqual(router.db_for_read(Task), 'default')
+
+    def test_redirect_after_a_write_reads_the_primary(self):
+        url = reverse('task-detail', args=[self.task.pk])
+        Task.objects.filter(pk=self.task.pk).update(description='Changed on the primary')
+        self.assertNotContains(self.client.get(url), 'Changed on the primary')
+
+        response = self.client.post(reverse('task-update', args=[self.task.pk]), {
+            'title': 'Renamed', 'description': '', 'due_date': '2030-01-01 12:00', 'priority': 'medium',
+            'status': 'todo', 'project': self.project.pk,
+        })
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertContains(self.client.get(url), 'Renamed')
+
+        # Once the window has passed the user reads the replica again, which has not caught up.
+        del self.client.cookies[STICKY_COOKIE]
+        self.assertNotContains(self.client.get(url), 'Renamed')
+
+    def test_caches_rebuilt_after_a_write_are_filled_from_the_primary(self):
+        member = User.objects.create_user(username='member', password='password')
+        membership = ProjectMembership.objects.create(project=self.project, user=member, role='viewer')
+        stats = load_project_stats([Project.objects.select_related('stats').get(pk=self.project.pk)])[0].stats
+        for instance in (member, membership, stats):
+            type(instance).objects.using('replica').bulk_create([instance])
+        member_client = Client()
+        member_client.force_login(member)
+        url = reverse('project-detail', args=[self.project.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('task-update', args=[self.task.pk]), {
+                'title': 'Renamed', 'description': '', 'due_date': '2030-01-01 12:00', 'priority': 'medium',
+                'status': 'todo', 'project': self.project.pk,
+            })
+
+        # Another user, with no sticky window, is the first to rebuild the fragment after the write.
+        self.assertContains(member_client.get(url), 'Renamed')
+        del self.client.cookies[STICKY_COOKIE]
+        self.assertContains(self.client.get(url), 'Renamed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            membership.delete()
+        self.assertEqual(member_client.get(url).status_code, 403)
+
+        member.is_active = False
+        member.save()
+        self.assertRedirects(member_client.get(url), f"{reverse('login')}?next={url}", fetch_redirect_response=False)
+
+
+    def test_links_that_write_read_the_primary(self):
+        member = User.objects.create_user(username='member', password='password')
+        User.objects.using('replica').bulk_create([member])
+        # Neither row has reached the replica yet.
+        invitation = ProjectInvitation.objects.create(
+            project=self.project, invited_user=member, inviter=self.owner, role='viewer',
+        )
+        notification = TaskAssignmentNotification.objects.create(task=self.task, user=member)
+        self.client.force_login(member)
+
+        response = self.client.get(reverse('accept_invitation', args=[invitation.pk]))
+        self.assertRedirects(response, reverse('notifications'), fetch_redirect_response=False)
+        self.assertTrue(ProjectMembership.objects.filter(project=self.project, user=member).exists())
+
+        del self.client.cookies[STICKY_COOKIE]
+        response = self.client.get(reverse('delete_task_notification', args=[notification.pk]))
+        self.assertRedirects(response, reverse('notifications'), fetch_redirect_response=False)
+        self.assertFalse(TaskAssignmentNotification.objects.filter(pk=notification.pk).exists())
+
+
+class ActivityLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.member = User.objects.create_user(username='member', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.owner)
+        cls.membership = ProjectMembership.objects.create(project=cls.project, user=cls.member, role='viewer')
+        cls.task = Task.objects.create(
+            title='Task', due_date=timezone.make_aware(datetime(2030, 1, 1, 12)),
+            project=cls.project, owner=cls.owner,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.owner)
+
+    def test_task_edit_is_recorded_as_a_field_diff(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('task-update', args=[self.task.pk]), {
+                'title': 'Task', 'description': '', 'due_date': '2030-01-01 12:00', 'priority': 'medium',
+                'status': 'done', 'project': self.project.pk, 'assigned_to': self.member.pk,
+            })
+
+        entry = ActivityEntry.objects.get(model='task', object_id=self.task.pk, action='updated')
+        self.assertEqual(entry.actor, self.owner)
+        self.assertEqual(entry.project, self.project)
+        self.assertEqual(entry.changes, {'status': ['todo', 'done'], 'assigned_to': [None, self.member.pk]})
+
+        response = self.client.get(reverse('task-history', args=[self.task.pk]))
+        self.assertEqual(
+            response.context['entries'][0].rows, [('status', 'todo', 'done'), ('assigned_to', None, 'member')],
+        )
+
+    def test_committed_changes_are_written_with_one_insert(self):
+        with CaptureQueriesContext(connection) as context, activity_log():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.task.status = 'in_progress'
+                self.task.save()
+                self.membership.role = 'editor'
+                self.membership.save()
+                with self.assertRaises(ValueError), transaction.atomic():
+                    Task.objects.get(pk=self.task.pk).delete()
+                    raise ValueError
+
+        inserts = [
+            query for query in context.captured_queries if query['sql'].startswith('INSERT INTO "core_activityentry"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            list(ActivityEntry.objects.order_by('pk').values_list('model', 'action', 'changes')),
+            [
+                ('task', 'updated', {'status': ['todo', 'in_progress']}),
+                ('membership', 'updated', {'role': ['viewer', 'editor']}),
+            ],
+        )
+
+    @override_settings(ACTIVITY_PAGE_SIZE=2)
+    def test_project_history_is_paged_and_deleted_with_the_project(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for status in ('in_progress', 'done'):
+                self.task.status = status
+                self.task.save()
+            self.project.title = 'Renamed'
+            self.project.save()
+
+        url = reverse('project-history', args=[self.project.pk])
+        response = self.client.get(url)
+        self.assertEqual([entry.model for entry in response.context['entries']], ['project', 'task'])
+        response = self.client.get(url, {'before': response.context['older_cursor']})
+        self.assertEqual(
+            [entry.changes for entry in response.context['entries']], [{'status': ['todo', 'in_progress']}],
+        )
+        self.assertIsNone(response.context['older_cursor'])
+
+        self.client.force_login(User.objects.create_user(username='outsider', password='password'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(reverse('task-history', args=[self.task.pk])).status_code, 403)
+
+        self.project.is_deleting = True
+        self.project.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('delete_projects', '--once', stdout=StringIO())
+        self.assertFalse(ActivityEntry.objects.filter(project_id=self.project.pk).exists())
+
+        # The task survives as a personal task and keeps its history, detachment included.
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('task-history', args=[self.task.pk]))
+        self.assertEqual(
+            [entry.changes for entry in response.context['entries']],
+            [{'project': [self.project.pk, None]}, {'status': ['in_progress', 'done']}],
+        )
+
+    def test_removed_participants_hand_over_their_tasks_on_record(self):
+        self.task.assigned_to = self.member
+        self.task.save()
+        ActivityEntry.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('remove-participants', args=[self.project.pk]), {'user_ids': [self.member.pk]},
+            )
+        self.assertEqual(response.status_code, 302)
+
+        entry = ActivityEntry.objects.get(model='task', object_id=self.task.pk)
+        self.assertEqual((entry.action, entry.actor, entry.project), ('updated', self.owner, self.project))
+        self.assertEqual(entry.changes, {'assigned_to': [self.member.pk, self.owner.pk]})
+        self.assertTrue(ActivityEntry.objects.filter(model='membership', action='deleted').exists())
+
+
+class ProjectTransferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.member = User.objects.create_user(username='member', password='password')
+        cls.outsider = User.objects.create_user(username='outsider', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.owner)
+        cls.target = Project.objects.create(title='Target', description='', owner=cls.owner)
+        for project in (cls.project, cls.target):
+            ProjectMembership.objects.create(project=project, user=cls.member, role='editor')
+        cls.due_date = timezone.now().replace(microsecond=0) + timedelta(days=3)
+        Task.objects.bulk_create([
+            Task(
+                title=f'Task, "{i}"', description='Line\nbreak', due_date=cls.due_date, priority='high',
+                project=cls.project, owner=cls.owner, assigned_to=cls.member if i % 2 else None,
+            )
+            for i in range(5)
+        ])
+        for i in range(3):
+            ProjectChatMessage.objects.create(project=cls.project, user=cls.member, message=f'Message {i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def export(self, user, **params):
+        self.client.force_login(user)
+        return self.client.get(reverse('project-export', args=[self.project.pk]), params)
+
+    def test_exports_stream_csv_and_ndjson(self):
+        response = self.export(self.member, kind='tasks', format='csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn(f'project-{self.project.pk}-tasks.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        self.assertTrue(content.startswith('id,title,description,due_date,priority,status,owner,assigned_to\r\n'))
+        self.assertIn('"Task, ""0"""', content)
+
+        response = self.export(self.member, kind='messages', format='ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['message'] for row in rows], ['Message 0', 'Message 1', 'Message 2'])
+        self.assertEqual(rows[0]['user'], 'member')
+
+        self.assertEqual(self.export(self.outsider).status_code, 403)
+        self.assertEqual(self.export(self.member, format='xml').status_code, 400)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    async def test_export_streams_chunks_under_asgi(self):
+        await Task.objects.abulk_create([
+            Task(title=f'Long {i}', description='x' * 4000, due_date=self.due_date, project=self.project, owner=self.owner)
+            for i in range(40)
+        ])
+        await self.async_client.aforce_login(self.member)
+        response = await self.async_client.get(
+            reverse('project-export', args=[self.project.pk]), {'kind': 'tasks', 'format': 'ndjson'},
+        )
+        self.assertTrue(response.is_async)
+
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 2)
+        self.assertTrue(all(len(chunk) < 2 * STREAM_CHUNK_SIZE for chunk in chunks))
+        rows = [json.loads(line) for line in b''.join(chunks).decode().splitlines()]
+        self.assertEqual(len(rows), 45)
+        self.assertEqual(len({row['id'] for row in rows}), 45)
+
+    def import_file(self, content, kind, file_format, batch_size=2):
+        path = f'{self.tmp_dir}/data.{file_format}'
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            file.write(content)
+        out, err = StringIO(), StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                'import_project_data', self.target.pk, path, kind=kind, batch_size=batch_size, stdout=out, stderr=err,
+            )
+        return out.getvalue(), err.getvalue()
+
+    def test_export_round_trips_through_import(self):
+        with tempfile.TemporaryDirectory() as self.tmp_dir:
+            tasks = b''.join(self.export(self.member, kind='tasks', format='csv').streaming_content).decode()
+            out, err = self.import_file(tasks, 'tasks', 'csv')
+            self.assertIn('Imported 5 tasks, skipped 0 invalid rows.', out)
+            imported = Task.objects.filter(project=self.target).order_by('pk')
+            self.assertEqual(
+                [(task.title, task.description, task.due_date, task.priority, task.owner_id) for task in imported],
+                [(f'Task, "{i}"', 'Line\nbreak', self.due_date, 'high', self.owner.pk) for i in range(5)],
+            )
+            self.assertEqual(imported.filter(assigned_to=self.member).count(), 2)
+            self.assertEqual(ProjectStats.objects.get(project=self.target).count(priority='high'), 5)
+            self.assertEqual(
+                set(ActivityEntry.objects.filter(project=self.target).values_list('model', 'object_id', 'action')),
+                {('task', task.pk, 'created') for task in imported},
+            )
+
+            messages = b''.join(self.export(self.member, kind='messages', format='ndjson').streaming_content).decode()
+            messages += '{"user": "outsider", "message": "Hi"}\nnot json\n'
+            out, err = self.import_file(messages, 'messages', 'ndjson')
+            self.assertIn('Imported 3 messages, skipped 2 invalid rows.', out)
+            self.assertIn('Line 4:', err)
+            self.assertIn('Line 5:', err)
+            self.assertEqual(
+                list(ProjectChatMessage.objects.filter(project=self.target).values_list('message', 'created_at')),
+                list(ProjectChatMessage.objects.filter(project=self.project).values_list('message', 'created_at')),
+            )
+
+
+class TaskBulkApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.editor = User.objects.create_user(username='editor', password='password')
+        cls.viewer = User.objects.create_user(username='viewer', password='password')
+        cls.outsider = User.objects.create_user(username='outsider', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.owner)
+        ProjectMembership.objects.create(project=cls.project, user=cls.editor, role='editor')
+        ProjectMembership.objects.create(project=cls.project, user=cls.viewer, role='viewer')
+        cls.due_date = timezone.now() + timedelta(days=1)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('task-bulk')
+
+    def post(self, user, data):
+        self.client.force_login(user)
+        return self.client.post(self.url, data, content_type='application/json')
+
+    def test_creates_and_updates_in_constant_queries(self):
+        existing = Task.objects.bulk_create([
+            Task(title=f'Existing {i}', due_date=self.due_date, project=self.project, owner=self.owner)
+            for i in range(20)
+        ])
+        data = {
+            'create': [
+                {'title': f'New {i}', 'due_date': self.due_date.isoformat(), 'project': self.project.pk,
+                 'assigned_to': self.editor.pk}
+                for i in range(20)
+            ],
+            'update': [
+                {'id': task.pk, 'status': 'done', 'priority': 'high', 'assigned_to': self.viewer.pk}
+                for task in existing
+            ],
+        }
+        self.client.force_login(self.editor)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, data, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        writes = [
+            query for query in context.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE'))
+            and 'core_notificationcounter' not in query['sql'] and 'core_projectstats' not in query['sql']
+        ]
+        self.assertEqual(len(writes), 3)
+        self.assertEqual(len([q for q in context.captured_queries if 'UPDATE "core_projectstats"' in q['sql']]), 1)
+        self.assertEqual(len(response.json()['created']), 20)
+        self.assertEqual(Task.objects.filter(status='done', priority='high', assigned_to=self.viewer).count(), 20)
+        self.assertEqual(TaskAssignmentNotification.objects.filter(user=self.editor).count(), 20)
+        self.assertEqual(TaskAssignmentNotification.objects.filter(user=self.viewer).count(), 20)
+
+    def test_viewer_cannot_create_in_project(self):
+        response = self.post(self.viewer, {'create': [
+            {'title': 'New', 'due_date': self.due_date.isoformat(), 'project': self.project.pk},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('project', response.json()['create'][0])
+        self.assertFalse(Task.objects.exists())
+
+    def test_errors_roll_back_the_whole_batch(self):
+        task = Task.objects.create(title='Task', due_date=self.due_date, project=self.project, owner=self.owner)
+        response = self.post(self.editor, {
+            'create': [{'title': 'New', 'due_date': self.due_date.isoformat(), 'project': self.project.pk}],
+            'update': [
+                {'id': task.pk, 'status': 'done'},
+                {'id': task.pk + 100, 'status': 'done'},
+            ],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['update'][1], {'id': ['Task not found.']})
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'todo')
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_assignee_must_participate(self):
+        response = self.post(self.owner, {'create': [
+            {'title': 'New', 'due_date': self.due_date.isoformat(), 'project': self.project.pk,
+             'assigned_to': self.outsider.pk},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('assigned_to', response.json()['create'][0])
+
+    def test_personal_tasks_are_assigned_to_the_author(self):
+        response = self.post(self.outsider, {'create': [{'title': 'Mine', 'due_date': self.due_date.isoformat()}]})
+        self.assertEqual(response.status_code, 200)
+        task = Task.objects.get()
+        self.assertEqual((task.owner, task.assigned_to, task.project), (self.outsider, self.outsider, None))
+        self.assertFalse(TaskAssignmentNotification.objects.exists())
+
+    def test_outsider_cannot_update(self):
+        task = Task.objects.create(title='Task', due_date=self.due_date, project=self.project, owner=self.owner)
+        response = self.post(self.outsider, {'update': [{'id': task.pk, 'status': 'done'}]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_authentication(self):
+        response = self.client.post(self.url, {}, content_type='application/json')
+        self.assertIn(response.status_code, (401, 403))
+
+
+class ReadOnlyApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.member = User.objects.create_user(username='member', password='password')
+        cls.outsider = User.objects.create_user(username='outsider', password='password')
+        cls.project = Project.objects.create(title='Project', description='Long description', owner=cls.owner)
+        cls.hidden = Project.objects.create(title='Hidden', description='', owner=cls.outsider)
+        ProjectMembership.objects.create(project=cls.project, user=cls.member, role='viewer')
+        due_date = timezone.now()
+        for i in range(3):
+            Task.objects.create(title=f'Task {i}', due_date=due_date, project=cls.project, owner=cls.owner)
+        Task.objects.create(title='Hidden task', due_date=due_date, project=cls.hidden, owner=cls.outsider)
+        ProjectChatMessage.objects.create(project=cls.project, user=cls.owner, message='Hello')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.member)
+
+    def test_tasks_are_scoped_and_cursor_paginated(self):
+        response = self.client.get(reverse('api-task-list'), {'page_size': 2})
+        data = response.json()
+        self.assertEqual([task['title'] for task in data['results']], ['Task 0', 'Task 1'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual([task['title'] for task in data['results']], ['Task 2'])
+        self.assertIsNone(data['next'])
+
+    def test_sparse_fieldsets_select_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('api-project-list'), {'fields': 'id,title'})
+        self.assertEqual(response.json()['results'], [{'id': self.project.pk, 'title': 'Project'}])
+        project_query = next(query['sql'] for query in context.captured_queries if 'FROM "core_project"' in query['sql'])
+        self.assertNotIn('"description"', project_query)
+
+    def test_related_fields_are_joined_and_prefetched(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('api-chat-message-list'), {'fields': 'username,message'})
+        self.assertEqual(response.json()['results'], [{'username': 'owner', 'message': 'Hello'}])
+        self.assertEqual(len([q for q in context.captured_queries if 'core_projectchatmessage' in q['sql']]), 1)
+
+        response = self.client.get(reverse('api-project-detail', args=[self.project.pk]), {'fields': 'members'})
+        self.assertEqual(response.json(), {'members': [self.member.pk]})
+
+    def test_conditional_get(self):
+        url = reverse('api-task-detail', args=[Task.objects.filter(project=self.project).first().pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get(url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Task.objects.filter(project=self.project).update(status='done')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_chat_messages_send_last_modified(self):
+        url = reverse('api-chat-message-list')
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_hidden_project_is_not_found(self):
+        response = self.client.get(reverse('api-project-detail', args=[self.hidden.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(NOTIFICATIONS_PAGE_SIZE=2)
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.projects = [Project.objects.create(title=f'Project {i}', description='', owner=cls.owner) for i in range(3)]
+        cls.due_date = timezone.now()
+
+    def setUp(self):
+        cache.clear()
+
+    def counter(self):
+        return NotificationCounter.objects.get(user=self.user)
+
+    def invite(self, project):
+        return ProjectInvitation.objects.create(project=project, invited_user=self.user, inviter=self.owner, role='viewer')
+
+    def test_counter_follows_invitations(self):
+        invitations = [self.invite(project) for project in self.projects]
+        self.assertEqual(self.counter().pending_invitations, 3)
+
+        invitations[0].accept_invitation()
+        invitations[1].is_accepted = True
+        invitations[1].save()
+        self.assertEqual(self.counter().pending_invitations, 1)
+
+        ProjectInvitation.objects.get(pk=invitations[2].pk).delete()
+        invitations[0].delete()
+        self.assertEqual(self.counter().pending_invitations, 0)
+
+    def test_counter_follows_task_notifications(self):
+        task = Task.objects.create(title='Task', due_date=self.due_date, project=self.projects[0], owner=self.owner)
+        notification = TaskAssignmentNotification.objects.create(task=task, user=self.user)
+        TaskAssignmentNotification.objects.create(task=task, user=self.user, kind='due_soon')
+        self.assertEqual(self.counter().task_notifications, 2)
+
+        notification.delete()
+        self.assertEqual(self.counter().task_notifications, 1)
+
+        task.delete()
+        self.assertEqual(self.counter().task_notifications, 0)
+
+    def test_repeated_events_coalesce(self):
+        task = Task.objects.create(title='Task', due_date=self.due_date, project=self.projects[0], owner=self.owner)
+        self.assertEqual(notify_task_users([(task.pk, self.user.pk)]), 1)
+        notification = TaskAssignmentNotification.objects.get()
+        TaskAssignmentNotification.objects.filter(pk=notification.pk).update(
+            created_at=self.due_date - timedelta(days=1),
+        )
+
+        self.assertEqual(notify_task_users([(task.pk, self.user.pk)]), 0)
+        self.assertEqual(notify_task_users([(task.pk, self.user.pk)], kind='due_soon'), 1)
+        self.assertEqual(TaskAssignmentNotification.objects.count(), 2)
+        self.assertGreater(TaskAssignmentNotification.objects.get(kind='assigned').created_at, notification.created_at)
+        self.assertEqual(self.counter().task_notifications, 2)
+
+    def test_coalesced_notification_moves_to_the_top(self):
+        tasks = [
+            Task.objects.create(title=f'Task {i}', due_date=self.due_date, project=self.projects[0], owner=self.owner)
+            for i in range(3)
+        ]
+        notify_task_users([(task.pk, self.user.pk) for task in tasks])
+        for i, task in enumerate(tasks):
+            TaskAssignmentNotification.objects.filter(task=task).update(created_at=self.due_date - timedelta(days=10 - i))
+
+        notify_task_users([(tasks[0].pk, self.user.pk)])
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('notifications'))
+        self.assertEqual(
+            [notification.task.title for notification in response.context['task_notifications']],
+            ['Task 0', 'Task 2'],
+        )
+
+    def test_only_a_new_assignee_is_notified(self):
+        ProjectMembership.objects.create(project=self.projects[0], user=self.user, role='editor')
+        task = Task.objects.create(
+            title='Task', due_date=timezone.make_aware(datetime(2030, 1, 1, 12)), project=self.projects[0],
+            owner=self.owner,
+        )
+        self.client.force_login(self.owner)
+        data = {
+            'title': 'Task', 'description': '', 'due_date': '2030-01-01 12:00', 'priority': 'medium',
+            'status': 'todo', 'project': self.projects[0].pk, 'assigned_to': self.user.pk,
+        }
+        for title in ('Task', 'Renamed', 'Renamed again'):
+            self.client.post(reverse('task-update', args=[task.pk]), {**data, 'title': title})
+        self.assertEqual(TaskAssignmentNotification.objects.filter(task=task, user=self.user).count(), 1)
+
+        other = User.objects.create_user(username='other', password='password')
+        ProjectMembership.objects.create(project=self.projects[0], user=other, role='editor')
+        self.client.post(reverse('task-update', args=[task.pk]), {**data, 'assigned_to': other.pk})
+        self.assertTrue(TaskAssignmentNotification.objects.filter(task=task, user=other).exists())
+        self.assertEqual(self.counter().task_notifications, 1)
+
+        call_command('compact_task_notifications', stdout=StringIO())
+        self.assertEqual(TaskAssignmentNotification.objects.count(), 2)
+
+    def test_badge_is_served_from_cache(self):
+        self.invite(self.projects[0])
+        self.client.force_login(self.user)
+        self.assertEqual(get_unread_notification_count(self.user.pk), 1)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Notifications (1)')
+        self.assertFalse([q for q in context.captured_queries if 'core_notificationcounter' in q['sql']])
+
+    def test_page_uses_joined_queries_and_keyset_pagination(self):
+        for project in self.projects:
+            self.invite(project)
+            task = Task.objects.create(title=f'{project.title} task', due_date=self.due_date, project=project, owner=self.owner)
+            TaskAssignmentNotification.objects.create(task=task, user=self.user)
+
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('notifications'))
+        page_queries = [
+            q for q in context.captured_queries
+            if 'core_projectinvitation' in q['sql'] or 'core_taskassignmentnotification' in q['sql']
+            or 'core_task"' in q['sql'] or 'core_project"' in q['sql']
+        ]
+        self.assertEqual(len(page_queries), 2)
+        self.assertContains(response, 'Invitation to the project "Project 2"')
+        self.assertContains(response, 'in the project "Project 2"')
+        self.assertNotContains(response, 'Project 0')
+
+        response = self.client.get(reverse('notifications'), {
+            'invitations_before': response.context['invitations_cursor'],
+            'tasks_before': response.context['task_notifications_cursor'],
+        })
+        self.assertContains(response, 'Invitation to the project "Project 0"')
+        self.assertContains(response, 'in the project "Project 0"')
+        self.assertIsNone(response.context['invitations_cursor'])
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='password')
+        cls.member = User.objects.create_user(username='member', password='password')
+        cls.stranger = User.objects.create_user(username='stranger', password='password')
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.owner)
+        cls.hidden = Project.objects.create(title='Hidden', description='', owner=cls.stranger)
+        ProjectMembership.objects.create(project=cls.project, user=cls.member, role='viewer')
+
+        now = timezone.now()
+        cls.in_title = Task.objects.create(
+            title='Deploy database migration', due_date=now, project=cls.project, owner=cls.owner,
+        )
+        cls.in_description = Task.objects.create(
+            title='Weekly chores', description='Check the <b>database</b> backups', due_date=now,
+            project=cls.project, owner=cls.owner,
+        )
+        Task.objects.create(title='Hidden database task', due_date=now, project=cls.hidden, owner=cls.stranger)
+        Task.objects.create(title='Personal database notes', due_date=now, owner=cls.stranger, assigned_to=cls.stranger)
+        cls.personal = Task.objects.create(
+            title='My database notes', due_date=now, owner=cls.member, assigned_to=cls.member,
+        )
+        ProjectChatMessage.objects.create(project=cls.project, user=cls.owner, message='The databases are migrating')
+        ProjectChatMessage.objects.create(project=cls.hidden, user=cls.stranger, message='Secret database talk')
+
+    def test_tasks_are_ranked_and_scoped(self):
+        results = search_tasks(self.member, {self.project.pk}, 'database', 0, 10)
+        ids = [result['id'] for result in results]
+        self.assertEqual(set(ids), {self.in_title.pk, self.in_description.pk, self.personal.pk})
+        self.assertLess(ids.index(self.in_title.pk), ids.index(self.in_description.pk))
+
+    def test_snippets_are_escaped_and_highlighted(self):
+        result = search_tasks(self.member, {self.project.pk}, 'backups', 0, 10)[0]
+        self.assertIn('&lt;b&gt;', result['snippet'])
+        self.assertIn('<mark>backups</mark>', result['snippet'])
+
+    def test_stemming_prefix_and_syntax(self):
+        self.assertEqual(len(search_tasks(self.owner, {self.project.pk}, 'migrations', 0, 10)), 1)
+        self.assertEqual(len(search_tasks(self.owner, {self.project.pk}, 'migr', 0, 10)), 1)
+        self.assertEqual(len(search_tasks(self.owner, {self.project.pk}, '"deploy" (database', 0, 10)), 1)
+        self.assertEqual(search_tasks(self.owner, {self.project.pk}, '***', 0, 10), [])
+
+    def test_index_follows_writes(self):
+        self.in_title.title = 'Rotate certificates'
+        self.in_title.save()
+        self.assertEqual(search_tasks(self.owner, {self.project.pk}, 'deploy', 0, 10), [])
+        self.assertEqual(len(search_tasks(self.owner, {self.project.pk}, 'certificates', 0, 10)), 1)
+
+        Task.objects.bulk_create([Task(title='Bulk certificates', due_date=timezone.now(), project=self.project)])
+        self.assertEqual(len(search_tasks(self.owner, {self.project.pk}, 'certificates', 0, 10)), 2)
+
+        Task.objects.filter(title__contains='certificates').delete()
+        self.assertEqual(search_tasks(self.owner, {self.project.pk}, 'certificates', 0, 10), [])
+
+    def test_migrate_reinstalls_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER core_task_fts_insert")
+        call_command('migrate', verbosity=0)
+
+        Task.objects.create(title='Restored database trigger', due_date=timezone.now(), project=self.project)
+        self.assertEqual(len(search_tasks(self.owner, {self.project.pk}, 'restored', 0, 10)), 1)
+
+    def test_chat_messages(self):
+        results = search_chat_messages({self.project.pk}, 'database', 0, 10)
+        self.assertEqual(len(results), 1)
+        self.assertIn('<mark>databases</mark>', results[0]['snippet'])
+
+    @override_settings(SEARCH_PAGE_SIZE=2)
+    def test_view_pages_results(self):
+        self.client.force_login(self.member)
+        response = self.client.get(reverse('search'), {'q': 'database'})
+        self.assertEqual(len(response.context['results']), 2)
+        self.assertEqual(response.context['next_page'], 2)
+        response = self.client.get(reverse('search'), {'q': 'database', 'page': 2})
+        self.assertEqual(len(response.context['results']), 1)
+        self.assertIsNone(response.context['next_page'])
+        self.assertNotContains(response, 'Hidden')
+
+        response = self.client.get(reverse('search'), {'q': 'database', 'kind': 'messages', 'project': self.hidden.pk})
+        self.assertEqual(response.context['results'], [])
+
+    def test_project_filter_leaves_out_personal_tasks(self):
+        self.client.force_login(self.member)
+        response = self.client.get(reverse('search'), {'q': 'database', 'project': self.project.pk})
+        ids = {result['id'] for result in response.context['results']}
+        self.assertEqual(ids, {self.in_title.pk, self.in_description.pk})
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        cls.project = Project.objects.create(title='Project', description='', owner=cls.user)
+        ProjectChatMessage.objects.create(project=cls.project, user=cls.user, message='First')
+
+    def setUp(self):
+        cache.clear()
+
+    def server_timing(self, response):
+        return dict(re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing'])), response['Server-Timing']
+
+    def test_server_timing_header(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('project-detail', args=[self.project.pk]))
+        timings, header = self.server_timing(response)
+        self.assertEqual(set(timings), {'total', 'db', 'tpl'})
+        self.assertGreater(float(timings['tpl']), 0)
+        self.assertIn(f'desc="{len(context.captured_queries)} queries"', header)
+
+    async def test_async_views_count_queries(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('project-chat-messages', args=[self.project.pk]))
+        _, header = self.server_timing(response)
+        self.assertNotIn('desc="0 queries"', header)
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('core.performance', 'WARNING') as logs:
+            self.client.get(reverse('task-list'))
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['event'], entry['view'], entry['status']), ('slow_request', 'task-list', 200))
+
+    def test_histograms(self):
+        self.client.force_login(self.user)
+        for _ in range(3):
+            self.client.get(reverse('project-list'))
+        self.client.get('/no-such-page/')
+
+        self.assertEqual(self.client.get(reverse('performance-histograms')).status_code, 302)
+        self.client.force_login(self.staff)
+        histograms = self.client.get(reverse('performance-histograms')).json()
+        self.assertEqual(histograms['project-list']['count'], 3)
+        self.assertEqual(sum(histograms['project-list']['buckets'].values()), 3)
+        self.assertGreater(histograms['project-list']['avg_queries'], 0)
+        self.assertEqual(histograms['unresolved']['count'], 1)
+
+        out = StringIO()
+        call_command('performance_report', stdout=out)
+        self.assertIn('project-list', out.getvalue())
+
+
+class ViewQueryBudgetTests(TestCase):
+    """Fails when a view issues more SQL queries than its budget, which is how N+1 regressions show up."""
+
+    # Counted with a cold cache, including the session and user lookups.
+    QUERY_BUDGETS = {
+        'index': 3,
+        'register': 2,
+        'login': 2,
+        'confirm_email': 1,
+        'confirm_email_sent': 0,
+        'password_reset': 2,
+        'password_reset_done': 2,
+        'password_reset_complete': 2,
+        'project-list': 8,
+        'project-create': 3,
+        'project-detail': 7,
+        'project-update': 4,
+        'project-delete': 4,
+        'project-export': 5,
+        'project-history': 7,
+        'task-list': 7,
+        'task-create': 3,
+        'task-update': 9,
+        'task-detail': 6,
+        'task-delete': 6,
+        'task-history': 7,
+        'send_invitation': 4,
+        'invite-user-autocomplete': 3,
+        'project-participants': 7,
+        'manage_participant': 6,
+        'remove-participants': 5,
+        'project-chat': 8,
+        'notifications': 5,
+        'api-root': 2,
+        'api-project-list': 6,
+        'api-project-detail': 6,
+        'api-task-list': 5,
+        'api-task-detail': 5,
+        'api-membership-list': 5,
+        'api-membership-detail': 5,
+        'api-chat-message-list': 5,
+        'api-chat-message-detail': 5,
+        'search': 5,
+        'performance-histograms': 2,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_data', users=12, projects=3, members=4, tasks=30, personal_tasks=5, messages=40, invitations=10,
+            stdout=StringIO(),
+        )
+        cls.owner = User.objects.filter(owned_projects__isnull=False).order_by('id').first()
+        cls.member = ProjectMembership.objects.filter(project__owner=cls.owner).first().user
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_within_budgets(self, user):
+        self.client.force_login(user)
+        for name, url in collect_view_urls(user):
+            with self.subTest(view=name):
+                self.assertIn(name, self.QUERY_BUDGETS, f"{name} has no query budget.")
+                cache.clear()
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(url)
+                self.assertLess(response.status_code, 500)
+                self.assertLessEqual(len(context.captured_queries), self.QUERY_BUDGETS[name])
+
+    def test_owner_views_within_budget(self):
+        self.assert_within_budgets(self.owner)
+
+    def test_member_views_within_budget(self):
+        self.assert_within_budgets(self.member)
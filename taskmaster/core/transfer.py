@@ -0,0 +1,237 @@
+import csv
+import json
+from datetime import datetime
+from itertools import chain, islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+
+from .activity import activity_log, record_saved
+from .archive import iter_archived_entries
+from .models import ProjectChatMessage, Task
+from .serializers import ChatMessageImportSerializer, TaskImportSerializer
+from .stats import apply_task_changes, task_state
+from .utils import bump_project_version
+
+
+KINDS = ('tasks', 'messages')
+FORMATS = ('csv', 'ndjson')
+
+EXPORT_COLUMNS = {
+    'tasks': [
+        ('id', 'id'),
+        ('title', 'title'),
+        ('description', 'description'),
+        ('due_date', 'due_date'),
+        ('priority', 'priority'),
+        ('status', 'status'),
+        ('owner', 'owner__username'),
+        ('assigned_to', 'assigned_to__username'),
+    ],
+    'messages': [
+        ('id', 'id'),
+        ('user', 'user__username'),
+        ('message', 'message'),
+        ('created_at', 'created_at'),
+    ],
+}
+
+# Rows are joined into chunks of about this many characters before they are handed to the server.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class _Echo:
+    """A file-like object for csv.writer that hands back each line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _export_queryset(project, kind):
+    model = Task if kind == 'tasks' else ProjectChatMessage
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS[kind]]
+    return model.objects.filter(project=project).order_by('pk').values_list(*lookups)
+
+
+def _exported(row):
+    # Full isoformat rather than DjangoJSONEncoder's, which drops the microseconds.
+    return [value.isoformat() if isinstance(value, datetime) else value for value in row]
+
+
+def _csv_lines(kind, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS[kind]])
+    for row in rows:
+        yield writer.writerow(_exported(row))
+
+
+def _ndjson_lines(kind, rows):
+    names = [name for name, _ in EXPORT_COLUMNS[kind]]
+    for row in rows:
+        yield json.dumps(dict(zip(names, _exported(row)))) + '\n'
+
+
+def _chunked(lines):
+    chunk, size = [], 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= STREAM_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _keyset_rows(queryset, chunk_size):
+    # Pages of chunk_size rows after the last primary key seen, each its own short query, rather than one
+    # server-side cursor, which a transaction pooler in front of PostgreSQL would not keep open.
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(page[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+def export_lines(project, kind, file_format):
+    """
+    The project's tasks or chat messages as CSV or NDJSON, produced lazily.
+
+    Rows are read EXPORT_CHUNK_SIZE at a time, so memory use does not grow with the size of the project.
+    """
+    rows = _keyset_rows(_export_queryset(project, kind), settings.EXPORT_CHUNK_SIZE)
+    if kind == 'messages':
+        # Archived months come first, one segment in memory at a time, with the usernames they were archived with.
+        archived = (
+            (pk, username, message, created_at)
+            for pk, _, username, message, created_at in iter_archived_entries(project)
+        )
+        rows = chain(archived, rows)
+    lines = _csv_lines(kind, rows) if file_format == 'csv' else _ndjson_lines(kind, rows)
+    return _chunked(lines)
+
+
+async def aexport_lines(project, kind, file_format):
+    """
+    export_lines() for an ASGI server, each chunk produced in the request's thread as it is sent.
+
+    Handed a sync iterator, Django's ASGI handler would read it to the end before sending anything.
+    """
+    lines = export_lines(project, kind, file_format)
+    step = sync_to_async(next)
+    while (chunk := await step(lines, None)) is not None:
+        yield chunk
+
+
+def read_rows(lines, file_format):
+    """Rows parsed from CSV or NDJSON lines, each with its line number; unparsable lines come out as None."""
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+
+
+def _usernames(batch, fields):
+    return {data.get(field) for _, data in batch if isinstance(data, dict) for field in fields} - {None, ''}
+
+
+def _participants(project, usernames):
+    return dict(
+        User.objects
+        .filter(Q(pk=project.owner_id) | Q(projectmembership__project=project), username__in=usernames)
+        .values_list('username', 'pk')
+    )
+
+
+def _import_tasks(project, batch):
+    participants = _participants(project, _usernames(batch, ('owner', 'assigned_to')))
+
+    errors, tasks = [], []
+    for line_number, data in batch:
+        serializer = TaskImportSerializer(data=data)
+        if not serializer.is_valid():
+            errors.append((line_number, serializer.errors))
+            continue
+        data = dict(serializer.validated_data)
+        owner, assigned_to = data.pop('owner', ''), data.pop('assigned_to', '')
+        unknown = [name for name in (owner, assigned_to) if name and name not in participants]
+        if unknown:
+            errors.append((line_number, {'user': [f"{unknown[0]} is not a participant of this project."]}))
+            continue
+        tasks.append(Task(
+            **data,
+            project=project,
+            owner_id=participants.get(owner, project.owner_id),
+            assigned_to_id=participants.get(assigned_to),
+        ))
+
+    # The batch's activity entries go in with one INSERT once it commits.
+    with activity_log(), transaction.atomic():
+        Task.objects.bulk_create(tasks)
+        # bulk_create skips the signals that keep the stats, fragment versions and activity log current.
+        apply_task_changes([(None, task_state(task)) for task in tasks])
+        for task in tasks:
+            record_saved(task, created=True)
+        transaction.on_commit(lambda: bump_project_version(project.pk))
+    return len(tasks), errors
+
+
+def _import_messages(project, batch):
+    participants = _participants(project, _usernames(batch, ('user',)))
+
+    errors, messages, created_at = [], [], []
+    for line_number, data in batch:
+        serializer = ChatMessageImportSerializer(data=data)
+        if not serializer.is_valid():
+            errors.append((line_number, serializer.errors))
+            continue
+        data = serializer.validated_data
+        if data['user'] not in participants:
+            errors.append((line_number, {'user': [f"{data['user']} is not a participant of this project."]}))
+            continue
+        messages.append(ProjectChatMessage(
+            project=project, user_id=participants[data['user']], message=data['message'],
+        ))
+        created_at.append(data.get('created_at'))
+
+    with transaction.atomic():
+        ProjectChatMessage.objects.bulk_create(messages)
+        # created_at is auto_now_add, which bulk_create overrides; bulk_update writes the original times back.
+        dated = []
+        for message, value in zip(messages, created_at):
+            if value is not None:
+                message.created_at = value
+                dated.append(message)
+        ProjectChatMessage.objects.bulk_update(dated, ['created_at'])
+    return len(messages), errors
+
+
+def import_rows(project, kind, rows, batch_size):
+    """
+    Validate and insert rows from read_rows, ``batch_size`` at a time, each batch in one transaction.
+
+    Invalid rows are skipped and reported as ``(line_number, errors)``; the rest of their batch is
+    imported. Imported tasks do not notify their assignees.
+    """
+    import_batch = _import_tasks if kind == 'tasks' else _import_messages
+    imported, errors = 0, []
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        count, batch_errors = import_batch(project, batch)
+        imported += count
+        errors += batch_errors
+    return imported, errors
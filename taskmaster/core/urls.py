@@ -1,5 +1,6 @@
-from django.urls import path
+from django.urls import include, path
 from django.contrib.auth import views as auth_views
+from rest_framework.routers import DefaultRouter
 from .views import (
     index_view,
     register_view,
@@ -7,11 +8,23 @@ from .views import (
     confirm_email_view, confirm_email_stub_controller,
     project_list, project_create, project_detail, project_update, project_delete, project_participants, project_chat,
     task_list, task_create, task_update, task_delete, task_detail,
-    send_invitation_view, accept_invitation, reject_invitation,
+    send_invitation_view, invite_user_autocomplete, accept_invitation, reject_invitation,
     notifications_view, delete_task_notification,
-    manage_participant_view,
+    manage_participant_view, remove_participants_view,
+    project_chat_messages, project_chat_events,
+    search_view,
+    project_export,
+    task_history, project_history,
+    performance_histograms,
+    task_bulk, ProjectViewSet, TaskViewSet, ProjectMembershipViewSet, ProjectChatMessageViewSet,
     )
 
+router = DefaultRouter()
+router.register('projects', ProjectViewSet, basename='api-project')
+router.register('tasks', TaskViewSet, basename='api-task')
+router.register('memberships', ProjectMembershipViewSet, basename='api-membership')
+router.register('chat-messages', ProjectChatMessageViewSet, basename='api-chat-message')
+
 urlpatterns = [
     path('', index_view, name='index'),
     path('register/', register_view, name='register'),
@@ -30,18 +43,25 @@ urlpatterns = [
     path('projects/<int:pk>/', project_detail, name='project-detail'),
     path('projects/<int:pk>/edit/', project_update, name='project-update'),
     path('projects/<int:pk>/delete/', project_delete, name='project-delete'),
+    path('projects/<int:pk>/export/', project_export, name='project-export'),
+    path('projects/<int:pk>/history/', project_history, name='project-history'),
 
     path('tasks/', task_list, name='task-list'),
     path('tasks/new/', task_create, name='task-create'),
     path('tasks/<int:pk>/edit/', task_update, name='task-update'),
     path('tasks/<int:pk>/', task_detail, name='task-detail'),
     path('tasks/<int:pk>/delete/', task_delete, name='task-delete'),
+    path('tasks/<int:pk>/history/', task_history, name='task-history'),
 
     path('projects/<int:project_id>/invite/', send_invitation_view, name='send_invitation'),
+    path('projects/<int:project_id>/invite/users/', invite_user_autocomplete, name='invite-user-autocomplete'),
     path('projects/<int:pk>/participants/', project_participants, name='project-participants'),
     path('projects/<int:project_id>/participant/<int:user_id>/manage/', manage_participant_view, name='manage_participant'),
+    path('projects/<int:project_id>/participants/remove/', remove_participants_view, name='remove-participants'),
 
     path('project/<int:project_id>/chat/', project_chat, name='project-chat'),
+    path('project/<int:project_id>/chat/messages/', project_chat_messages, name='project-chat-messages'),
+    path('project/<int:project_id>/chat/events/', project_chat_events, name='project-chat-events'),
 
     path('invitations/accept/<int:invitation_id>/', accept_invitation, name='accept_invitation'),
     path('invitations/reject/<int:invitation_id>/', reject_invitation, name='reject_invitation'),
@@ -49,4 +69,11 @@ urlpatterns = [
     path('notifications/', notifications_view, name='notifications'),
     path('notifications/delete_task/<int:notification_id>/', delete_task_notification, name='delete_task_notification'),
 
+    path('search/', search_view, name='search'),
+
+    path('performance/histograms/', performance_histograms, name='performance-histograms'),
+
+    path('api/tasks/bulk/', task_bulk, name='task-bulk'),
+    path('api/', include(router.urls)),
+
 ]
@@ -1,8 +1,131 @@
-from .models import ProjectMembership
+import hashlib
+import time
 
-def get_user_role_in_project(user, project):
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from .db_router import primary_reads
+from .models import Project, ProjectMembership
+
+
+ACCESS_VERSION_KEY = 'core:project-access-version:{user_id}'
+ACCESS_ROLES_KEY = 'core:project-access:{user_id}:{version}'
+PROJECT_VERSION_KEY = 'core:project-version:{project_id}'
+FRAGMENT_KEY = 'core:fragment:{name}:{digest}'
+
+
+def _project_id(project):
+    if project is None or isinstance(project, int):
+        return project
+    return project.pk
+
+
+def _new_version():
+    # Never restart from a small constant: if a version key is evicted, entries cached under
+    # its old value must not become valid again.
+    return time.time_ns()
+
+
+def get_access_version(user_id):
+    return cache.get_or_set(ACCESS_VERSION_KEY.format(user_id=user_id), _new_version, timeout=None)
+
+
+def invalidate_project_access(user_id):
+    key = ACCESS_VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+class ProjectAccess:
+    """Roles of a single user across all of their projects, loaded once and shared by the whole request."""
+
+    def __init__(self, user):
+        self.user = user
+        self._roles = None
+        self._owned = None
+
+    def _load(self):
+        if self._roles is not None:
+            return
+
+        if not self.user.is_authenticated:
+            self._roles, self._owned = {}, frozenset()
+            return
+
+        key = ACCESS_ROLES_KEY.format(user_id=self.user.pk, version=get_access_version(self.user.pk))
+        cached = cache.get(key)
+        if cached is None:
+            with primary_reads():
+                roles = dict(
+                    ProjectMembership.objects.filter(user=self.user, project__is_deleting=False)
+                    .values_list('project_id', 'role')
+                )
+                owned = frozenset(
+                    Project.objects.filter(owner=self.user, is_deleting=False).values_list('id', flat=True)
+                )
+            cached = (roles, owned)
+            cache.set(key, cached)
+        self._roles, self._owned = cached
+
+    @property
+    def project_ids(self):
+        self._load()
+        return self._owned.union(self._roles)
+
+    def role(self, project):
+        self._load()
+        return self._roles.get(_project_id(project))
+
+    def is_owner(self, project):
+        self._load()
+        return _project_id(project) in self._owned
+
+    def is_member(self, project):
+        return self.is_owner(project) or self.role(project) is not None
+
+    def can_edit(self, project):
+        return self.is_owner(project) or self.role(project) == 'editor'
+
+
+def get_project_access(request):
+    if not hasattr(request, '_project_access'):
+        request._project_access = ProjectAccess(request.user)
+    return request._project_access
+
+
+def get_project_versions(project_ids):
+    keys = {PROJECT_VERSION_KEY.format(project_id=project_id): project_id for project_id in project_ids}
+    found = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys.keys() - found.keys()}
+    if missing:
+        cache.set_many(missing, timeout=None)
+    return {keys[key]: version for key, version in {**found, **missing}.items()}
+
+
+def bump_project_version(project_id):
+    key = PROJECT_VERSION_KEY.format(project_id=project_id)
     try:
-        membership = ProjectMembership.objects.get(user=user, project=project)
-        return membership.role
-    except ProjectMembership.DoesNotExist:
-        return None
\ No newline at end of file
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def cached_fragment(name, project_ids, vary_on, render):
+    """
+    Rendered HTML of a page fragment built only from the data of ``project_ids``.
+
+    The key contains the current version of every project, so any change to one of them makes
+    the next request render the fragment again, from the primary.
+    """
+    versions = sorted(get_project_versions(project_ids).items())
+    digest = hashlib.md5(repr((versions, vary_on)).encode()).hexdigest()
+    key = FRAGMENT_KEY.format(name=name, digest=digest)
+    html = cache.get(key)
+    if html is None:
+        with primary_reads():
+            html = render()
+        cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+    return mark_safe(html)
@@ -5,8 +5,14 @@ from .index import index_view
 from .project import project_list, project_create, project_detail, project_update, project_delete, project_participants, project_chat
 from .task import task_list, task_create, task_update, task_detail, task_delete
 from .notifications import notifications_view, delete_task_notification
-from .send_invitation import send_invitation_view, accept_invitation, reject_invitation
-from .manage_participant import manage_participant_view
+from .send_invitation import send_invitation_view, invite_user_autocomplete, accept_invitation, reject_invitation
+from .manage_participant import manage_participant_view, remove_participants_view
+from .chat import project_chat_messages, project_chat_events
+from .search import search_view
+from .export import project_export
+from .activity import task_history, project_history
+from .performance import performance_histograms
+from .api import task_bulk, ProjectViewSet, TaskViewSet, ProjectMembershipViewSet, ProjectChatMessageViewSet
 
 
 __all__ = ["confirm_email_view", "confirm_email_stub_controller", "register_view", "login_view", 
@@ -15,4 +21,9 @@ __all__ = ["confirm_email_view", "confirm_email_stub_controller", "register_view
            "project_chat", "task_list","task_create", "task_update", 
            "task_detail", "task_delete", "notifications_view", "delete_task_notification", 
            "delete_comment_controller", "delete_retweet_controller", "followers_controller", "followings_controller", 
-           "send_invitation_view", "accept_invitation", "reject_invitation", "manage_participant_view"]
+           "send_invitation_view", "invite_user_autocomplete", "accept_invitation", "reject_invitation",
+           "manage_participant_view", "remove_participants_view",
+           "project_chat_messages", "project_chat_events", "search_view", "project_export", "task_history", "project_history",
+           "performance_histograms",
+           "task_bulk",
+           "ProjectViewSet", "TaskViewSet", "ProjectMembershipViewSet", "ProjectChatMessageViewSet"]
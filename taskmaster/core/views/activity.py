@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+from django.shortcuts import get_object_or_404, render
+
+from core.activity import USER_FIELDS
+from core.models import ActivityEntry, Project, Task
+from core.utils import get_project_access
+
+
+def _history(request: HttpRequest, entries, context: dict) -> HttpResponse:
+    before = request.GET.get("before")
+    if before and before.isdigit():
+        entries = entries.filter(pk__lt=before)
+
+    page_size = settings.ACTIVITY_PAGE_SIZE
+    page = list(entries.select_related('actor').order_by('-pk')[:page_size + 1])
+    has_older = len(page) > page_size
+    page = page[:page_size]
+
+    user_ids = {
+        value
+        for entry in page for name, values in entry.changes.items() if name in USER_FIELDS
+        for value in values if value is not None
+    }
+    users = User.objects.in_bulk(user_ids) if user_ids else {}
+
+    def display(name, value):
+        if name in USER_FIELDS and value is not None:
+            return users[value].username if value in users else f'#{value}'
+        return value
+
+    for entry in page:
+        entry.rows = [(name, display(name, old), display(name, new)) for name, (old, new) in entry.changes.items()]
+
+    return render(request, 'activity_history.html', {
+        **context,
+        'entries': page,
+        'older_cursor': page[-1].pk if has_older else None,
+    })
+
+
+@login_required
+def task_history(request: HttpRequest, pk: int) -> HttpResponse:
+    task = get_object_or_404(Task, pk=pk)
+
+    if task.project_id:
+        if not get_project_access(request).is_member(task.project_id):
+            return HttpResponseForbidden("You don't have access to this task.")
+    elif request.user.id not in (task.owner_id, task.assigned_to_id):
+        return HttpResponseForbidden("You don't have access to this task.")
+
+    entries = ActivityEntry.objects.filter(model='task', object_id=task.pk)
+    return _history(request, entries, {'title': task.title, 'back_url': 'task-detail', 'object_id': task.pk})
+
+
+@login_required
+def project_history(request: HttpRequest, pk: int) -> HttpResponse:
+    project = get_object_or_404(Project, pk=pk, is_deleting=False)
+
+    if not get_project_access(request).is_member(project):
+        return HttpResponseForbidden("Project not found or you do not have access.")
+
+    entries = ActivityEntry.objects.filter(project=project)
+    return _history(request, entries, {
+        'title': project.title, 'back_url': 'project-detail', 'object_id': project.pk, 'show_objects': True,
+    })
@@ -0,0 +1,263 @@
+import hashlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, Q
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status, viewsets
+from rest_framework.decorators import api_view
+from rest_framework.pagination import CursorPagination
+from rest_framework.relations import ManyRelatedField
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from core.activity import record_saved
+from core.models import Project, ProjectChatMessage, ProjectMembership, Task
+from core.notifications import notify_task_users
+from core.serializers import (
+    BulkTaskSerializer, ProjectChatMessageSerializer, ProjectMembershipSerializer, ProjectSerializer, TaskSerializer,
+)
+from core.stats import apply_task_changes, task_state
+from core.utils import bump_project_version, get_project_access
+
+
+def _assignable_users(project_ids) -> dict:
+    assignable = defaultdict(set)
+    for project_id, user_id in ProjectMembership.objects.filter(project_id__in=project_ids).values_list('project_id', 'user_id'):
+        assignable[project_id].add(user_id)
+    for project_id, owner_id in Project.objects.filter(id__in=project_ids).values_list('id', 'owner_id'):
+        assignable[project_id].add(owner_id)
+    return assignable
+
+
+@api_view(['POST'])
+def task_bulk(request: Request) -> Response:
+    serializer = BulkTaskSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    creates = serializer.validated_data['create']
+    updates = serializer.validated_data['update']
+
+    access = get_project_access(request)
+    user_id = request.user.id
+
+    with transaction.atomic():
+        tasks = Task.objects.select_for_update().in_bulk([item['id'] for item in updates])
+
+        project_ids = {item.get('project') for item in creates} | {task.project_id for task in tasks.values()}
+        project_ids.discard(None)
+        editable = {project_id for project_id in project_ids if access.can_edit(project_id)}
+        visible = {project_id for project_id in project_ids if access.is_member(project_id)}
+        assignable = _assignable_users(visible)
+
+        create_errors, new_tasks = [], []
+        for item in creates:
+            project_id = item.pop('project', None)
+            assigned_to_id = item.pop('assigned_to', None)
+            errors = {}
+            if project_id is None:
+                if assigned_to_id not in (None, user_id):
+                    errors['assigned_to'] = ["Personal tasks can only be assigned to yourself."]
+                assigned_to_id = user_id
+            elif project_id not in editable:
+                errors['project'] = ["You do not have permission to add issues to this project."]
+            elif assigned_to_id is not None and assigned_to_id not in assignable[project_id]:
+                errors['assigned_to'] = ["The assignee is not a participant of this project."]
+            create_errors.append(errors)
+            new_tasks.append(Task(**item, project_id=project_id, assigned_to_id=assigned_to_id, owner_id=user_id))
+
+        update_errors, changed_tasks, changed_fields, reassigned = [], [], set(), []
+        for item in updates:
+            task = tasks.get(item.pop('id'))
+            errors = {}
+            if task is None:
+                errors['id'] = ["Task not found."]
+            elif task.project_id is None and task.owner_id != user_id:
+                errors['id'] = ["You do not have permission to edit this issue."]
+            elif task.project_id is not None and task.project_id not in visible:
+                errors['id'] = ["You do not have permission to edit this issue."]
+            elif 'assigned_to' in item and item['assigned_to'] != task.assigned_to_id:
+                if task.project_id is None:
+                    errors['assigned_to'] = ["Personal tasks can only be assigned to yourself."]
+                elif item['assigned_to'] is not None and item['assigned_to'] not in assignable[task.project_id]:
+                    errors['assigned_to'] = ["The assignee is not a participant of this project."]
+                elif item['assigned_to'] is not None:
+                    reassigned.append(task)
+            update_errors.append(errors)
+            if errors:
+                continue
+
+            if 'assigned_to' in item:
+                item['assigned_to_id'] = item.pop('assigned_to')
+            for field, value in item.items():
+                setattr(task, field, value)
+            changed_fields.update(item)
+            changed_tasks.append(task)
+
+        if any(create_errors) or any(update_errors):
+            return Response({'create': create_errors, 'update': update_errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        Task.objects.bulk_create(new_tasks)
+        if changed_fields:
+            Task.objects.bulk_update(changed_tasks, sorted(changed_fields))
+        apply_task_changes(
+            [(None, task_state(task)) for task in new_tasks]
+            + [(task._loaded_state, task_state(task)) for task in changed_tasks]
+        )
+        for task in new_tasks:
+            record_saved(task, created=True)
+        for task in changed_tasks:
+            record_saved(task, created=False)
+
+        notify_task_users([
+            (task.pk, task.assigned_to_id)
+            for task in new_tasks + reassigned
+            if task.project_id and task.assigned_to_id
+        ])
+
+        # bulk_create and bulk_update skip the signals that maintain the stats and fragment cache versions.
+        for project_id in {task.project_id for task in new_tasks + changed_tasks} - {None}:
+            transaction.on_commit(lambda project_id=project_id: bump_project_version(project_id))
+
+    return Response({
+        'created': [task.pk for task in new_tasks],
+        'updated': [task.pk for task in changed_tasks],
+    })
+
+
+class ApiCursorPagination(CursorPagination):
+    ordering = 'id'
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+def _row_signature(instance) -> tuple:
+    values = sorted((name, value) for name, value in instance.__dict__.items() if not name.startswith('_'))
+    related = sorted(
+        (name, _row_signature(related)) for name, related in instance._state.fields_cache.items() if related is not None
+    )
+    prefetched = sorted(
+        (name, [item.pk for item in items])
+        for name, items in getattr(instance, '_prefetched_objects_cache', {}).items()
+    )
+    return values, related, prefetched
+
+
+class ReadOnlyApiViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only viewset with ``?fields=`` sparse fieldsets and conditional GETs.
+
+    Only the columns behind the requested serializer fields are selected, and the ETag is computed
+    from the loaded rows, so a matching If-None-Match returns 304 before anything is serialized.
+    """
+
+    pagination_class = ApiCursorPagination
+    last_modified_field = None
+
+    def get_base_queryset(self):
+        raise NotImplementedError
+
+    def get_requested_fields(self):
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return [name.strip() for name in fields.split(',') if name.strip()]
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = self.get_base_queryset()
+        model = queryset.model
+        only, select_related, prefetch = {'id'}, set(), []
+
+        for field in self.get_serializer().fields.values():
+            if isinstance(field, ManyRelatedField):
+                related_model = model._meta.get_field(field.source).related_model
+                prefetch.append(Prefetch(field.source, queryset=related_model.objects.only('id')))
+                continue
+            path = field.source.replace('.', '__')
+            only.add(path)
+            if '__' in path:
+                relation = path.rsplit('__', 1)[0]
+                select_related.add(relation)
+                only.add(relation)
+
+        if self.last_modified_field:
+            only.add(self.last_modified_field)
+
+        return queryset.select_related(*select_related).only(*only).prefetch_related(*prefetch)
+
+    def not_modified(self, instances):
+        digest = hashlib.md5(repr((self.request.get_full_path(), [_row_signature(i) for i in instances])).encode())
+        self.etag = quote_etag(digest.hexdigest())
+        self.last_modified = None
+        if self.last_modified_field and instances:
+            self.last_modified = int(max(getattr(i, self.last_modified_field) for i in instances).timestamp())
+        return get_conditional_response(self.request, etag=self.etag, last_modified=self.last_modified)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None):
+            response['ETag'] = self.etag
+        if getattr(self, 'last_modified', None):
+            response['Last-Modified'] = http_date(self.last_modified)
+        return response
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        response = self.not_modified(page)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        instance = self.get_object()
+        response = self.not_modified([instance])
+        if response is not None:
+            return response
+        return Response(self.get_serializer(instance).data)
+
+
+def _project_filter(request: Request, field: str = 'project') -> Q:
+    project_ids = get_project_access(request).project_ids
+    project = request.query_params.get('project')
+    if project and project.isdigit():
+        project_ids = project_ids & {int(project)}
+    return Q(**{f'{field}__in': project_ids})
+
+
+class ProjectViewSet(ReadOnlyApiViewSet):
+    serializer_class = ProjectSerializer
+
+    def get_base_queryset(self):
+        return Project.objects.filter(_project_filter(self.request, 'pk'))
+
+
+class TaskViewSet(ReadOnlyApiViewSet):
+    serializer_class = TaskSerializer
+
+    def get_base_queryset(self):
+        if self.request.query_params.get('project'):
+            return Task.objects.filter(_project_filter(self.request))
+        personal = Q(project__isnull=True) & (Q(owner=self.request.user) | Q(assigned_to=self.request.user))
+        return Task.objects.filter(_project_filter(self.request) | personal)
+
+
+class ProjectMembershipViewSet(ReadOnlyApiViewSet):
+    serializer_class = ProjectMembershipSerializer
+
+    def get_base_queryset(self):
+        return ProjectMembership.objects.filter(_project_filter(self.request))
+
+
+class ProjectChatMessageViewSet(ReadOnlyApiViewSet):
+    serializer_class = ProjectChatMessageSerializer
+    last_modified_field = 'created_at'
+
+    def get_base_queryset(self):
+        return ProjectChatMessage.objects.filter(_project_filter(self.request))
@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+
+from core.broker import get_broker, project_chat_channel
+from core.models import ProjectChatMessage
+from core.utils import ProjectAccess
+
+
+async def _check_chat_access(request: HttpRequest, project_id: int):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    if not await sync_to_async(ProjectAccess(user).is_member)(project_id):
+        return HttpResponseForbidden("You do not have access to this project's chat.")
+    return None
+
+
+def _parse_after(value) -> int:
+    return int(value) if value and value.isdigit() else 0
+
+
+async def _messages_after(project_id: int, after: int) -> list:
+    messages = (
+        ProjectChatMessage.objects
+        .filter(project_id=project_id, pk__gt=after)
+        .select_related('user')
+        .order_by('pk')[:settings.CHAT_PAGE_SIZE]
+    )
+    return [
+        {
+            'id': message.pk,
+            'user': message.user.username,
+            'message': message.message,
+            'created_at': message.created_at.isoformat(),
+        }
+        async for message in messages
+    ]
+
+
+@require_http_methods(["GET"])
+async def project_chat_messages(request: HttpRequest, project_id: int) -> HttpResponse:
+    denied = await _check_chat_access(request, project_id)
+    if denied:
+        return denied
+
+    after = _parse_after(request.GET.get("after"))
+
+    # Subscribe before reading so a message committed in between still wakes us up.
+    with get_broker().subscribe(project_chat_channel(project_id)) as subscription:
+        messages = await _messages_after(project_id, after)
+        if not messages:
+            try:
+                await subscription.get(timeout=settings.CHAT_POLL_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                messages = await _messages_after(project_id, after)
+
+    return JsonResponse({
+        'messages': messages,
+        'cursor': messages[-1]['id'] if messages else after,
+    })
+
+
+@require_http_methods(["GET"])
+async def project_chat_events(request: HttpRequest, project_id: int) -> HttpResponse:
+    denied = await _check_chat_access(request, project_id)
+    if denied:
+        return denied
+
+    after = _parse_after(request.headers.get("Last-Event-ID") or request.GET.get("after"))
+
+    # A WSGI server (runserver, a sync worker) reads the whole body before sending any of it, so there
+    # the stream ends after one wait and EventSource reconnects from Last-Event-ID, like a long poll.
+    endless = isinstance(request, ASGIRequest)
+
+    async def stream(after):
+        with get_broker().subscribe(project_chat_channel(project_id)) as subscription:
+            waited = False
+            while True:
+                messages = await _messages_after(project_id, after)
+                for message in messages:
+                    yield f"id: {message['id']}\nevent: message\ndata: {json.dumps(message)}\n\n"
+                    after = message['id']
+                if len(messages) == settings.CHAT_PAGE_SIZE:
+                    continue
+                if waited and not endless:
+                    return
+                try:
+                    await subscription.get(timeout=settings.CHAT_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                waited = True
+
+    response = StreamingHttpResponse(stream(after), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,32 @@
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+
+from core.models import Project
+from core.transfer import FORMATS, KINDS, aexport_lines, export_lines
+from core.utils import get_project_access
+
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+@login_required
+def project_export(request: HttpRequest, pk: int) -> HttpResponse:
+    project = get_object_or_404(Project, pk=pk)
+
+    if not get_project_access(request).is_member(project):
+        return HttpResponseForbidden("You do not have access to this project.")
+
+    kind = request.GET.get("kind", "tasks")
+    file_format = request.GET.get("format", "csv")
+    if kind not in KINDS or file_format not in FORMATS:
+        return HttpResponse("Unknown export kind or format.", status=400)
+
+    lines = (aexport_lines if isinstance(request, ASGIRequest) else export_lines)(project, kind, file_format)
+    response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="project-{project.pk}-{kind}.{file_format}"'
+    return response
@@ -4,6 +4,8 @@ from django.contrib.auth.forms import AuthenticationForm
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render, redirect
 
+from core.db_router import primary_only
+
 
 def login_view(request: HttpRequest) -> HttpResponse:
     if request.method == 'POST':
@@ -23,6 +25,7 @@ def login_view(request: HttpRequest) -> HttpResponse:
         form = AuthenticationForm()
     return render(request, 'login.html', {'form': form})
 
+@primary_only
 def logout_view(request: HttpRequest) -> HttpResponse:
     logout(request)
     return redirect('login')
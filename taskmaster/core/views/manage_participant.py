@@ -2,14 +2,16 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect, get_object_or_404
 from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
 
-from core.models import Project, Task, ProjectMembership
+from core.deletion import remove_participants
+from core.models import Project, ProjectMembership
+from core.utils import get_project_access
 
 
 @login_required
 def manage_participant_view(request: HttpRequest, project_id: int, user_id: int) -> HttpResponse:
     project = get_object_or_404(Project, pk=project_id)
 
-    if project.owner != request.user:
+    if not get_project_access(request).is_owner(project):
         return HttpResponseForbidden("You do not have rights to manage members of this project.")
 
     participant = get_object_or_404(ProjectMembership, project=project, user__id=user_id)
@@ -23,10 +25,23 @@ def manage_participant_view(request: HttpRequest, project_id: int, user_id: int)
             participant.save()
         
         elif action == 'remove':
-            Task.objects.filter(project=project, owner=participant.user).update(owner=project.owner)
-            Task.objects.filter(project=project, assigned_to=participant.user).update(assigned_to=project.owner)
-            participant.delete()
+            remove_participants(project, [participant.user_id])
 
         return redirect('project-participants', pk=project_id)
 
     return redirect('project-participants', pk=project_id)
+
+
+@login_required
+def remove_participants_view(request: HttpRequest, project_id: int) -> HttpResponse:
+    project = get_object_or_404(Project, pk=project_id)
+
+    if not get_project_access(request).is_owner(project):
+        return HttpResponseForbidden("You do not have rights to manage members of this project.")
+
+    if request.method == 'POST':
+        user_ids = [int(user_id) for user_id in request.POST.getlist('user_ids') if user_id.isdigit()]
+        if user_ids:
+            remove_participants(project, user_ids)
+
+    return redirect('project-participants', pk=project_id)
@@ -1,20 +1,74 @@
+from datetime import datetime
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db.models import Q
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpRequest, HttpResponse
 
+from core.db_router import primary_only
 from core.models import ProjectInvitation, TaskAssignmentNotification
 
 
+def _keyset_page(queryset, before, page_size):
+    if before and before.isdigit():
+        queryset = queryset.filter(pk__lt=int(before))
+    items = list(queryset.order_by('-pk')[:page_size + 1])
+    return items[:page_size], items[page_size - 1].pk if len(items) > page_size else None
+
+
+def _notification_cursor(notification) -> str:
+    return f'{notification.created_at.isoformat()}_{notification.pk}'
+
+
+def _parse_notification_cursor(value):
+    try:
+        created_at, pk = value.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _recent_page(queryset, before, page_size):
+    # Newest first by created_at, which a coalesced notification refreshes, so a repeated event comes back on top.
+    cursor = _parse_notification_cursor(before)
+    if cursor:
+        created_at, pk = cursor
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    items = list(queryset.order_by('-created_at', '-pk')[:page_size + 1])
+    return items[:page_size], _notification_cursor(items[page_size - 1]) if len(items) > page_size else None
+
+
 @login_required
 def notifications_view(request: HttpRequest) -> HttpResponse:
-    invitations = ProjectInvitation.objects.filter(invited_user=request.user, is_accepted=False)
-    task_notifications = TaskAssignmentNotification.objects.filter(user=request.user)
+    page_size = settings.NOTIFICATIONS_PAGE_SIZE
+
+    invitations, invitations_cursor = _keyset_page(
+        ProjectInvitation.objects
+        .filter(invited_user=request.user, is_accepted=False)
+        .select_related('project', 'inviter')
+        .only('id', 'role', 'is_accepted', 'project__title', 'inviter__username'),
+        request.GET.get('invitations_before'),
+        page_size,
+    )
+    task_notifications, task_notifications_cursor = _recent_page(
+        TaskAssignmentNotification.objects
+        .filter(user=request.user)
+        .select_related('task__project')
+        .only('id', 'kind', 'created_at', 'task__title', 'task__due_date', 'task__project__title'),
+        request.GET.get('tasks_before'),
+        page_size,
+    )
+
     return render(request, 'notifications.html', {
         'invitations': invitations,
+        'invitations_cursor': invitations_cursor,
         'task_notifications': task_notifications,
+        'task_notifications_cursor': task_notifications_cursor,
     })
 
 
+@primary_only
 @login_required
 def delete_task_notification(request: HttpRequest, notification_id: int) -> HttpResponse:
     notification = get_object_or_404(TaskAssignmentNotification, id=notification_id, user=request.user)
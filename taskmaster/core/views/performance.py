@@ -0,0 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpRequest, JsonResponse
+
+from core.performance import get_histograms
+
+
+@staff_member_required
+def performance_histograms(request: HttpRequest) -> JsonResponse:
+    return JsonResponse(get_histograms())
@@ -1,18 +1,23 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.db.models import Q, Subquery
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
 
 from core.models import Project, ProjectMembership, ProjectChatMessage
+from core.archive import complete_page
+from core.deletion import request_project_deletion
 from core.forms import ProjectForm
-from core.utils import get_user_role_in_project
+from core.stats import load_project_stats
+from core.utils import cached_fragment, get_project_access
 
 
 @login_required
 def project_list(request: HttpRequest) -> HttpResponse:
-    projects = Project.objects.filter(
-        Q(owner=request.user) | Q(members=request.user)
-    ).distinct()
+    access = get_project_access(request)
+    projects = load_project_stats(Project.objects.filter(pk__in=access.project_ids).select_related('stats'))
     return render(request, 'project_list.html', {'projects': projects})
 
 
@@ -32,28 +37,30 @@ def project_create(request: HttpRequest) -> HttpResponse:
 
 @login_required
 def project_detail(request: HttpRequest, pk: int) -> HttpResponse:
-    project = Project.objects.filter(
-        Q(pk=pk) & (Q(owner=request.user) | Q(members=request.user))
-    ).distinct().first()
+    access = get_project_access(request)
+    project = Project.objects.filter(pk=pk).select_related('stats').first() if access.is_member(pk) else None
     
     if not project:
         return HttpResponseForbidden("Project not found or you do not have access.")
 
-    role = get_user_role_in_project(request.user, project)
-    tasks = project.tasks.all()
-
+    load_project_stats([project])
+    role = access.role(project)
     status = request.GET.get("status")
     priority = request.GET.get("priority")
-    
-    if status:
-        tasks = tasks.filter(status=status)
-    if priority:
-        tasks = tasks.filter(priority=priority)
-    is_owner = request.user == project.owner
+
+    def render_tasks():
+        tasks = project.tasks.order_by('due_date')
+        if status:
+            tasks = tasks.filter(status=status)
+        if priority:
+            tasks = tasks.filter(priority=priority)
+        return render_to_string('project_detail_tasks.html', {'tasks': tasks})
+
+    is_owner = access.is_owner(project)
     
     return render(request, 'project_detail.html', {
         'project': project,
-        'tasks': tasks,
+        'tasks_html': cached_fragment('project-tasks', [project.pk], (status, priority), render_tasks),
         'role': role,
         'is_owner': is_owner
     })
@@ -61,7 +68,7 @@ def project_detail(request: HttpRequest, pk: int) -> HttpResponse:
 
 @login_required
 def project_update(request: HttpRequest, pk: int) -> HttpResponse:
-    project = get_object_or_404(Project, pk=pk, owner=request.user)
+    project = get_object_or_404(Project, pk=pk, owner=request.user, is_deleting=False)
     if request.method == 'POST':
         form = ProjectForm(request.POST, instance=project)
         if form.is_valid():
@@ -74,29 +81,45 @@ def project_update(request: HttpRequest, pk: int) -> HttpResponse:
 
 @login_required
 def project_delete(request: HttpRequest, pk: int) -> HttpResponse:
-    project = get_object_or_404(Project, pk=pk, owner=request.user)
+    project = get_object_or_404(Project, pk=pk, owner=request.user, is_deleting=False)
     if request.method == 'POST':
-        project.delete()
+        request_project_deletion(project)
         return redirect('project-list')
     return render(request, 'project_confirm_delete.html', {'project': project})
 
 
 @login_required
 def project_participants(request: HttpRequest, pk: int) -> HttpResponse:
-    project = get_object_or_404(Project, pk=pk)
+    project = get_object_or_404(Project.objects.select_related('owner'), pk=pk)
+    access = get_project_access(request)
 
-    if project.owner != request.user and not project.members.filter(id=request.user.id).exists():
+    if not access.is_member(project):
         return HttpResponseForbidden("You do not have access to this project.")
 
-    participants = ProjectMembership.objects.filter(project=project)
+    is_owner = access.is_owner(project)
+
+    def render_participants():
+        participants = ProjectMembership.objects.filter(project=project).select_related('user')
+
+        if project.owner not in [membership.user for membership in participants]:
+            participants = list(participants)
+            participants.insert(0, ProjectMembership(project=project, user=project.owner, role='owner'))
 
-    if project.owner not in [membership.user for membership in participants]:
-        participants = list(participants)
-        participants.insert(0, ProjectMembership(project=project, user=project.owner, role='owner'))
+        return render_to_string('project_participants_list.html', {
+            'project': project,
+            'participants': participants,
+            'is_owner': is_owner,
+        }, request=request)
+
+    # The owner's copy holds CSRF tokens bound to their session, so only the read-only list is shared.
+    if is_owner:
+        participants_html = mark_safe(render_participants())
+    else:
+        participants_html = cached_fragment('project-participants', [project.pk], (), render_participants)
 
     return render(request, 'project_participants.html', {
         'project': project,
-        'participants': participants
+        'participants_html': participants_html,
     })
 
 
@@ -104,17 +127,41 @@ def project_participants(request: HttpRequest, pk: int) -> HttpResponse:
 def project_chat(request: HttpRequest, project_id: int) -> HttpResponse:
     project = Project.objects.get(pk=project_id)
 
-    if not ProjectMembership.objects.filter(project=project, user=request.user).exists() and project.owner != request.user:
+    if not get_project_access(request).is_member(project):
         return HttpResponseForbidden("You do not have access to this project's chat.")
 
-    messages = ProjectChatMessage.objects.filter(project=project).order_by('created_at')
-
     if request.method == "POST":
         message_text = request.POST.get("message")
         if message_text:
             ProjectChatMessage.objects.create(project=project, user=request.user, message=message_text)
-    
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return HttpResponse(status=204)
+        return redirect('project-chat', project_id=project.pk)
+
+    messages = ProjectChatMessage.objects.filter(project=project).select_related('user')
+
+    before = request.GET.get("before")
+    is_latest = not (before and before.isdigit())
+    older = messages
+    if not is_latest:
+        before_created_at = Subquery(
+            ProjectChatMessage.objects.filter(pk=before, project=project).values('created_at')
+        )
+        older = messages.filter(
+            Q(created_at__lt=before_created_at) | Q(created_at=before_created_at, pk__lt=before)
+        )
+
+    page_size = settings.CHAT_PAGE_SIZE
+    page = list(older.order_by('-created_at', '-pk')[:page_size + 1])
+    if len(page) <= page_size:
+        # The rest of the history may have been moved to the archive.
+        page = complete_page(project, messages, page, None if is_latest else int(before), page_size + 1)
+    has_older = len(page) > page_size
+    messages = page[:page_size][::-1]
+
     return render(request, 'project_chat.html', {
         'project': project,
-        'messages': messages
+        'messages': messages,
+        'older_cursor': messages[0].pk if has_older else None,
+        'live_cursor': (messages[-1].pk if messages else 0) if is_latest else None,
     })
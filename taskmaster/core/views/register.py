@@ -1,10 +1,10 @@
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render, redirect
 from django.urls import reverse
-from django.core.mail import send_mail
 from django.conf import settings
 
 from core.models import ConfirmationCode
+from core.outbox import enqueue_email
 from core.forms import RegistrationForm
 
 import uuid
@@ -26,10 +26,10 @@ def register_view(request: HttpRequest) -> HttpResponse:
             )
             
             confirmation_url = settings.SERVER_HOST + reverse("confirm_email") + f"?code={confirmation_code}"
-            send_mail(
+            enqueue_email(
+                f'confirm-email:{confirmation_code}',
                 'Подтвердите ваш email',
                 f'Пожалуйста, подтвердите ваш email по следующей ссылке: {confirmation_url}',
-                settings.EMAIL_FROM,
                 [user.email],
             )
         return redirect(to="confirm_email_sent")
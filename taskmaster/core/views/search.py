@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
+
+from core.models import ProjectChatMessage, Task
+from core.search import search_chat_messages, search_tasks
+from core.utils import get_project_access
+
+
+@login_required
+def search_view(request: HttpRequest) -> HttpResponse:
+    query = request.GET.get("q", "").strip()
+    kind = "messages" if request.GET.get("kind") == "messages" else "tasks"
+    page = request.GET.get("page")
+    page = int(page) if page and page.isdigit() and int(page) > 0 else 1
+
+    project_ids = get_project_access(request).project_ids
+    project = request.GET.get("project")
+    narrowed = bool(project and project.isdigit())
+    if narrowed:
+        project_ids = project_ids & {int(project)}
+
+    page_size = settings.SEARCH_PAGE_SIZE
+    offset = (page - 1) * page_size
+    results = []
+    if query:
+        if kind == "tasks":
+            results = search_tasks(
+                request.user, project_ids, query, offset, page_size + 1, include_personal=not narrowed,
+            )
+            objects = Task.objects.select_related('project').in_bulk([result['id'] for result in results])
+        else:
+            results = search_chat_messages(project_ids, query, offset, page_size + 1)
+            objects = ProjectChatMessage.objects.select_related('project', 'user').in_bulk(
+                [result['id'] for result in results]
+            )
+        for result in results:
+            result['object'] = objects[result['id']]
+
+    has_next = len(results) > page_size
+    params = request.GET.copy()
+    params.pop('page', None)
+
+    return render(request, 'search.html', {
+        'query': query,
+        'kind': kind,
+        'results': results[:page_size],
+        'page': page,
+        'previous_page': page - 1 if page > 1 else None,
+        'next_page': page + 1 if has_next else None,
+        'base_query': params.urlencode(),
+    })
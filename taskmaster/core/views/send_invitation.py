@@ -1,15 +1,18 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse
 
+from core.autocomplete import suggest_users
+from core.db_router import primary_only
 from core.models import Project, ProjectInvitation
 from core.forms import ProjectInvitationForm
 
 
 @login_required
 def send_invitation_view(request: HttpRequest, project_id: int) -> HttpResponse:
-    project = get_object_or_404(Project, id=project_id, owner=request.user)
+    project = get_object_or_404(Project, id=project_id, owner=request.user, is_deleting=False)
     search_query = request.GET.get("search_user", "")
     selected_user = None
     error_message = ""
@@ -30,6 +33,7 @@ def send_invitation_view(request: HttpRequest, project_id: int) -> HttpResponse:
                 'search_query': search_query,
                 'selected_user': selected_user,
                 'self_invitation_error': self_invitation_error,
+                'autocomplete_min_length': settings.USER_AUTOCOMPLETE_MIN_LENGTH,
             })
 
         if invited_user:
@@ -47,6 +51,7 @@ def send_invitation_view(request: HttpRequest, project_id: int) -> HttpResponse:
                     'search_query': search_query,
                     'selected_user': selected_user,
                     'success_message': success_message,
+                    'autocomplete_min_length': settings.USER_AUTOCOMPLETE_MIN_LENGTH,
                 })
             else:
                 error_message = "Error sending invitation."
@@ -57,9 +62,20 @@ def send_invitation_view(request: HttpRequest, project_id: int) -> HttpResponse:
         'search_query': search_query,
         'selected_user': selected_user,
         'error_message': error_message,
+        'autocomplete_min_length': settings.USER_AUTOCOMPLETE_MIN_LENGTH,
     })
 
 
+@login_required
+def invite_user_autocomplete(request: HttpRequest, project_id: int) -> HttpResponse:
+    project = get_object_or_404(Project, id=project_id, owner=request.user, is_deleting=False)
+    limit = request.GET.get("limit", "")
+    limit = int(limit) if limit.isdigit() and int(limit) > 0 else settings.USER_AUTOCOMPLETE_LIMIT
+    results = suggest_users(project, request.GET.get("q", ""), min(limit, settings.USER_AUTOCOMPLETE_LIMIT))
+    return JsonResponse({'results': results})
+
+
+@primary_only
 @login_required
 def accept_invitation(request: HttpRequest, invitation_id: int) -> HttpResponse:
     invitation = get_object_or_404(ProjectInvitation, id=invitation_id, invited_user=request.user)
@@ -70,6 +86,7 @@ def accept_invitation(request: HttpRequest, invitation_id: int) -> HttpResponse:
     return redirect('notifications')
 
 
+@primary_only
 @login_required
 def reject_invitation(request: HttpRequest, invitation_id: int) -> HttpResponse:
     invitation = get_object_or_404(ProjectInvitation, id=invitation_id, invited_user=request.user)
@@ -1,48 +1,163 @@
+from datetime import datetime
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.http import HttpResponseForbidden
 from django.http import HttpRequest, HttpResponse
 
-from core.models import Project, Task, TaskAssignmentNotification
+from core.models import Project, Task
 from core.forms import TaskForm
-from core.utils import get_user_role_in_project
+from core.notifications import notify_task_users
+from core.utils import cached_fragment, get_project_access
 
 
-@login_required
-def task_list(request: HttpRequest) -> HttpResponse:
-    projects = Project.objects.filter(
-        Q(owner=request.user) | Q(members=request.user)
-    ).distinct()
+def _task_cursor(task: Task) -> str:
+    return f'{task.due_date.isoformat()}_{task.pk}'
+
+
+def _parse_task_cursor(value: str):
+    try:
+        due_date, pk = value.rsplit('_', 1)
+        return datetime.fromisoformat(due_date), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _group_query(request: HttpRequest, **params) -> str:
+    query = request.GET.copy()
+    for key in ('project', 'after', 'after_project'):
+        query.pop(key, None)
+    query.update(params)
+    return query.urlencode()
+
 
-    tasks_for_projects = Task.objects.filter(
-        Q(project__in=projects)
-    ).distinct()
+def _task_group(request: HttpRequest, project, tasks: list, size: int, group_key) -> dict:
+    has_more = len(tasks) > size
+    tasks = tasks[:size]
+    return {
+        'project': project,
+        'tasks': tasks,
+        'next_query': _group_query(request, project=group_key, after=_task_cursor(tasks[-1])) if has_more else None,
+    }
 
-    tasks_without_project = Task.objects.filter(
-        Q(assigned_to=request.user) & Q(project__isnull=True)
-    ).distinct()
 
+@login_required
+def task_list(request: HttpRequest) -> HttpResponse:
+    project_ids = get_project_access(request).project_ids
+
+    filters = Q()
     status = request.GET.get("status")
     priority = request.GET.get("priority")
-    
     if status:
-        tasks_for_projects = tasks_for_projects.filter(status=status)
-        tasks_without_project = tasks_without_project.filter(status=status)
+        filters &= Q(status=status)
     if priority:
-        tasks_for_projects = tasks_for_projects.filter(priority=priority)
-        tasks_without_project = tasks_without_project.filter(priority=priority)
-    
-    projects_with_tasks = {}
-    for task in tasks_for_projects:
-        if task.project not in projects_with_tasks:
-            projects_with_tasks[task.project] = []
-        projects_with_tasks[task.project].append(task)
-    
+        filters &= Q(priority=priority)
+
+    group = request.GET.get("project")
+    if group:
+        if group == 'none':
+            tasks = Task.objects.filter(filters, assigned_to=request.user, project__isnull=True)
+        else:
+            try:
+                project_id = int(group)
+            except ValueError:
+                return HttpResponseForbidden("Project not found or you do not have access.")
+            if project_id not in project_ids:
+                return HttpResponseForbidden("Project not found or you do not have access.")
+            tasks = Task.objects.filter(filters, project_id=project_id).select_related('project')
+
+        after = request.GET.get("after")
+        cursor = _parse_task_cursor(after)
+        if cursor:
+            due_date, pk = cursor
+            tasks = tasks.filter(Q(due_date__gt=due_date) | Q(due_date=due_date, pk__gt=pk))
+
+        def render_group():
+            page_size = settings.TASK_LIST_PAGE_SIZE
+            group_tasks = list(tasks.order_by('due_date', 'pk')[:page_size + 1])
+            return render_to_string('task_list_group.html', {
+                'group': _task_group(request, group_tasks[0].project, group_tasks, page_size, group)
+                    if group_tasks else None,
+            })
+
+        if group == 'none':
+            group_html = mark_safe(render_group())
+        else:
+            group_html = cached_fragment('task-list-group', [project_id], (_group_query(request), after), render_group)
+
+        return render(request, 'task_list.html', {
+            'group_html': group_html,
+            'all_query': _group_query(request),
+        })
+
+    group_size = settings.TASK_LIST_GROUP_SIZE
+    max_rows = settings.TASK_LIST_MAX_ROWS
+
+    tasks_without_project = list(
+        Task.objects.filter(filters, assigned_to=request.user, project__isnull=True)
+        .order_by('due_date', 'pk')[:group_size + 1]
+    )
+
+    after_project = request.GET.get("after_project")
+
+    def render_projects():
+        tasks_for_projects = Task.objects.filter(filters, project__in=project_ids)
+        if after_project and after_project.isdigit():
+            tasks_for_projects = tasks_for_projects.filter(project_id__gt=int(after_project))
+
+        # One query for the first group_size + 1 tasks of every project; the extra row tells whether a group has more.
+        tasks_for_projects = list(
+            tasks_for_projects
+            .select_related('project')
+            .annotate(position=Window(
+                RowNumber(),
+                partition_by=F('project_id'),
+                order_by=[F('due_date').asc(), F('pk').asc()],
+            ))
+            .filter(position__lte=group_size + 1)
+            .order_by('project_id', 'due_date', 'pk')[:max_rows + 1]
+        )
+
+        size = group_size
+        next_page_query = None
+        if len(tasks_for_projects) > max_rows:
+            cut_project_id = tasks_for_projects[max_rows].project_id
+            kept = [task for task in tasks_for_projects if task.project_id != cut_project_id]
+            if kept:
+                # Never render a group cut short by the row cap; it opens the next page instead.
+                tasks_for_projects = kept
+                next_page_query = _group_query(request, after_project=kept[-1].project_id)
+            else:
+                # Unless it is the only group on the page (TASK_LIST_MAX_ROWS <= TASK_LIST_GROUP_SIZE):
+                # it is shown truncated, with its own link to the rest of its tasks.
+                size = max_rows
+                next_page_query = _group_query(request, after_project=cut_project_id)
+
+        projects_with_tasks = []
+        for project_id, group_tasks in groupby(tasks_for_projects, key=attrgetter('project_id')):
+            group_tasks = list(group_tasks)
+            projects_with_tasks.append(_task_group(request, group_tasks[0].project, group_tasks, size, project_id))
+
+        return render_to_string('task_list_projects.html', {
+            'projects_with_tasks': projects_with_tasks,
+            'next_page_query': next_page_query,
+        })
+
+    projects_html = cached_fragment(
+        'task-list-projects', project_ids, (_group_query(request), after_project), render_projects,
+    )
+
     return render(request, 'task_list.html', {
-        'tasks_for_projects': tasks_for_projects,
-        'tasks_without_project': tasks_without_project,
-        'projects_with_tasks': projects_with_tasks
+        'tasks_without_project': _task_group(request, None, tasks_without_project, group_size, 'none')
+            if tasks_without_project and not after_project else None,
+        'projects_html': projects_html,
     })
 
 
@@ -53,10 +168,8 @@ def task_create(request: HttpRequest) -> HttpResponse:
         project_id = request.GET['project']
         project = get_object_or_404(Project, id=project_id)
 
-    if project:
-        role = get_user_role_in_project(request.user, project)
-        if role != 'editor' and request.user != project.owner:
-            return HttpResponseForbidden("You do not have permission to add issues to this project.")
+    if project and not get_project_access(request).can_edit(project):
+        return HttpResponseForbidden("You do not have permission to add issues to this project.")
 
     form = TaskForm(initial={'project': project}, project=project, hide_assigned=not project)
 
@@ -71,8 +184,8 @@ def task_create(request: HttpRequest) -> HttpResponse:
                 task.project = project
             task.save()
 
-            if task.project and task.assigned_to:
-                TaskAssignmentNotification.objects.create(task=task, user=task.assigned_to)
+            if task.project_id and task.assigned_to_id:
+                notify_task_users([(task.pk, task.assigned_to_id)])
 
             return redirect('task-list')
 
@@ -86,23 +199,23 @@ def task_update(request: HttpRequest, pk: int) -> HttpResponse:
     project = task.project
 
     if project:
-        role = get_user_role_in_project(request.user, project)
-        if role not in ['viewer', 'editor'] and request.user != project.owner:
+        if not get_project_access(request).is_member(project):
             return HttpResponseForbidden("You do not have permission to edit this issue.")
     else:
-        if request.user != task.owner:
+        if request.user.id != task.owner_id:
             return HttpResponseForbidden("You do not have permission to edit this issue.")
 
     form = TaskForm(instance=task, project=project, hide_assigned=hide_assigned)
 
     if request.method == 'POST':
+        # Read before validation, which already copies the submitted values onto the instance.
+        old_assigned_to_id = task.assigned_to_id
         form = TaskForm(request.POST, instance=task, project=project, hide_assigned=hide_assigned)
         if form.is_valid():
-            old_assigned_user = task.assigned_to
             task = form.save()
 
-            if task.project and task.assigned_to:
-                TaskAssignmentNotification.objects.create(task=task, user=task.assigned_to)
+            if task.project_id and task.assigned_to_id and task.assigned_to_id != old_assigned_to_id:
+                notify_task_users([(task.pk, task.assigned_to_id)])
 
             return redirect('task-detail', pk=task.pk)
 
@@ -111,28 +224,33 @@ def task_update(request: HttpRequest, pk: int) -> HttpResponse:
 
 @login_required
 def task_detail(request: HttpRequest, pk: int) -> HttpResponse:
-    task = get_object_or_404(Task, pk=pk)
+    task = get_object_or_404(Task.objects.select_related('project', 'assigned_to'), pk=pk)
+    access = get_project_access(request)
 
     role = None
 
     if task.project:
-        role = get_user_role_in_project(request.user, task.project)
-        if role not in ['viewer', 'editor'] and request.user != task.project.owner:
+        role = access.role(task.project)
+        if not access.is_member(task.project):
             return HttpResponseForbidden("You don't have access to this task.")
     else:
-        if request.user != task.owner and request.user != task.assigned_to:
+        if request.user.id not in (task.owner_id, task.assigned_to_id):
             return HttpResponseForbidden("You don't have access to this task.")
 
-    return render(request, 'task_detail.html', {'task': task, 'role': role})
+    return render(request, 'task_detail.html', {
+        'task': task,
+        'role': role,
+        'is_task_owner': request.user.id == task.owner_id,
+        'is_project_owner': access.is_owner(task.project_id),
+    })
 
 
 @login_required
 def task_delete(request: HttpRequest, pk: int) -> HttpResponse:
     task = get_object_or_404(Task, pk=pk)
-    project = task.project
-    role = get_user_role_in_project(request.user, project)
+    access = get_project_access(request)
 
-    if request.user != task.assigned_to and role != 'editor' and project.owner != request.user:
+    if request.user.id != task.assigned_to_id and not access.can_edit(task.project_id):
         return HttpResponseForbidden("You do not have permission to delete this task.")
 
     if request.method == 'POST':
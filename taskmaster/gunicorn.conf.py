@@ -0,0 +1,36 @@
+import multiprocessing
+import os
+
+# ASGI, so the chat long polls and event streams wait on the event loop instead of holding a thread each;
+# a WSGI server buffers the whole body of an async streaming response before sending any of it.
+wsgi_app = 'taskmaster.asgi:application'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+worker_class = 'uvicorn_worker.UvicornWorker'
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+# Only bounds startup and shutdown of the event loop; open chat streams do not count against it.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def on_starting(server):
+    """Refuse to run several workers on backends that only reach the process they live in."""
+    if server.cfg.workers <= 1:
+        return
+
+    from django.conf import settings
+
+    # Access and fragment invalidations would reach only the worker that made them.
+    if settings.CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache':
+        raise RuntimeError('A per-process LocMemCache cannot be shared by several workers; configure a shared cache.')
+    # New chat messages would wake only the subscribers of the worker that saved them.
+    if settings.CHAT_BROKER_BACKEND == 'core.broker.InMemoryBroker':
+        raise RuntimeError('InMemoryBroker cannot be shared by several workers; use core.broker.RedisBroker.')
@@ -45,11 +45,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.performance.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.activity.ActivityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -58,7 +61,7 @@ ROOT_URLCONF = 'taskmaster.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -67,6 +70,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.notifications',
             ],
         },
     },
@@ -83,7 +87,42 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # A stand-in read replica for trying the router locally: copy db.sqlite3 to replica.sqlite3 and run
+    # with USE_REPLICA=1. It never receives the primary's writes, which makes stale reads easy to spot.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+    },
+}
+
+# The aliases that take the reads of requests; see core.db_router.
+DATABASE_REPLICAS = ['replica'] if os.environ.get("USE_REPLICA") else []
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 5
+
+
+# Sessions and the logged-in user are read from the cache; session writes go through to the database.
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+AUTHENTICATION_BACKENDS = [
+    'core.auth_backends.CachedModelBackend',
+    # Sessions logged in before the cached backend existed keep working until they expire.
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+USER_CACHE_TIMEOUT = 300
+
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
 }
 
 
@@ -137,6 +176,52 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 CONFIRMATION_CODE_LIFETIME = 3600
+INACTIVE_ACCOUNT_LIFETIME = 7 * 24 * 3600
+ACCOUNT_PURGE_BATCH_SIZE = 500
+PROJECT_DELETION_BATCH_SIZE = 1000
+
+TASK_LIST_GROUP_SIZE = 20
+TASK_LIST_PAGE_SIZE = 50
+TASK_LIST_MAX_ROWS = 200
+
+TASK_BULK_MAX_ITEMS = 1000
+
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 1000
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+NOTIFICATIONS_PAGE_SIZE = 50
+
+TASK_REMINDER_LEAD_TIME = 24 * 3600
+TASK_REMINDER_WINDOW = 300
+TASK_REMINDER_BATCH_SIZE = 500
+
+SEARCH_PAGE_SIZE = 20
+
+USER_AUTOCOMPLETE_MIN_LENGTH = 2
+USER_AUTOCOMPLETE_LIMIT = 10
+USER_AUTOCOMPLETE_CACHE_TIMEOUT = 60
+
+FRAGMENT_CACHE_TIMEOUT = 600
+
+PERF_SLOW_REQUEST_MS = 500
+PERF_HISTOGRAM_WINDOW = 300
+PERF_HISTOGRAM_WINDOWS = 12
+PERF_HISTOGRAM_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+CHAT_PAGE_SIZE = 50
+# InMemoryBroker only reaches subscribers of the process that saved the message; RedisBroker reaches all.
+CHAT_BROKER_BACKEND = 'core.broker.InMemoryBroker'
+CHAT_BROKER_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+CHAT_BROKER_CHANNEL = 'taskmaster:chat'
+CHAT_POLL_TIMEOUT = 25
+CHAT_STREAM_KEEPALIVE = 15
+CHAT_ARCHIVE_AGE = 90 * 24 * 3600
+CHAT_ARCHIVE_BATCH_SIZE = 1000
+
+ACTIVITY_PAGE_SIZE = 50
 
 EMAIL_HOST = os.environ["EMAIL_HOST"]
 EMAIL_PORT = os.environ["EMAIL_PORT"]
@@ -147,4 +232,10 @@ EMAIL_FROM = os.environ["EMAIL_FROM"]
 
 DEFAULT_FROM_EMAIL = os.environ["DEFAULT_FROM_EMAIL"]
 
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 3600
+EMAIL_OUTBOX_CLAIM_TIMEOUT = 600
+
 SERVER_HOST = os.environ["SERVER_HOST"]
@@ -0,0 +1,104 @@
+"""
+Production settings for taskmaster.
+
+Select with DJANGO_SETTINGS_MODULE=taskmaster.settings_production; everything not overridden here
+comes from taskmaster/settings.py.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, TEMPLATES
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get("ALLOWED_HOSTS", "").split(",") if host.strip()]
+CSRF_TRUSTED_ORIGINS = [
+    origin.strip() for origin in os.environ.get("CSRF_TRUSTED_ORIGINS", "").split(",") if origin.strip()
+]
+
+# Trigram lookups for the user autocomplete.
+INSTALLED_APPS = [*INSTALLED_APPS, 'django.contrib.postgres']
+
+
+# Static files are served by the app server itself.
+
+MIDDLEWARE = [
+    *MIDDLEWARE[:2],
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    *MIDDLEWARE[2:],
+]
+
+STATIC_ROOT = BASE_DIR / 'staticfiles'  # noqa: F405
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+
+# Database
+# Under ASGI each request runs its sync code in a thread of its own, so a connection kept open past the
+# request (CONN_MAX_AGE) is never reused and only piles up. Connections go through pgbouncer instead
+# (the pgbouncer compose service), which hands each transaction one of a few long-lived server
+# connections; opening a client connection to it costs no PostgreSQL backend. A cursor must not
+# outlive its transaction in that mode, so server-side cursors are off.
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ["POSTGRES_DB"],
+        'USER': os.environ["POSTGRES_USER"],
+        'PASSWORD': os.environ["POSTGRES_PASSWORD"],
+        'HOST': os.environ.get("POSTGRES_HOST", "localhost"),
+        'PORT': os.environ.get("POSTGRES_PORT", "5432"),
+        'CONN_MAX_AGE': int(os.environ.get("DB_CONN_MAX_AGE", 0)),
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get("DB_TRANSACTION_POOLING", "1") == "1",
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get("DB_CONNECT_TIMEOUT", 5)),
+        },
+    }
+}
+
+# Streaming replicas of the primary, which take the reads of requests (see core.db_router).
+for index, host in enumerate(filter(None, os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(","))):
+    DATABASES[f'replica_{index}'] = {**DATABASES['default'], 'HOST': host.strip()}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+
+# Cache
+# Shared by every worker process, so an invalidation (a saved user, a bumped project version) reaches all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
+    }
+}
+
+# New chat messages wake the subscribers of every worker process, not just the one that saved them.
+CHAT_BROKER_BACKEND = 'core.broker.RedisBroker'
+
+
+# Templates are compiled once per worker process.
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]